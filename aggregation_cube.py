@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from shot_decision_quality import ShotDecisionQuality
+
+
+# Finest grain materialized; every level below is a roll-up of these keys
+BASE_KEYS = ['player_id', 'team_id', 'match_id', 'matchday']
+
+LEVELS = {
+    'player': ['player_id'],
+    'player_team': ['player_id', 'team_id'],
+    'player_match': ['player_id', 'team_id', 'match_id', 'matchday'],
+    'team': ['team_id'],
+    'team_match': ['team_id', 'match_id', 'matchday'],
+    'team_matchday': ['team_id', 'matchday'],
+    'match': ['match_id', 'matchday'],
+    'matchday': ['matchday'],
+}
+
+# Additive per-shot statistics; everything reported is derived from these sums
+SUM_COLUMNS = {
+    'sdq_sum': 'sdq',
+    'location_sum': 'location_score',
+    'timing_sum': 'timing_score',
+    'pressure_sum': 'pressure_score',
+    'shot_type_sum': 'shot_type_score',
+    'expected_value_sum': 'expected_value',
+    'distance_sum': 'distance_to_goal',
+    'angle_sum': 'shot_angle',
+}
+
+
+def shot_sums(shot_sdq_df):
+    """
+    Per-shot additive statistics (one row per shot, vectorized)
+    """
+    zones = ShotDecisionQuality().zones
+    x = shot_sdq_df['coordinates_x'].to_numpy(dtype=float)
+    x_from_goal = np.where(x >= 60, 120 - x, x)
+    sdq = shot_sdq_df['sdq'].to_numpy(dtype=float)
+
+    sums = pd.DataFrame({
+        'total_shots': np.ones(len(shot_sdq_df), dtype=np.int64),
+        'goals': (shot_sdq_df['shot_result'] == 'GOAL').to_numpy(dtype=np.int64),
+        'sdq_sq_sum': sdq ** 2,
+        'shots_under_pressure': (
+            np.asarray(shot_sdq_df['is_under_pressure'].to_numpy(), dtype=bool).astype(np.int64)
+            if 'is_under_pressure' in shot_sdq_df.columns else np.zeros(len(shot_sdq_df), dtype=np.int64)
+        ),
+        'shots_in_box': (x_from_goal <= zones['penalty_box']).astype(np.int64),
+    }, index=shot_sdq_df.index)
+    for name, column in SUM_COLUMNS.items():
+        sums[name] = shot_sdq_df[column].to_numpy(dtype=float)
+
+    return sums
+
+
+def summarize(sums):
+    """
+    Leaderboard-style statistics from additive sums (same names as calculate_player_sdq)
+    """
+    n = sums['total_shots']
+    mean_sdq = sums['sdq_sum'] / n
+    variance = (sums['sdq_sq_sum'] / n - mean_sdq ** 2).clip(lower=0)
+
+    stats = pd.DataFrame({
+        'overall_sdq': mean_sdq,
+        'sdq_std': np.sqrt(variance),
+        'consistency': 100 - np.sqrt(variance),
+        'avg_location_score': sums['location_sum'] / n,
+        'avg_timing_score': sums['timing_sum'] / n,
+        'avg_pressure_score': sums['pressure_sum'] / n,
+        'avg_shot_type_score': sums['shot_type_sum'] / n,
+        'avg_expected_value': sums['expected_value_sum'] / n,
+        'total_shots': n,
+        'goals': sums['goals'],
+        'avg_distance': sums['distance_sum'] / n,
+        'avg_angle': sums['angle_sum'] / n,
+        'shots_under_pressure': sums['shots_under_pressure'],
+        'shots_in_box': sums['shots_in_box'],
+        'conversion_rate': sums['goals'] / n * 100,
+    }, index=sums.index)
+
+    return stats
+
+
+class SDQCube:
+    """
+    SDQ statistics materialized at several granularities from one pass over shots
+
+    Only additive sums are stored at the base grain (player x team x match x
+    matchday); every level, roll-up and drill-down is a group-by over that
+    small base frame, never over the shots. Medians are not additive and are
+    therefore not part of the cube.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self._levels = {}
+
+    def level(self, name, **filters):
+        """
+        Statistics at one named level (see LEVELS), optionally drilled down by key
+
+        Example: cube.level('player_team', team_id=7)
+        """
+        if name not in self._levels:
+            self._levels[name] = self.roll_up(LEVELS[name])
+        stats = self._levels[name]
+        for key, value in filters.items():
+            stats = stats[stats[key] == value]
+        return stats
+
+    def roll_up(self, keys):
+        """
+        Statistics for any combination of base keys
+        """
+        sums = self.base.groupby(list(keys), dropna=False, sort=False, observed=True).sum(numeric_only=True)
+        sum_columns = [c for c in sums.columns if c not in BASE_KEYS]
+        return summarize(sums[sum_columns]).reset_index()
+
+    def primary_teams(self):
+        """
+        One team per player: the team they took most shots for
+        """
+        player_teams = self.level('player_team')
+        return (
+            player_teams.sort_values(['player_id', 'total_shots'], ascending=[True, False], kind='stable')
+            .drop_duplicates('player_id')[['player_id', 'team_id']]
+        )
+
+    def save(self, path):
+        self.base.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+def build_sdq_cube(shot_sdq_df):
+    """
+    Single pass over scored shots into the base grain of the cube
+    """
+    keys = [key for key in BASE_KEYS if key in shot_sdq_df.columns]
+    sums = shot_sdq_df[keys].join(shot_sums(shot_sdq_df))
+    for key in BASE_KEYS:
+        if key not in sums.columns:
+            sums[key] = np.nan
+
+    base = sums.groupby(BASE_KEYS, dropna=False, sort=False, observed=True).sum().reset_index()
+    return SDQCube(base)
+
+
+def player_leaderboard(cube, shot_sdq_df, min_shots=1):
+    """
+    Player leaderboard from the cube's player level (same columns as generate_shot_leaderboard)
+
+    Medians are not additive, so the median and the SDQ spread come from one
+    vectorized group-by over the shots' SDQ; everything else is read off the
+    cube without another pass over the shots.
+    """
+    stats = cube.level('player')
+    if len(stats) == 0:
+        return pd.DataFrame()
+
+    by_player = shot_sdq_df['sdq'].astype(float).groupby(shot_sdq_df['player_id'], sort=False)
+    spread = pd.DataFrame({'sdq_median': by_player.median(), 'sdq_std': by_player.std(ddof=0)})
+    spread = spread.reindex(stats['player_id'].to_numpy())
+
+    stats = stats.drop(columns='player_id').assign(player_id=stats['player_id'].to_numpy())
+    stats['sdq_std'] = spread['sdq_std'].to_numpy()
+    stats['consistency'] = 100 - stats['sdq_std']
+    stats.insert(1, 'sdq_median', spread['sdq_median'].to_numpy())
+
+    stats = stats[stats['total_shots'] >= min_shots]
+    stats['player_id'] = stats['player_id'].astype(int)
+    return stats.sort_values('overall_sdq', ascending=False).reset_index(drop=True)
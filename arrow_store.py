@@ -0,0 +1,136 @@
+import os
+
+import pyarrow as pa
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'arrow')
+
+# String columns with few distinct values are stored dictionary-encoded, so
+# they come back as pandas Categoricals (small codes) instead of copied strings
+DICTIONARY_MAX_UNIQUE_RATIO = 0.5
+
+# Columns of quarantined shots published for inspection
+QUARANTINE_COLUMNS = [
+    'match_id', 'matchday', 'event_id', 'period_id', 'timestamp', 'team_id', 'player_id',
+    'coordinates_x', 'coordinates_y', 'body_part_type', 'set_piece_type', 'quarantine_reason'
+]
+
+
+def table_path(name, competition_id=743, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f'{name}_{competition_id}.arrow')
+
+
+def _to_arrow(df):
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        try:
+            if column.dtype.kind == 'f':
+                # NaN stays a float value rather than becoming an Arrow null:
+                # a column with a validity bitmap is copied on every
+                # to_pandas, one without is read as a view on the mapped file
+                array = pa.array(column.to_numpy())
+            else:
+                array = pa.array(column, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object columns (e.g. kloppy qualifiers) are kept as text
+            array = pa.array(column.astype(str), from_pandas=True)
+        if (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)) and len(column) > 0 and column.nunique() <= len(column) * DICTIONARY_MAX_UNIQUE_RATIO:
+            array = array.dictionary_encode()
+        columns[str(name)] = array
+    return pa.table(columns)
+
+
+def write_table(df, path):
+    """
+    Write a DataFrame as an uncompressed Arrow IPC file and swap it in atomically
+
+    Uncompressed IPC is what makes memory-mapped reads zero-copy. Readers
+    that already mapped the previous file keep their (unlinked) copy until
+    they reopen, so a refresh never tears a read.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = _to_arrow(df)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_table(path):
+    """
+    Memory-map an Arrow IPC file read-only; buffers point into the page cache
+    """
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def read_frame(path):
+    """
+    Memory-mapped Arrow file as a pandas DataFrame
+
+    split_blocks keeps numeric columns as views on the mapped buffers instead
+    of consolidating them into fresh 2-D blocks. That holds for columns
+    without Arrow nulls, which is why write_table stores float NaN as a
+    value. Columns that still copy into each reader's memory are integer
+    columns with nulls (read back as float) and, before pandas 3, string
+    columns that are not dictionary-encoded (read back as Python objects).
+    """
+    return read_table(path).to_pandas(split_blocks=True)
+
+
+def version(path):
+    """
+    Cheap change token for a published file (changes on every atomic swap)
+    """
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def publish(competition_id=743, data_dir=DATA_DIR, **kwargs):
+    """
+    Build the leaderboard and scored shots and publish both as Arrow files
+    """
+    from data_loader import get_leaderboard_data
+
+    shot_sdq_df, leaderboard_df, _, quarantine_df, _ = get_leaderboard_data(
+        competition_id=competition_id, return_quarantine=True, **kwargs
+    )
+    if leaderboard_df.empty:
+        print("ERROR: Nothing to publish")
+        return None
+
+    return publish_frames(shot_sdq_df, leaderboard_df, competition_id=competition_id, data_dir=data_dir,
+                          quarantine_df=quarantine_df)
+
+
+def publish_frames(shot_sdq_df, leaderboard_df, competition_id=743, data_dir=DATA_DIR, quarantine_df=None):
+    """
+    Publish an already built leaderboard and its scored shots; returns the leaderboard path
+
+    quarantine_df: shots validation excluded (with 'quarantine_reason'),
+    published as the 'quarantine' table so consumers can see what was left
+    out and why
+    """
+    from leaderboard_snapshots import save_snapshot
+
+    write_table(shot_sdq_df, table_path('shots', competition_id, data_dir))
+    write_table(leaderboard_df, table_path('leaderboard', competition_id, data_dir))
+    if quarantine_df is not None:
+        columns = [c for c in QUARANTINE_COLUMNS if c in quarantine_df.columns]
+        write_table(quarantine_df[columns].reset_index(drop=True), table_path('quarantine', competition_id, data_dir))
+    snapshot_id = save_snapshot(leaderboard_df, competition_id=competition_id)
+    print(f"✓ Published {len(leaderboard_df)} players and {len(shot_sdq_df)} shots to {data_dir} (snapshot {snapshot_id})")
+    return table_path('leaderboard', competition_id, data_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish leaderboard and scored shots as memory-mappable Arrow files")
+    parser.add_argument('--competition-id', type=int, default=743)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    publish(competition_id=args.competition_id, data_dir=args.data_dir)
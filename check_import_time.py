@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+
+
+# Modules that must stay importable without loading the plotting / I/O stack
+LIGHT_MODULES = ['shot_decision_quality', 'data_loader', 'aggregation_cube', 'leaderboard_cache', 'shotchart']
+
+HEAVY_MODULES = [
+    'matplotlib', 'mplsoccer', 'seaborn', 'kloppy', 'polars', 'requests',
+    'scipy', 'pyarrow', 'streamlit', 'plotly',
+]
+
+# Cumulative import budget per module, in milliseconds
+BUDGET_MS = 1500
+
+# The modules are imported from the repository, wherever the script is run from
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module):
+    """
+    Import a module in a fresh interpreter under -X importtime
+
+    Returns:
+        total_ms: cumulative import time of the module itself
+        loaded: set of top-level package names imported along the way
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=REPO_DIR
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    total_ms = 0.0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        if not cumulative.isdigit():
+            continue
+        loaded.add(name.split('.')[0])
+        if name == module:
+            total_ms = int(cumulative) / 1000
+    return total_ms, loaded
+
+
+def check(modules=LIGHT_MODULES, budget_ms=BUDGET_MS):
+    """
+    Print import time and stray heavy dependencies for each module
+
+    Returns:
+        True if every module is within budget and imports no heavy module
+    """
+    _, baseline = import_profile('pandas')
+    ok = True
+    for module in modules:
+        total_ms, loaded = import_profile(module)
+        # Whatever pandas/numpy load themselves (e.g. pyarrow) is not counted
+        heavy = sorted(loaded.intersection(HEAVY_MODULES) - baseline)
+        status = '✓' if not heavy and total_ms <= budget_ms else '✗'
+        ok = ok and status == '✓'
+        print(f"{status} {module}: {total_ms:.0f} ms" + (f" (pulls in {', '.join(heavy)})" if heavy else ''))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check(sys.argv[1:] or LIGHT_MODULES) else 1)
@@ -1,8 +1,14 @@
+import os
+import time
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 
+from metric_normalization import MIN_SHOTS
+
 # Page configuration
 st.set_page_config(
     page_title="SDQ Analysis - Bundesliga 2023/24",
@@ -34,17 +40,274 @@ st.markdown("""
 # DATA LOADING
 # ============================================================================
 
-@st.cache_data
+@st.cache_resource(max_entries=4)
+def open_arrow_frame(path, version):
+    """
+    Memory-map a published Arrow file once per server process
+
+    cache_resource hands every session the same object (no pickling or
+    per-access copies); version changes whenever the file is swapped.
+    """
+    import arrow_store
+    
+    return arrow_store.read_frame(path)
+
+
+@st.cache_resource
+def start_progressive_build():
+    """
+    Cold-start ingestion in a background thread, started once per server process
+    """
+    import threading
+    from progressive_leaderboard import progressive_build
+    # data_loader imports polars lazily; importing it here first means the
+    # plotting stack (which probes sys.modules for polars) never sees a
+    # half-imported module from the build thread
+    import polars
+    
+    build = threading.Thread(target=progressive_build, kwargs={'competition_id': 743}, daemon=True)
+    build.start()
+    return build
+
+
 def load_player_data():
     """
     Load player leaderboard data from SDQ calculations
+    
+    Reads the shared Arrow snapshot. On a cold start (nothing published yet)
+    the data is ingested in the background and the latest approximate
+    leaderboard is returned meanwhile; it carries matches_processed /
+    matches_total and per-player SDQ intervals.
     """
-    from data_loader import get_leaderboard
+    import arrow_store
+    from progressive_leaderboard import partial_path, build_in_progress
+    
+    path = arrow_store.table_path('leaderboard', competition_id=743)
+    partial = partial_path(competition_id=743)
+    if not os.path.exists(path):
+        # Only one replica builds (the others' threads return at once); every
+        # replica waits on whichever build holds the lock
+        build = start_progressive_build()
+        
+        def building():
+            return build.is_alive() or build_in_progress(competition_id=743)
+        
+        while not os.path.exists(path) and not os.path.exists(partial) and building():
+            time.sleep(0.5)
+        # A partial is only current while the build that writes it is running
+        if not os.path.exists(path) and os.path.exists(partial) and building():
+            try:
+                return open_arrow_frame(partial, arrow_store.version(partial))
+            except FileNotFoundError:
+                # The exact leaderboard replaced it in the meantime
+                pass
+        if not os.path.exists(path):
+            # Let the next page load start a fresh build
+            start_progressive_build.clear()
+            st.error("No leaderboard could be built - check the data load logs.")
+            st.stop()
+    
+    return open_arrow_frame(path, arrow_store.version(path))
+
+@st.cache_data
+def load_movers(old_snapshot_id, new_snapshot_id):
+    """
+    Rank/SDQ diff between two snapshots (snapshots are immutable, so ids are the cache key)
+    """
+    from leaderboard_snapshots import diff_snapshots, load_snapshot
+    
+    return diff_snapshots(load_snapshot(old_snapshot_id), load_snapshot(new_snapshot_id))
+
+@st.cache_data(max_entries=8)
+def rank_within_pool(df, min_shots):
+    """
+    Percentiles and z-scores re-ranked among players with at least min_shots shots
+    """
+    from metric_normalization import add_normalized_metrics
+    
+    return add_normalized_metrics(df, min_shots=min_shots)
+
+@st.cache_resource(max_entries=4)
+def build_similarity_index(df):
+    """
+    Similar-shooter index, built once per distinct player pool and shared by sessions
+    """
+    from player_similarity import PlayerSimilarityIndex
+    
+    return PlayerSimilarityIndex(df)
+
+# Above this many players the scatter is thinned by density by default
+MAX_SCATTER_POINTS = 3000
+
+# Order matches the Q1-Q4 numbering used in the insights section
+QUADRANT_NAMES = ['Elite Shots', 'Making the Most', 'Forced Shots', 'Wasted Opportunities']
+
+
+@st.cache_data
+def classify_quadrants(df):
+    """
+    Median thresholds, quadrant counts and top-3 players per quadrant (one pass)
+    """
+    sdq_threshold = df['overall_sdq'].median()
+    conv_threshold = df['conversion_rate'].median()
+    
+    high_sdq = (df['overall_sdq'] >= sdq_threshold).to_numpy()
+    high_conv = (df['conversion_rate'] >= conv_threshold).to_numpy()
+    masks = {
+        'Elite Shots': high_conv & high_sdq,
+        'Making the Most': ~high_conv & high_sdq,
+        'Forced Shots': ~high_conv & ~high_sdq,
+        'Wasted Opportunities': high_conv & ~high_sdq,
+    }
+    
+    top = {}
+    for name, mask in masks.items():
+        players = df[mask]
+        # High-SDQ quadrants list the best SDQ, low-SDQ quadrants the worst
+        players = players.nlargest(3, 'overall_sdq') if name in ('Elite Shots', 'Making the Most') else players.nsmallest(3, 'overall_sdq')
+        top[name] = players[['player_name', 'overall_sdq', 'conversion_rate']].to_dict('records')
+    
+    return {
+        'sdq_threshold': sdq_threshold,
+        'conv_threshold': conv_threshold,
+        'counts': {name: int(mask.sum()) for name, mask in masks.items()},
+        'top': top,
+    }
+
+
+@st.cache_data
+def downsample_by_density(df, max_points, bins=60, seed=0):
+    """
+    Thin overplotted areas: cap the number of points per grid cell so the total
+    fits max_points; sparse cells (outliers) are always kept in full
+    """
+    if len(df) <= max_points:
+        return df
+    
+    x = df['conversion_rate'].to_numpy(dtype=float)
+    y = df['overall_sdq'].to_numpy(dtype=float)
+    x_bin = np.clip(((x - x.min()) / (np.ptp(x) or 1) * bins).astype(int), 0, bins - 1)
+    y_bin = np.clip(((y - y.min()) / (np.ptp(y) or 1) * bins).astype(int), 0, bins - 1)
+    cells = x_bin * bins + y_bin
+    
+    # Largest per-cell cap whose total stays within max_points
+    counts = np.sort(np.bincount(cells))[::-1]
+    counts = counts[counts > 0]
+    cap = 1
+    for candidate in range(1, int(counts[0]) + 1):
+        if np.minimum(counts, candidate).sum() > max_points:
+            break
+        cap = candidate
+    
+    # Random rank within each cell, keep the first `cap`
+    order = np.random.default_rng(seed).permutation(len(df))
+    shuffled_cells = pd.Series(cells[order])
+    rank = np.empty(len(df), dtype=int)
+    rank[order] = shuffled_cells.groupby(shuffled_cells).cumcount().to_numpy()
+    
+    return df[rank < cap]
+
+
+@st.cache_data
+def build_quadrant_scatter(df, color_by, show_labels, sdq_threshold, conv_threshold):
+    """
+    WebGL scatter of SDQ vs conversion with median quadrant lines
+    """
+    fig_scatter = go.Figure()
+    
+    hovertemplate = ('<b>%{customdata[0]}</b><br>' +
+                     'Team: %{customdata[1]}<br>' +
+                     'Position: %{customdata[2]}<br>' +
+                     'SDQ: %{y:.1f}<br>' +
+                     'Conversion %: %{x:.1f}<br>' +
+                     'Goals: %{customdata[3]}<br>' +
+                     'Shots: %{customdata[4]}<br>' +
+                     '<extra></extra>')
+    
+    if color_by in ['position', 'team']:
+        # Categorical coloring (palette repeats if there are more categories than colors)
+        palette = px.colors.qualitative.Set2
+        for i, (category, category_data) in enumerate(df.groupby(color_by, sort=False, observed=True)):
+            fig_scatter.add_trace(go.Scattergl(
+                x=category_data['conversion_rate'],
+                y=category_data['overall_sdq'],
+                mode='markers+text' if show_labels else 'markers',
+                name=str(category),
+                text=category_data['player_name'] if show_labels else None,
+                textposition="top center",
+                marker=dict(
+                    size=14,
+                    color=palette[i % len(palette)],
+                    line=dict(width=1, color='white'),
+                    opacity=0.7
+                ),
+                hovertemplate=hovertemplate,
+                customdata=category_data[['player_name', 'team', 'position', 'goals', 'total_shots']].values
+            ))
+    else:
+        # Continuous coloring (goals)
+        fig_scatter.add_trace(go.Scattergl(
+            x=df['conversion_rate'],
+            y=df['overall_sdq'],
+            mode='markers+text' if show_labels else 'markers',
+            text=df['player_name'] if show_labels else None,
+            textposition="top center",
+            marker=dict(
+                size=14,
+                color=df['goals'],
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Goals"),
+                line=dict(width=1, color='white'),
+                opacity=0.7
+            ),
+            hovertemplate=hovertemplate,
+            customdata=df[['player_name', 'team', 'position', 'goals', 'total_shots']].values,
+            showlegend=False
+        ))
     
-    # Load the leaderboard
-    df = get_leaderboard(competition_id=743, min_shots=1)
+    # Add quadrant lines
+    fig_scatter.add_hline(
+        y=sdq_threshold,
+        line_dash="dash",
+        line_color="gray",
+        opacity=0.5,
+        annotation_text=f"Median SDQ: {sdq_threshold:.1f}",
+        annotation_position="right"
+    )
+    
+    fig_scatter.add_vline(
+        x=conv_threshold,
+        line_dash="dash",
+        line_color="gray",
+        opacity=0.5,
+        annotation_text=f"Median Conversion %: {conv_threshold:.1f}",
+        annotation_position="top"
+    )
     
-    return df
+    # Add quadrant labels
+    max_x = df['conversion_rate'].max()
+    max_y = df['overall_sdq'].max()
+    min_x = df['conversion_rate'].min()
+    min_y = df['overall_sdq'].min()
+    
+    quadrant_annotations = [
+        dict(x=max_x * 0.85, y=max_y * 0.95, text="Elite Shots<br>", showarrow=False, font=dict(size=12, color="green")),
+        dict(x=min_x * 1.15, y=max_y * 0.95, text="Making the Most<br>", showarrow=False, font=dict(size=12, color="blue")),
+        dict(x=max_x * 0.85, y=min_y * 1.05, text="Wasted Opportunities<br>", showarrow=False, font=dict(size=12, color="orange")),
+        dict(x=min_x * 1.15, y=min_y * 1.05, text="Forced Shots<br>", showarrow=False, font=dict(size=12, color="red"))
+    ]
+    
+    fig_scatter.update_layout(
+        title='Shot Decision Quality vs Conversion Rate - Bundesliga 2023/24',
+        xaxis_title='Conversion Rate (%)',
+        yaxis_title='Shot Decision Quality (SDQ, 0-100)',
+        height=700,
+        hovermode='closest',
+        annotations=quadrant_annotations
+    )
+    
+    return fig_scatter
 
 # ============================================================================
 # LOAD DATA
@@ -53,12 +316,28 @@ def load_player_data():
 with st.spinner("Loading Bundesliga data... This may take a minute on first load."):
     player_df = load_player_data()
 
+# Approximate leaderboard published while a cold start is still ingesting
+is_partial = 'matches_processed' in player_df.columns
+
+# Seconds between reruns while the leaderboard is approximate
+PROGRESS_REFRESH_SECONDS = 5
+
 # ============================================================================
 # HEADER
 # ============================================================================
 
 st.markdown('<p class="main-header">⚽ Shot Decision Quality Analysis</p>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Bundesliga 2023/24 Season</p>', unsafe_allow_html=True)
+
+if is_partial:
+    processed = int(player_df['matches_processed'].iloc[0])
+    total = int(player_df['matches_total'].iloc[0])
+    st.progress(
+        processed / total if total else 0.0,
+        text=f"Approximate leaderboard from {processed} of {total} matches - refining as data loads"
+    )
+    st.caption("Rankings are based on a random sample of matches; the SDQ range column is a 95% interval.")
+
 st.markdown("---")
 
 # ============================================================================
@@ -97,6 +376,11 @@ team_filter = st.sidebar.multiselect(
 # Apply filters
 filtered_df = player_df[player_df['total_shots'] >= min_shots_global].copy()
 
+# Published percentiles rank players with at least MIN_SHOTS shots; a stricter
+# minimum re-ranks them among the players still shown
+if min_shots_global > MIN_SHOTS and any(c.endswith('_pct') for c in filtered_df.columns):
+    filtered_df = rank_within_pool(filtered_df.reset_index(drop=True), min_shots_global)
+
 if 'All' not in position_filter and len(position_filter) > 0:
     filtered_df = filtered_df[filtered_df['position'].isin(position_filter)]
 
@@ -113,7 +397,7 @@ st.sidebar.info(f"**{len(filtered_df)}** players match current filters")
 # CREATE TABS
 # ============================================================================
 
-tab1, tab2, tab3 = st.tabs(["Leaderboard", "Player Comparison", "SDQ vs Conversion % Analysis"])
+tab1, tab2, tab3, tab4 = st.tabs(["Leaderboard", "Player Comparison", "SDQ vs Conversion % Analysis", "🔴 Live"])
 
 # ============================================================================
 # TAB 1: LEADERBOARD
@@ -128,9 +412,10 @@ with tab1:
     with col_sort:
         sort_by = st.selectbox(
             "Sort By",
-            options=['overall_sdq', 'goals', 'conversion_rate', 'total_shots', 'consistency'],
+            options=['overall_sdq'] + (['adjusted_sdq'] if 'adjusted_sdq' in filtered_df.columns else []) + ['goals', 'conversion_rate', 'total_shots', 'consistency'],
             format_func=lambda x: {
                 'overall_sdq': 'SDQ Score',
+                'adjusted_sdq': 'Opponent-Adjusted SDQ',
                 'goals': 'Goals',
                 'conversion_rate': 'Conversion Rate (%)',
                 'total_shots': 'Total Shots',
@@ -175,10 +460,20 @@ with tab1:
         if col in table_df.columns:
             table_df[col] = table_df[col].round(1)
     
+    table_cols = ['Rank', 'player_name', 'team', 'position', 'overall_sdq', 
+                  'total_shots', 'goals', 'conversion_rate']
+    if 'adjusted_sdq' in table_df.columns:
+        table_df['adjusted_sdq'] = table_df['adjusted_sdq'].round(1)
+        table_cols.insert(5, 'adjusted_sdq')
+    if is_partial:
+        table_df['sdq_range'] = table_df['sdq_low'].round(1).astype(str) + ' - ' + table_df['sdq_high'].round(1).astype(str)
+        table_cols.insert(5, 'sdq_range')
+    
     # Display table
     st.dataframe(
-        table_df[['Rank', 'player_name', 'team', 'position', 'overall_sdq', 
-                'total_shots', 'goals', 'conversion_rate']].rename(columns={
+        table_df[table_cols].rename(columns={
+            'sdq_range': 'SDQ range',
+            'adjusted_sdq': 'Opp. Adj. SDQ',
             'player_name': 'Player',
             'team': 'Team',
             'position': 'Position',
@@ -191,7 +486,82 @@ with tab1:
         use_container_width=True,
         height=500
     )
-    
+
+    # Export of the filtered players (all of them, not just the top 20),
+    # streamed from the published Arrow files in bounded chunks
+    with st.expander("⬇️ Export"):
+        import arrow_store
+        from export_stream import (
+            export_path, export_published, file_name, read_export, DOWNLOAD_MAX_BYTES, MIME_TYPES,
+            PARQUET_COMPRESSION, TEXT_COMPRESSION
+        )
+        from progressive_leaderboard import PARTIAL_TABLE
+
+        export_sources = {'leaderboard': 'Leaderboard (filtered players)'}
+        if not is_partial and os.path.exists(arrow_store.table_path('shots', competition_id=743)):
+            export_sources['shots'] = 'Scored shots (filtered players)'
+
+        col_what, col_format, col_compression = st.columns(3)
+        with col_what:
+            export_table = st.selectbox("Data", options=list(export_sources), format_func=export_sources.get)
+        with col_format:
+            export_format = st.selectbox("Format", options=['csv', 'parquet', 'jsonl'],
+                                         format_func={'csv': 'CSV', 'parquet': 'Parquet', 'jsonl': 'JSON Lines'}.get)
+        with col_compression:
+            compression_options = PARQUET_COMPRESSION if export_format == 'parquet' else list(TEXT_COMPRESSION)
+            export_compression = st.selectbox("Compression", options=compression_options,
+                                              format_func=lambda c: 'none' if c is None else c)
+
+        source_table = PARTIAL_TABLE if is_partial and export_table == 'leaderboard' else export_table
+        export_options = dict(
+            competition_id=743, fmt=export_format, compression=export_compression,
+            filters={'player_id': filtered_df['player_id'].tolist()}
+        )
+        if export_table == 'leaderboard' and min_shots_global > MIN_SHOTS:
+            # Same percentiles and z-scores as on screen
+            export_options['min_shots'] = min_shots_global
+        path = export_path(source_table, **export_options)
+
+        if not os.path.exists(path):
+            if st.button("Prepare export", help=f"{len(filtered_df)} players; written in chunks and reused until the data changes"):
+                with st.spinner("Writing export..."):
+                    path = export_published(source_table, **export_options)
+
+        try:
+            # Mark as in use so pruning by other sessions leaves it alone
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = None
+        if size is not None:
+            if size <= DOWNLOAD_MAX_BYTES:
+                st.download_button(
+                    f"Download ({size / 1024 ** 2:.1f} MB)",
+                    # Read only when clicked
+                    data=lambda path=path: read_export(path),
+                    file_name=file_name(f'{export_table}_743', export_format, export_compression),
+                    mime=MIME_TYPES[export_format] if export_compression is None or export_format == 'parquet' else 'application/octet-stream'
+                )
+            else:
+                st.info(
+                    f"The export is {size / 1024 ** 2:.0f} MB, above the {DOWNLOAD_MAX_BYTES / 1024 ** 2:.0f} MB "
+                    f"download limit (Streamlit holds downloads in memory). It was written to `{path}`."
+                )
+
+    # Shots left out of every statistic by validation (published with the leaderboard)
+    quarantine_path = arrow_store.table_path('quarantine', competition_id=743)
+    if not is_partial and os.path.exists(quarantine_path):
+        quarantine_df = open_arrow_frame(quarantine_path, arrow_store.version(quarantine_path))
+        if len(quarantine_df) > 0:
+            with st.expander(f"🚫 {len(quarantine_df)} shots excluded by validation"):
+                reasons = quarantine_df['quarantine_reason'].astype(str).str.split(';').explode()
+                st.dataframe(
+                    reasons.value_counts().rename_axis('Reason').reset_index(name='Shots'),
+                    hide_index=True,
+                    use_container_width=True
+                )
+                st.dataframe(quarantine_df, hide_index=True, use_container_width=True)
+
     # Expandable detailed components
     with st.expander("📊 View Detailed SDQ Components"):
         component_df = table_df[['Rank', 'player_name', 'avg_location_score', 
@@ -216,6 +586,37 @@ with tab1:
             use_container_width=True
         )
     
+    # Rank movement since the previous published leaderboard
+    from leaderboard_snapshots import list_snapshots
+    
+    snapshots = list_snapshots(competition_id=743)
+    if len(snapshots) >= 2:
+        st.subheader("🔀 Movers Since Last Update")
+        movers = load_movers(snapshots[-2], snapshots[-1])
+        movers = movers[movers['player_id'].isin(display_df['player_id'])]
+        moved = movers[movers['status'] == 'moved']
+        
+        mover_columns = {
+            'player_name': 'Player',
+            'team': 'Team',
+            'rank_old': 'Prev Rank',
+            'rank_new': 'Rank',
+            'rank_change': 'Move',
+            'sdq_delta': 'SDQ Δ'
+        }
+        
+        col_up, col_down = st.columns(2)
+        with col_up:
+            st.markdown("**Biggest Risers**")
+            st.dataframe(moved.nlargest(5, 'rank_change')[list(mover_columns)].rename(columns=mover_columns).round(1),
+                         hide_index=True, use_container_width=True)
+        with col_down:
+            st.markdown("**Biggest Fallers**")
+            st.dataframe(moved.nsmallest(5, 'rank_change')[list(mover_columns)].rename(columns=mover_columns).round(1),
+                         hide_index=True, use_container_width=True)
+        
+        st.caption(f"{int((movers['status'] == 'new').sum())} new entrants since the previous snapshot")
+    
     st.markdown("---")
     
     # Top 5 players component breakdown
@@ -339,6 +740,8 @@ with tab2:
         selected_players.append(player3)
     
     comparison_df = filtered_df[filtered_df['player_name'].isin(selected_players)].copy()
+    # One row per name, looked up by label instead of re-filtering per metric
+    player_rows = comparison_df.drop_duplicates('player_name').set_index('player_name')
     
     if len(comparison_df) > 0:
         st.markdown("---")
@@ -353,7 +756,7 @@ with tab2:
         for metric, name in zip(metrics_to_show, metric_names):
             cols = st.columns(len(selected_players))
             for i, (player_name, col) in enumerate(zip(selected_players, cols)):
-                player_data = comparison_df[comparison_df['player_name'] == player_name].iloc[0]
+                player_data = player_rows.loc[player_name]
                 value = player_data[metric]
                 
                 if metric in ['conversion_rate', 'overall_sdq', 'consistency']:
@@ -366,7 +769,7 @@ with tab2:
                         st.metric(f"{name}", formatted_value, label_visibility="visible")
                     else:
                         # Calculate delta compared to player 1
-                        delta = value - comparison_df[comparison_df['player_name'] == selected_players[0]].iloc[0][metric]
+                        delta = value - player_rows.loc[selected_players[0], metric]
                         if metric in ['conversion_rate', 'overall_sdq', 'consistency']:
                             delta_str = f"{delta:+.1f}"
                         else:
@@ -378,6 +781,19 @@ with tab2:
         # Component comparison - Radar chart
         st.subheader("SDQ Component Profile")
         
+        # Percentiles are precomputed with the leaderboard (metric_normalization)
+        profile_metrics = ['avg_location_score', 'avg_pressure_score', 'avg_shot_type_score',
+                           'avg_timing_score', 'consistency']
+        has_percentiles = all(f'{metric}_pct' in comparison_df.columns for metric in profile_metrics)
+        normalized_profile = has_percentiles and st.toggle(
+            "Percentile within competition & position",
+            help="Rank each component among players of the same competition and position instead of the raw 0-100 score"
+        )
+        if normalized_profile:
+            profile_metrics = [f'{metric}_pct' for metric in profile_metrics]
+            if (player_rows['total_shots'] < MIN_SHOTS).any():
+                st.caption(f"Players with fewer than {MIN_SHOTS} shots are not ranked and have no percentile profile.")
+        
         fig_radar = go.Figure()
         
         categories = ['Location', 'Pressure', 'Shot Type', 'Timing', 'Consistency']
@@ -385,15 +801,9 @@ with tab2:
         colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
         
         for idx, player_name in enumerate(selected_players):
-            player_data = comparison_df[comparison_df['player_name'] == player_name].iloc[0]
+            player_data = player_rows.loc[player_name]
             
-            values = [
-                player_data['avg_location_score'],
-                player_data['avg_pressure_score'],
-                player_data['avg_shot_type_score'],
-                player_data['avg_timing_score'],
-                player_data['consistency']
-            ]
+            values = [player_data[metric] for metric in profile_metrics]
             
             fig_radar.add_trace(go.Scatterpolar(
                 r=values,
@@ -411,7 +821,7 @@ with tab2:
                 )),
             showlegend=True,
             height=500,
-            title="Component Scores Comparison (0-100 scale)"
+            title="Component Percentiles (within competition & position)" if normalized_profile else "Component Scores Comparison (0-100 scale)"
         )
         
         st.plotly_chart(fig_radar, use_container_width=True)
@@ -426,6 +836,9 @@ with tab2:
                        'avg_location_score', 'avg_pressure_score', 'avg_shot_type_score', 
                        'avg_timing_score', 'consistency']
         
+        if normalized_profile:
+            detail_cols += [f'{col}_pct' for col in detail_cols[3:] if f'{col}_pct' in comparison_df.columns]
+        
         detail_df = comparison_df[detail_cols].copy()
         
         # Round numeric columns
@@ -445,6 +858,57 @@ with tab2:
         
     else:
         st.warning("No players selected for comparison. Please select at least 2 players.")
+    
+    st.markdown("---")
+    
+    # Similar shooters - nearest neighbours over normalized component profiles
+    st.subheader("🔎 Similar Shooters")
+    st.caption(
+        "Nearest players by location, pressure, shot type, timing, consistency, "
+        "distance, angle and conversion (each standardized across the pool). "
+        "Searches every player with the minimum shots, regardless of position/team filters."
+    )
+    
+    similarity_pool = player_df[player_df['total_shots'] >= min_shots_global].reset_index(drop=True)
+    
+    if len(similarity_pool) > 1:
+        similarity_index = build_similarity_index(similarity_pool)
+        pool_names = similarity_pool.drop_duplicates('player_name').set_index('player_name')['player_id']
+        name_options = sorted(pool_names.index.tolist())
+        
+        col_player, col_k, col_team = st.columns([2, 1, 1])
+        with col_player:
+            similar_to = st.selectbox(
+                "Find players similar to",
+                options=name_options,
+                index=name_options.index(player1) if player1 in pool_names.index else 0,
+                key='similar_player_select'
+            )
+        with col_k:
+            n_similar = st.slider("Number of players", min_value=3, max_value=25, value=10, key='similar_k')
+        with col_team:
+            exclude_team = st.checkbox("Exclude teammates", value=True, key='similar_exclude_team')
+        
+        similar_df = similarity_index.similar(pool_names.loc[similar_to], k=n_similar, exclude_team=exclude_team)
+        
+        display_cols = {
+            'rank': 'Rank',
+            'similar_player_name': 'Player',
+            'similar_team': 'Team',
+            'similar_position': 'Position',
+            'similar_overall_sdq': 'SDQ',
+            'similar_total_shots': 'Shots',
+            'similarity': 'Similarity',
+        }
+        display_cols = {k: v for k, v in display_cols.items() if k in similar_df.columns}
+        similar_display = similar_df[list(display_cols)].rename(columns=display_cols)
+        for col in ('SDQ', 'Similarity'):
+            if col in similar_display.columns:
+                similar_display[col] = similar_display[col].round(2 if col == 'Similarity' else 1)
+        
+        st.dataframe(similar_display, use_container_width=True, hide_index=True)
+    else:
+        st.info("Not enough players with the minimum shots for a similarity search.")
 
 # ============================================================================
 # TAB 3: SDQ VS CONVERSION RATE ANALYSIS
@@ -483,114 +947,23 @@ with tab3:
     with col2:
         show_labels = st.checkbox("Show Player Names", value=False)
     
-    # Calculate quadrant thresholds (median values)
-    sdq_threshold = filtered_df['overall_sdq'].median()
-    conv_threshold = filtered_df['conversion_rate'].median()
-    
-    # Create scatter plot
-    fig_scatter = go.Figure()
-    
-    # Color settings
-    if color_by in ['position', 'team']:
-        # Categorical coloring
-        unique_categories = filtered_df[color_by].unique()
-        color_map = dict(zip(unique_categories, px.colors.qualitative.Set2[:len(unique_categories)]))
-        
-        for category in unique_categories:
-            category_data = filtered_df[filtered_df[color_by] == category]
-            
-            fig_scatter.add_trace(go.Scatter(
-                x=category_data['conversion_rate'],
-                y=category_data['overall_sdq'],
-                mode='markers+text' if show_labels else 'markers',
-                name=str(category),
-                text=category_data['player_name'] if show_labels else None,
-                textposition="top center",
-                marker=dict(
-                    size=14,
-                    color=color_map[category],
-                    line=dict(width=1, color='white'),
-                    opacity=0.7
-                ),
-                hovertemplate='<b>%{customdata[0]}</b><br>' +
-                             'Team: %{customdata[1]}<br>' +
-                             'Position: %{customdata[2]}<br>' +
-                             'SDQ: %{y:.1f}<br>' +
-                             'Conversion %: %{x:.1f}<br>' +
-                             'Goals: %{customdata[3]}<br>' +
-                             'Shots: %{customdata[4]}<br>' +
-                             '<extra></extra>',
-                customdata=category_data[['player_name', 'team', 'position', 'goals', 'total_shots']].values
-            ))
-    else:
-        # Continuous coloring (goals)
-        fig_scatter.add_trace(go.Scatter(
-            x=filtered_df['conversion_rate'],
-            y=filtered_df['overall_sdq'],
-            mode='markers+text' if show_labels else 'markers',
-            text=filtered_df['player_name'] if show_labels else None,
-            textposition="top center",
-            marker=dict(
-                size=14,
-                color=filtered_df['goals'],
-                colorscale='Viridis',
-                showscale=True,
-                colorbar=dict(title="Goals"),
-                line=dict(width=1, color='white'),
-                opacity=0.7
-            ),
-            hovertemplate='<b>%{customdata[0]}</b><br>' +
-                         'Team: %{customdata[1]}<br>' +
-                         'Position: %{customdata[2]}<br>' +
-                         'SDQ: %{y:.1f}<br>' +
-                         'Conversion %: %{x:.1f}<br>' +
-                         'Goals: %{customdata[3]}<br>' +
-                         'Shots: %{customdata[4]}<br>' +
-                         '<extra></extra>',
-            customdata=filtered_df[['player_name', 'team', 'position', 'goals', 'total_shots']].values,
-            showlegend=False
-        ))
-    
-    # Add quadrant lines
-    fig_scatter.add_hline(
-        y=sdq_threshold,
-        line_dash="dash",
-        line_color="gray",
-        opacity=0.5,
-        annotation_text=f"Median SDQ: {sdq_threshold:.1f}",
-        annotation_position="right"
-    )
-    
-    fig_scatter.add_vline(
-        x=conv_threshold,
-        line_dash="dash",
-        line_color="gray",
-        opacity=0.5,
-        annotation_text=f"Median Conversion %: {conv_threshold:.1f}",
-        annotation_position="top"
-    )
+    # Quadrant split, counts and top-3 lists are computed once per filter state
+    quadrants = classify_quadrants(filtered_df)
+    sdq_threshold = quadrants['sdq_threshold']
+    conv_threshold = quadrants['conv_threshold']
     
-    # Add quadrant labels
-    max_x = filtered_df['conversion_rate'].max()
-    max_y = filtered_df['overall_sdq'].max()
-    min_x = filtered_df['conversion_rate'].min()
-    min_y = filtered_df['overall_sdq'].min()
+    with col3:
+        downsample = st.checkbox(
+            "Thin Dense Regions",
+            value=len(filtered_df) > MAX_SCATTER_POINTS,
+            help=f"Keep at most {MAX_SCATTER_POINTS} points, thinning only the most overplotted areas"
+        )
     
-    quadrant_annotations = [
-        dict(x=max_x * 0.85, y=max_y * 0.95, text="Elite Shots<br>", showarrow=False, font=dict(size=12, color="green")),
-        dict(x=min_x * 1.15, y=max_y * 0.95, text="Making the Most<br>", showarrow=False, font=dict(size=12, color="blue")),
-        dict(x=max_x * 0.85, y=min_y * 1.05, text="Wasted Opportunities<br>", showarrow=False, font=dict(size=12, color="orange")),
-        dict(x=min_x * 1.15, y=min_y * 1.05, text="Forced Shots<br>", showarrow=False, font=dict(size=12, color="red"))
-    ]
+    plot_df = downsample_by_density(filtered_df, MAX_SCATTER_POINTS) if downsample else filtered_df
+    if len(plot_df) < len(filtered_df):
+        st.caption(f"Showing {len(plot_df)} of {len(filtered_df)} players (dense regions thinned; quadrant stats use all players)")
     
-    fig_scatter.update_layout(
-        title='Shot Decision Quality vs Conversion Rate - Bundesliga 2023/24',
-        xaxis_title='Conversion Rate (%)',
-        yaxis_title='Shot Decision Quality (SDQ, 0-100)',
-        height=700,
-        hovermode='closest',
-        annotations=quadrant_annotations
-    )
+    fig_scatter = build_quadrant_scatter(plot_df, color_by, show_labels, sdq_threshold, conv_threshold)
     
     st.plotly_chart(fig_scatter, use_container_width=True)
     
@@ -599,11 +972,8 @@ with tab3:
     # Insights section
     st.subheader("🔍 Key Insights")
     
-    # Calculate quadrant populations
-    q1 = len(filtered_df[(filtered_df['conversion_rate'] >= conv_threshold) & (filtered_df['overall_sdq'] >= sdq_threshold)])
-    q2 = len(filtered_df[(filtered_df['conversion_rate'] < conv_threshold) & (filtered_df['overall_sdq'] >= sdq_threshold)])
-    q3 = len(filtered_df[(filtered_df['conversion_rate'] < conv_threshold) & (filtered_df['overall_sdq'] < sdq_threshold)])
-    q4 = len(filtered_df[(filtered_df['conversion_rate'] >= conv_threshold) & (filtered_df['overall_sdq'] < sdq_threshold)])
+    # Quadrant populations
+    q1, q2, q3, q4 = (quadrants['counts'][name] for name in QUADRANT_NAMES)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -622,53 +992,121 @@ with tab3:
     # Top performers in each quadrant
     st.markdown("### Top 3 Players in Each Quadrant")
     
+    quadrant_titles = {
+        'Elite Shots': "**Elite Shots (High Conversion % + High SDQ)**",
+        'Making the Most': "**Making the Most (Low Conversion % + High SDQ)**",
+        'Forced Shots': "**Forced Shots (Low Conversion % + Low SDQ)**",
+        'Wasted Opportunities': "**Wasted Opportunities (High Conversion % + Low SDQ)**",
+    }
+    
     col1, col2 = st.columns(2)
     
-    with col1:
-        # Elite Shots (Q1)
-        q1_players = filtered_df[(filtered_df['conversion_rate'] >= conv_threshold) & 
-                                 (filtered_df['overall_sdq'] >= sdq_threshold)].nlargest(3, 'overall_sdq')
-        st.markdown("**Elite Shots (High Conversion % + High SDQ)**")
-        if len(q1_players) > 0:
-            for idx, player in q1_players.iterrows():
-                st.write(f"{player['player_name']} - SDQ: {player['overall_sdq']:.1f}, Conversion %: {player['conversion_rate']:.1f}")
-        else:
-            st.write("No players in this quadrant")
-        
-        # Forced Shots (Q3)
-        q3_players = filtered_df[(filtered_df['conversion_rate'] < conv_threshold) & 
-                                 (filtered_df['overall_sdq'] < sdq_threshold)].nsmallest(3, 'overall_sdq')
-        st.markdown("**Forced Shots (Low Conversion % + Low SDQ)**")
-        if len(q3_players) > 0:
-            for idx, player in q3_players.iterrows():
-                st.write(f"{player['player_name']} - SDQ: {player['overall_sdq']:.1f}, Conversion %: {player['conversion_rate']:.1f}")
-        else:
-            st.write("No players in this quadrant")
+    for col, names in ((col1, ['Elite Shots', 'Forced Shots']), (col2, ['Making the Most', 'Wasted Opportunities'])):
+        with col:
+            for name in names:
+                st.markdown(quadrant_titles[name])
+                top_players = quadrants['top'][name]
+                if len(top_players) > 0:
+                    for player in top_players:
+                        st.write(f"{player['player_name']} - SDQ: {player['overall_sdq']:.1f}, Conversion %: {player['conversion_rate']:.1f}")
+                else:
+                    st.write("No players in this quadrant")
+
+# ============================================================================
+# TAB 4: LIVE MATCH
+# ============================================================================
+
+# Seconds between polls of the live state; only the live panel reruns
+LIVE_REFRESH_SECONDS = 2
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_panel():
+    """
+    In-match SDQ published by live_match.follow (re-read on every poll)
+    """
+    import live_match
     
-    with col2:
-        # Making the Most (Q2)
-        q2_players = filtered_df[(filtered_df['conversion_rate'] < conv_threshold) & 
-                                 (filtered_df['overall_sdq'] >= sdq_threshold)].nlargest(3, 'overall_sdq')
-        st.markdown("**Making the Most (Low Conversion % + High SDQ)**")
-        if len(q2_players) > 0:
-            for idx, player in q2_players.iterrows():
-                st.write(f"{player['player_name']} - SDQ: {player['overall_sdq']:.1f}, Conversion %: {player['conversion_rate']:.1f}")
-        else:
-            st.write("No players in this quadrant")
-        
-        # Wasted Opportunities (Q4)
-        q4_players = filtered_df[(filtered_df['conversion_rate'] >= conv_threshold) & 
-                                 (filtered_df['overall_sdq'] < sdq_threshold)].nsmallest(3, 'overall_sdq')
-        st.markdown("**Wasted Opportunities (High Conversion % + Low SDQ)**")
-        if len(q4_players) > 0:
-            for idx, player in q4_players.iterrows():
-                st.write(f"{player['player_name']} - SDQ: {player['overall_sdq']:.1f}, Conversion %: {player['conversion_rate']:.1f}")
-        else:
-            st.write("No players in this quadrant")
+    matches = live_match.list_live_matches()
+    if not matches:
+        st.info(
+            "No live match is being followed. Start one with "
+            "`python live_match.py follow <feed.jsonl> --match-id <id>`."
+        )
+        return
+    
+    match_ids = [status['match_id'] for status in matches]
+    selected = st.selectbox("Match", options=match_ids, key='live_match_select')
+    status = matches[match_ids.index(selected)]
+    
+    score = " - ".join(f"{team}: {goals}" for team, goals in status['score'].items())
+    minute = status['last_shot_minute']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Score", score or "-")
+    col2.metric("Shots", status['shots'])
+    col3.metric("Last shot", f"{minute:.0f}'" if minute is not None else "-")
+    col4.metric("Updated", f"{time.time() - status['updated_at']:.0f}s ago")
+    
+    prefix = os.path.join(live_match.LIVE_DIR, str(selected))
+    players_path = f'{prefix}_players.arrow'
+    shots_path = f'{prefix}_shots.arrow'
+    if not os.path.exists(players_path) or status['shots'] == 0:
+        st.write("No shots yet.")
+        return
+    
+    import arrow_store
+    
+    players_live = arrow_store.read_frame(players_path)
+    shots_live = arrow_store.read_frame(shots_path)
+    
+    st.subheader("Players this match")
+    st.dataframe(
+        players_live[['player_name', 'team', 'overall_sdq', 'total_shots', 'goals', 'avg_expected_value']].round(1).rename(columns={
+            'player_name': 'Player',
+            'team': 'Team',
+            'overall_sdq': 'SDQ',
+            'total_shots': 'Shots',
+            'goals': 'Goals',
+            'avg_expected_value': 'Avg EV'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    st.subheader("Latest shots")
+    recent_cols = [c for c in ['match_minute', 'team_id', 'player_id', 'sdq', 'shot_result', 'game_state'] if c in shots_live.columns]
+    recent = shots_live[recent_cols].iloc[::-1].head(10)
+    # Ids to the names the players table resolved
+    player_names = dict(zip(players_live['player_id'].astype(str), players_live['player_name']))
+    team_names = dict(zip(players_live['team_id'].astype(str), players_live['team']))
+    if 'player_id' in recent.columns:
+        recent['player_id'] = [player_names.get(str(p), str(p)) for p in recent['player_id']]
+    if 'team_id' in recent.columns:
+        recent['team_id'] = [team_names.get(str(t), str(t)) for t in recent['team_id']]
+    st.dataframe(
+        recent.round(1).rename(columns={
+            'match_minute': 'Minute',
+            'team_id': 'Team',
+            'player_id': 'Player',
+            'sdq': 'SDQ',
+            'shot_result': 'Result',
+            'game_state': 'Game State'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+with tab4:
+    st.header("Live Match SDQ")
+    live_panel()
 
 # ============================================================================
 # FOOTER
 # ============================================================================
 
 st.markdown("---")
-st.caption("Data: IMPECT Open Data (Bundesliga 2023/24) | Metric: Shot Decision Quality (SDQ)")
\ No newline at end of file
+st.caption("Data: IMPECT Open Data (Bundesliga 2023/24) | Metric: Shot Decision Quality (SDQ)")
+
+# Keep refreshing until the exact leaderboard replaces the approximate one
+if is_partial:
+    time.sleep(PROGRESS_REFRESH_SECONDS)
+    st.rerun()
\ No newline at end of file
@@ -1,10 +1,15 @@
-from shot_decision_quality import create_shot_analysis, generate_shot_leaderboard
-from kloppy import impect
+from shot_decision_quality import ShotDecisionQuality, create_shot_analysis
+from aggregation_cube import build_sdq_cube, player_leaderboard
+from metric_normalization import add_normalized_metrics, MIN_SHOTS
+from shot_validation import validate_shots, print_validation_summary
+from match_context import add_match_context
+import leaderboard_cache
 import pandas as pd
-import polars as pl
-import requests
 import io
-from kloppy.utils import github_resolve_raw_data_url
+
+# kloppy, polars and requests are imported inside the functions that fetch
+# data, so importing this module (e.g. for get_leaderboard's cache path or
+# from short-lived workers) does not pay for the I/O stack
 
 
 def load_metadata(competition_id=743):
@@ -15,6 +20,10 @@ def load_metadata(competition_id=743):
         players_df: DataFrame with player_id and player_name
         squads_df: DataFrame with squad_id and team_name
     """
+    import polars as pl
+    import requests
+    from kloppy.utils import github_resolve_raw_data_url
+    
     # Load players
     players_url = github_resolve_raw_data_url(
         repository="ImpectAPI/open-data",
@@ -38,10 +47,41 @@ def load_metadata(competition_id=743):
     return players, squads
 
 
-def load_shots(match_id, competition_id=743):
+def load_events(match_id, competition_id=743):
+    """
+    Load the full event stream of a single match
+    """
+    from kloppy import impect
+    
+    dataset = impect.load_open_data(
+        match_id=match_id,
+        competition_id=competition_id,
+    )
+
+    return (
+        dataset
+        .transform(to_coordinate_system="statsbomb")
+        .to_df(engine="pandas")
+    )
+
+
+def load_shots(match_id, competition_id=743, with_context=True):
     """
     Load shots from a single match
+    
+    with_context: scan the match's full event stream once and attach
+    possession context (counter-attack flag, possession duration, pass count,
+    time since regain) and game state (score differential, game state,
+    match minute) to every shot
+    
+    Shots always carry opponent_team_id (the other team of the match).
     """
+    from kloppy import impect
+    
+    if with_context:
+        events = add_match_context(load_events(match_id, competition_id=competition_id))
+        return events[events["event_type"] == "SHOT"].reset_index(drop=True)
+
     dataset = impect.load_open_data(
         match_id=match_id,
         competition_id=competition_id,
@@ -53,14 +93,26 @@ def load_shots(match_id, competition_id=743):
         .filter(lambda event: event.event_type.name in ["SHOT"])
         .to_df(engine="pandas")
     )
+    
+    # Shots alone may come from one team only, so take the pairing from metadata
+    teams = [team.team_id for team in dataset.metadata.teams]
+    if len(teams) == 2:
+        df["opponent_team_id"] = df["team_id"].map({teams[0]: teams[1], teams[1]: teams[0]})
 
     return df
 
 
-def get_match_ids(competition_id=743):
+def get_matches(competition_id=743):
     """
-    Get list of all match IDs for a competition
+    Get match IDs and matchdays for a competition
+    
+    Returns:
+        DataFrame with match_id and matchday (matchday is None if unavailable)
     """
+    import polars as pl
+    import requests
+    from kloppy.utils import github_resolve_raw_data_url
+    
     match_url = github_resolve_raw_data_url(
         repository="ImpectAPI/open-data",
         branch="main",
@@ -76,15 +128,34 @@ def get_match_ids(competition_id=743):
         .rename({"id": "matchId"})
     )
 
-    return matches["matchId"].to_list()
+    matchday_col = next((col for col in ("index", "name") if col in matches.columns), None)
+
+    return pd.DataFrame({
+        "match_id": matches["matchId"].to_list(),
+        "matchday": matches[matchday_col].to_list() if matchday_col else None,
+    })
 
 
-def load_all_shots(competition_id=743):
+def get_match_ids(competition_id=743):
     """
-    Load shots from ALL matches in the competition
+    Get list of all match IDs for a competition
     """
-    match_ids = get_match_ids(competition_id=competition_id)
-    dfs = []
+    return get_matches(competition_id=competition_id)["match_id"].to_list()
+
+
+def iter_match_shots(competition_id=743, matches=None):
+    """
+    Yield the shots of each match in the competition, one match at a time
+    
+    Every frame carries match_id and matchday columns. Matches that fail to
+    load are reported and skipped, so only one match is ever held in memory.
+    matches: optional get_matches frame (e.g. reordered) to load instead of
+    the full competition in schedule order
+    """
+    if matches is None:
+        matches = get_matches(competition_id=competition_id)
+    match_ids = matches["match_id"].to_list()
+    matchdays = dict(zip(matches["match_id"], matches["matchday"]))
 
     print(f"Loading shots from {len(match_ids)} matches...")
     
@@ -94,53 +165,86 @@ def load_all_shots(competition_id=743):
         
         try:
             df_match = load_shots(mid, competition_id=competition_id)  
-
-            if df_match is None or df_match.empty:
-                continue
-
-            df_match = df_match.copy()
-            df_match["match_id"] = mid
-            dfs.append(df_match)
-            
         except Exception as e:
             print(f"  Error loading match {mid}: {e}")
             continue
 
+        if df_match is None or df_match.empty:
+            continue
+
+        df_match = df_match.copy()
+        df_match["match_id"] = mid
+        df_match["matchday"] = matchdays.get(mid)
+        yield df_match
+
+
+def load_all_shots(competition_id=743, incremental=False):
+    """
+    Load shots from ALL matches in the competition
+    
+    incremental: sync the local ingest_store instead, re-loading only
+    matches whose raw files changed upstream since the last sync
+    """
+    if incremental:
+        from ingest_store import sync_shots
+        return sync_shots(competition_id=competition_id)
+    
+    dfs = list(iter_match_shots(competition_id=competition_id))
+
     print(f"Successfully loaded {len(dfs)} matches")
     
     return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
 
 
-def get_leaderboard(competition_id=743, min_shots=1):
+def build_leaderboard(shots_all, players, squads, sdq_calculator=None, competition_id=743):
     """
-    Generate player leaderboard with SDQ statistics
-    Uses only real IMPECT data - no fake columns added
-    """
-    print("Starting data load for leaderboard...")
+    Score validated shots and build the full (min_shots=1) leaderboard
     
-    # Load metadata (player names and team names)
-    print("Loading player and team metadata...")
-    players, squads = load_metadata(competition_id=competition_id)
+    Every metric also gets a percentile and z-score within competition and
+    position (metric_normalization), cached along with the leaderboard
     
-    # Load all shots from all matches
-    shots_all = load_all_shots(competition_id=competition_id)
-    
-    if shots_all.empty:
-        print("ERROR: No shots loaded!")
-        return pd.DataFrame()
-    
-    print(f"Total shots loaded: {len(shots_all)}")
+    Returns:
+        shot_sdq_df: scored shots
+        leaderboard_df: one row per player with names, team and position
+        cube: aggregation_cube.SDQCube built from the same scored shots
+    """
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
     
     # Calculate SDQ for each shot
     print("Calculating SDQ scores...")
-    shot_sdq_df = create_shot_analysis(shots_all)
+    shot_sdq_df = create_shot_analysis(shots_all, sdq_calculator=sdq_calculator)
     
-    # Generate player-level leaderboard
+    # Player / team / match / matchday aggregates in one pass over the shots
+    cube = build_sdq_cube(shot_sdq_df)
+    
+    # Player-level leaderboard read off the cube
     print("Generating player leaderboard...")
-    leaderboard_df = generate_shot_leaderboard(shot_sdq_df, min_shots=min_shots)
+    leaderboard_df = player_leaderboard(cube, shot_sdq_df, min_shots=1)
     
     print(f"Leaderboard created with {len(leaderboard_df)} players")
     
+    leaderboard_df = add_player_info(leaderboard_df, cube, players, squads)
+    leaderboard_df['xg_version'] = sdq_calculator.xg_version
+    
+    # Player + opponent ridge fit over all shots (scipy is only needed here)
+    print("Adjusting for opponents...")
+    from opponent_adjustment import add_opponent_adjustment
+    leaderboard_df = add_opponent_adjustment(leaderboard_df, shot_sdq_df)
+    
+    leaderboard_df['competition_id'] = competition_id
+    leaderboard_df = add_normalized_metrics(leaderboard_df)
+    
+    return shot_sdq_df, leaderboard_df, cube
+
+
+def add_player_info(leaderboard_df, cube, players, squads):
+    """
+    Add player names, primary team and estimated position to a leaderboard
+    
+    cube: aggregation_cube.SDQCube the leaderboard was built from; it decides
+    each player's primary team
+    """
     # Add player names from metadata
     print("Adding player names...")
     if 'id' in players.columns and 'commonname' in players.columns:
@@ -155,9 +259,10 @@ def get_leaderboard(competition_id=743, min_shots=1):
         leaderboard_df['player_name'] = leaderboard_df['player_name'].fillna('Player ' + leaderboard_df['player_id'].astype(str))
     
     # Add team names from squads
-    # First, get team_id for each player from shots data
+    # First, get each player's primary team (most shots) so players who
+    # changed teams keep a single leaderboard row
     print("Adding team info...")
-    player_teams = shot_sdq_df[['player_id', 'team_id']].drop_duplicates()
+    player_teams = cube.primary_teams()
     player_teams['player_id'] = player_teams['player_id'].astype(int)
     leaderboard_df = leaderboard_df.merge(player_teams, on='player_id', how='left')
     
@@ -174,8 +279,111 @@ def get_leaderboard(competition_id=743, min_shots=1):
         lambda x: 'Forward' if x < 18 else 'Midfielder'
     )
     
+    return leaderboard_df
+
+
+def get_leaderboard_data(competition_id=743, xg_model=None, use_cache=True, game_state_modifiers=False,
+                         incremental=False, return_quarantine=False):
+    """
+    Scored shots, full (min_shots=1) leaderboard and aggregation cube
+    
+    xg_model: optional fitted xg_model.EmpiricalXG; the calibration used is
+    recorded in the 'xg_version' column
+    use_cache: reuse scored shots and aggregates from leaderboard_cache when
+    competition, scoring config, code and shot data are unchanged
+    game_state_modifiers: adjust SDQ for score line and match minute (see
+    ShotDecisionQuality.calculate_game_state_modifier)
+    incremental: load shots through ingest_store (only changed matches are
+    fetched again); see load_all_shots
+    return_quarantine: also return the shots validation excluded and the
+    per-match validation report (see leaderboard_from_shots)
+    
+    Returns:
+        (shot_sdq_df, leaderboard_df, cube); all three are empty/None if no
+        shots could be loaded
+    """
+    sdq_calculator = ShotDecisionQuality(xg_model=xg_model, game_state_modifiers=game_state_modifiers)
+    
+    print("Starting data load for leaderboard...")
+    
+    # Load metadata (player names and team names)
+    print("Loading player and team metadata...")
+    players, squads = load_metadata(competition_id=competition_id)
+    
+    # Load all shots from all matches
+    shots_all = load_all_shots(competition_id=competition_id, incremental=incremental)
+    
+    if shots_all.empty:
+        print("ERROR: No shots loaded!")
+        if return_quarantine:
+            return pd.DataFrame(), pd.DataFrame(), None, pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame(), None
+    
+    print(f"Total shots loaded: {len(shots_all)}")
+    
+    return leaderboard_from_shots(shots_all, players, squads, competition_id, sdq_calculator, use_cache=use_cache,
+                                  return_quarantine=return_quarantine)
+
+
+def leaderboard_from_shots(shots_all, players, squads, competition_id, sdq_calculator, use_cache=True,
+                           return_quarantine=False):
+    """
+    Validate loaded shots, then score and aggregate them (or reuse the cache)
+    
+    return_quarantine: also return the rows validation excluded (with their
+    'quarantine_reason') and the per-match validation report
+    
+    Returns:
+        (shot_sdq_df, leaderboard_df, cube) as get_leaderboard_data, plus
+        (quarantine_df, validation_report) if return_quarantine
+    """
+    # Drop rows that would otherwise be scored with silent defaults
+    shots_all, quarantine_df, validation_report = validate_shots(shots_all)
+    print_validation_summary(quarantine_df, validation_report)
+    
+    key = leaderboard_cache.cache_key(competition_id, sdq_calculator, shots_all, players, squads)
+    cached = leaderboard_cache.load_cached(key) if use_cache else None
+    
+    if cached is not None:
+        print(f"Using cached scores ({key})")
+        result = cached
+    else:
+        result = build_leaderboard(shots_all, players, squads, sdq_calculator, competition_id=competition_id)
+        if use_cache:
+            leaderboard_cache.store_cached(key, *result)
+    
+    if return_quarantine:
+        return (*result, quarantine_df, validation_report)
+    return result
+
+
+def get_leaderboard(competition_id=743, min_shots=1, xg_model=None, return_cube=False, use_cache=True,
+                    game_state_modifiers=False, incremental=False):
+    """
+    Generate player leaderboard with SDQ statistics
+    Uses only real IMPECT data - no fake columns added
+    
+    min_shots is applied to the cached base (see get_leaderboard_data), so
+    changing it never triggers rescoring; above metric_normalization.MIN_SHOTS
+    the percentiles and z-scores are re-ranked among the remaining players
+    return_cube: also return the aggregation_cube.SDQCube (player, team,
+    match and matchday levels) built from the same scored shots
+    """
+    _, leaderboard_df, cube = get_leaderboard_data(
+        competition_id=competition_id, xg_model=xg_model, use_cache=use_cache,
+        game_state_modifiers=game_state_modifiers, incremental=incremental
+    )
+    
+    if not leaderboard_df.empty:
+        leaderboard_df = leaderboard_df[leaderboard_df['total_shots'] >= min_shots].reset_index(drop=True)
+        if min_shots > MIN_SHOTS:
+            leaderboard_df = add_normalized_metrics(leaderboard_df, min_shots=min_shots)
+    
     print(f"✓ Leaderboard ready with {len(leaderboard_df)} players")
     
+    if return_cube:
+        return leaderboard_df, cube
+    
     return leaderboard_df
 
 
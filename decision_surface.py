@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from shot_decision_quality import ShotDecisionQuality
+from shot_index import attacking_coordinates
+
+
+# Alternatives within this many yards of the shot, on a square grid
+REACH_YARDS = 5.0
+GRID_STEP = 1.0
+
+# Shots evaluated per batch; each batch materializes n x grid-size arrays
+CHUNK_SHOTS = 20_000
+
+
+def neighbourhood_offsets(reach=REACH_YARDS, step=GRID_STEP):
+    """
+    (dx, dy) offsets of every grid point within reach, (0, 0) first
+    """
+    steps = np.arange(-reach, reach + step / 2, step)
+    dx, dy = np.meshgrid(steps, steps, indexing='ij')
+    dx, dy = dx.ravel(), dy.ravel()
+    inside = dx ** 2 + dy ** 2 <= reach ** 2 + 1e-9
+    dx, dy = dx[inside], dy[inside]
+    order = np.argsort(dx ** 2 + dy ** 2, kind='stable')
+    return dx[order], dy[order]
+
+
+def _surface(sdq_calculator, inputs, lo, hi, dx, dy):
+    # Every argument becomes (shots, grid) so the component functions
+    # broadcast once over the whole batch
+    shape = (hi - lo, len(dx))
+    x, y = attacking_coordinates(inputs['x'][lo:hi], inputs['y'][lo:hi])
+    grid_x = np.clip(x[:, None] + dx[None, :], 60, 120)
+    grid_y = np.clip(y[:, None] + dy[None, :], 0, 80)
+
+    def per_shot(name):
+        values = inputs[name]
+        return None if values is None else np.broadcast_to(np.asarray(values[lo:hi])[:, None], shape)
+
+    scores = sdq_calculator.score_arrays(
+        x=grid_x,
+        y=grid_y,
+        body_part=per_shot('body_part'),
+        under_pressure=per_shot('under_pressure'),
+        is_counter_attack=per_shot('is_counter_attack'),
+        set_piece_type=per_shot('set_piece_type'),
+        score_differential=per_shot('score_differential'),
+        match_minute=per_shot('match_minute'),
+    )
+    return np.asarray(scores['sdq'], dtype=float), grid_x, grid_y
+
+
+def decision_surface(shots, sdq_calculator=None, reach=REACH_YARDS, step=GRID_STEP, chunk_size=CHUNK_SHOTS):
+    """
+    Best reachable alternative to every shot on a neighbourhood grid
+
+    Each shot is re-scored at every grid point within reach (same body part,
+    pressure, timing and game state, new location), all shots of a batch in
+    one broadcast call to ShotDecisionQuality.score_arrays. Set-piece shots
+    have no alternative position and get NaN.
+
+    Returns:
+        DataFrame aligned with shots: sdq_here (SDQ at the shot location),
+        best_alternative_sdq, best_x / best_y (attacking towards x=120),
+        best_dx / best_dy, decision_gap (best - here, 0 if shooting was the
+        best option) and share_better (fraction of the grid that scores higher)
+    """
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
+
+    inputs = sdq_calculator.shot_inputs(shots)
+    dx, dy = neighbourhood_offsets(reach, step)
+    n = len(shots)
+
+    out = {name: np.full(n, np.nan) for name in (
+        'sdq_here', 'best_alternative_sdq', 'best_x', 'best_y', 'best_dx', 'best_dy', 'share_better'
+    )}
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        surface, grid_x, grid_y = _surface(sdq_calculator, inputs, lo, hi, dx, dy)
+        rows = np.arange(hi - lo)
+        best = surface.argmax(axis=1)
+        here = surface[:, 0]
+
+        out['sdq_here'][lo:hi] = here
+        out['best_alternative_sdq'][lo:hi] = surface[rows, best]
+        out['best_x'][lo:hi] = grid_x[rows, best]
+        out['best_y'][lo:hi] = grid_y[rows, best]
+        out['best_dx'][lo:hi] = dx[best]
+        out['best_dy'][lo:hi] = dy[best]
+        out['share_better'][lo:hi] = (surface > here[:, None] + 1e-9).mean(axis=1)
+
+    result = pd.DataFrame(out, index=shots.index)
+    result['decision_gap'] = result['best_alternative_sdq'] - result['sdq_here']
+
+    set_piece = pd.notna(inputs['set_piece_type'])
+    result.loc[set_piece, :] = np.nan
+    return result
+
+
+def shot_surface(shot, sdq_calculator=None, reach=REACH_YARDS, step=GRID_STEP):
+    """
+    Full SDQ grid around a single shot (for plotting); one row per grid point
+    """
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
+    shots = shot.to_frame().T if isinstance(shot, pd.Series) else shot.head(1)
+    inputs = sdq_calculator.shot_inputs(shots.infer_objects())
+    dx, dy = neighbourhood_offsets(reach, step)
+    surface, grid_x, grid_y = _surface(sdq_calculator, inputs, 0, 1, dx, dy)
+    return pd.DataFrame({'dx': dx, 'dy': dy, 'x': grid_x[0], 'y': grid_y[0], 'sdq': surface[0]})
+
+
+def player_decision_summary(shots, surface):
+    """
+    Per-player mean decision gap and share of shots taken from the best spot
+    """
+    frame = surface[['decision_gap', 'share_better']].assign(
+        player_id=shots['player_id'].to_numpy(),
+        best_spot=(surface['decision_gap'] <= 1e-9).to_numpy(),
+    ).dropna(subset=['decision_gap'])
+    return frame.groupby('player_id').agg(
+        avg_decision_gap=('decision_gap', 'mean'),
+        avg_share_better=('share_better', 'mean'),
+        best_spot_rate=('best_spot', 'mean'),
+        open_play_shots=('decision_gap', 'size'),
+    ).reset_index()
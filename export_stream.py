@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import arrow_store
+
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'exports')
+
+# Rows held in memory at once while exporting
+CHUNK_ROWS = 100_000
+
+# Streamlit keeps a served download in memory, so the dashboard only offers
+# exports up to this size as a download; larger ones stay on disk
+DOWNLOAD_MAX_BYTES = 256 * 1024 ** 2
+
+# Older exports beyond this many are pruned on each new export
+MAX_EXPORTS = 8
+
+# Exports used this recently are never pruned: another session may be
+# serving or about to serve them
+PRUNE_MIN_AGE_SECONDS = 600
+
+FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'jsonl': '.jsonl'}
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'jsonl': 'application/jsonl',
+}
+
+# Text formats are compressed as a stream around the whole file; Parquet
+# compresses each column chunk inside the file
+TEXT_COMPRESSION = {None: '', 'gzip': '.gz', 'bz2': '.bz2', 'zstd': '.zst'}
+PARQUET_COMPRESSION = (None, 'snappy', 'gzip', 'zstd', 'brotli', 'lz4')
+
+
+def _frame_chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_chunks(source, chunk_rows=CHUNK_ROWS, columns=None, filters=None):
+    """
+    Bounded-size chunks of a table, selected and filtered chunk by chunk
+
+    source is a path to a published Arrow file (memory-mapped, so only the
+    current chunk is ever copied), a DataFrame, or an iterable of DataFrames
+    such as streaming_pipeline.read_spilled. filters maps a column to the
+    values to keep, e.g. {'team_id': [1, 2]}.
+
+    Yields:
+        pyarrow Tables for Arrow sources, DataFrames otherwise
+    """
+    # Filter columns need not be among the exported ones
+    if isinstance(source, (str, os.PathLike)):
+        table = arrow_store.read_table(source)
+        if columns is not None:
+            table = table.select([c for c in table.column_names if c in columns or c in (filters or {})])
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            chunk = pa.Table.from_batches([batch])
+            for name, values in (filters or {}).items():
+                values = pa.array(list(values)).cast(_value_type(chunk.schema.field(name).type))
+                chunk = chunk.filter(pc.is_in(chunk[name], value_set=values))
+            if columns is not None:
+                chunk = chunk.select([c for c in columns if c in chunk.column_names])
+            if chunk.num_rows > 0:
+                yield chunk
+        return
+
+    frames = [source] if isinstance(source, pd.DataFrame) else source
+    for frame in frames:
+        for name, values in (filters or {}).items():
+            frame = frame[frame[name].isin(list(values))]
+        if columns is not None:
+            frame = frame[[c for c in columns if c in frame.columns]]
+        for chunk in _frame_chunks(frame, chunk_rows):
+            yield chunk
+
+
+def _value_type(arrow_type):
+    return arrow_type.value_type if pa.types.is_dictionary(arrow_type) else arrow_type
+
+
+def _as_frame(chunk):
+    return chunk.to_pandas() if isinstance(chunk, pa.Table) else chunk
+
+
+def _as_arrow(chunk):
+    """
+    Plain (dictionary-decoded) Arrow table, so every chunk shares one schema
+    """
+    if not isinstance(chunk, pa.Table):
+        chunk = arrow_store._to_arrow(chunk)
+    columns = [
+        column.cast(_value_type(column.type)) if pa.types.is_dictionary(column.type) else column
+        for column in chunk.columns
+    ]
+    return pa.table(columns, names=chunk.column_names)
+
+
+def _parquet_schema(table):
+    # A column that is all null in the first chunk would otherwise be
+    # written as null type; text is the safe guess for what follows
+    return pa.schema([
+        pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+        for field in table.schema
+    ])
+
+
+def _write_text(chunks, path, fmt, compression):
+    stream = pa.OSFile(path, 'wb')
+    if compression is not None:
+        stream = pa.CompressedOutputStream(stream, compression)
+    n_rows = 0
+    with stream:
+        for chunk in chunks:
+            frame = _as_frame(chunk)
+            if fmt == 'csv':
+                text = frame.to_csv(index=False, header=n_rows == 0)
+            else:
+                text = frame.to_json(orient='records', lines=True, date_format='iso')
+                if text and not text.endswith('\n'):
+                    text += '\n'
+            stream.write(text.encode('utf-8'))
+            n_rows += len(frame)
+    return n_rows
+
+
+def _write_parquet(chunks, path, compression):
+    import pyarrow.parquet as pq
+
+    writer = None
+    n_rows = 0
+    try:
+        for chunk in chunks:
+            table = _as_arrow(chunk)
+            if writer is None:
+                schema = _parquet_schema(table)
+                writer = pq.ParquetWriter(path, schema, compression=compression or 'none')
+            try:
+                table = table.select(schema.names).cast(schema)
+            except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Chunk starting at row {n_rows} does not match the first chunk's schema: {e}")
+            # One row group per chunk
+            writer.write_table(table)
+            n_rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.table({}), path)
+    return n_rows
+
+
+def export(source, path, fmt='csv', compression=None, chunk_rows=CHUNK_ROWS, columns=None, filters=None):
+    """
+    Stream a table to CSV, Parquet or JSON Lines without materializing it
+
+    At most chunk_rows rows are converted at a time. Text formats take
+    compression 'gzip', 'bz2' or 'zstd' (applied to the whole stream);
+    Parquet takes any of PARQUET_COMPRESSION (per column chunk, one row group
+    per chunk). The file is written to a temporary name and swapped in, so a
+    half-written export is never visible under path.
+
+    Returns:
+        number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(FORMATS)}")
+    if fmt == 'parquet' and compression not in PARQUET_COMPRESSION:
+        raise ValueError(f"Unknown Parquet compression {compression!r}; expected one of {PARQUET_COMPRESSION}")
+    if fmt != 'parquet' and compression not in TEXT_COMPRESSION:
+        raise ValueError(f"Unknown {fmt} compression {compression!r}; expected one of {list(TEXT_COMPRESSION)}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    chunks = iter_chunks(source, chunk_rows=chunk_rows, columns=columns, filters=filters)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        if fmt == 'parquet':
+            n_rows = _write_parquet(chunks, tmp_path, compression)
+        else:
+            n_rows = _write_text(chunks, tmp_path, fmt, compression)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return n_rows
+
+
+def file_name(name, fmt='csv', compression=None):
+    suffix = FORMATS[fmt] + (TEXT_COMPRESSION[compression] if fmt != 'parquet' else '')
+    return f'{name}{suffix}'
+
+
+def export_path(table, competition_id=743, fmt='csv', compression=None, columns=None, filters=None,
+                data_dir=arrow_store.DATA_DIR, export_dir=EXPORT_DIR, min_shots=None):
+    """
+    Where export_published puts a slice of a published table
+
+    The name is keyed on the published file's version and the export
+    options, so the same slice of the same data always maps to one file.
+    """
+    source = arrow_store.table_path(table, competition_id, data_dir)
+    options = {
+        'version': list(arrow_store.version(source)),
+        'columns': list(columns) if columns is not None else None,
+        'filters': {name: sorted(map(str, values)) for name, values in (filters or {}).items()},
+        'compression': compression,
+        'min_shots': min_shots,
+    }
+    key = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(export_dir, file_name(f'{table}_{competition_id}_{key}', fmt, compression))
+
+
+def export_published(table, competition_id=743, fmt='csv', compression=None, columns=None, filters=None,
+                     data_dir=arrow_store.DATA_DIR, export_dir=EXPORT_DIR, chunk_rows=CHUNK_ROWS,
+                     min_shots=None):
+    """
+    Export a slice of a published Arrow table ('shots', 'leaderboard', ...)
+
+    Asking for the same slice again reuses the file on disk (see
+    export_path); only the MAX_EXPORTS most recently used exports are kept.
+    min_shots (leaderboard tables): re-rank the percentile and z-score
+    columns among players with at least that many shots before filtering,
+    as the dashboard does for a stricter minimum.
+
+    Returns:
+        path of the export
+    """
+    path = export_path(table, competition_id, fmt, compression, columns, filters, data_dir, export_dir, min_shots)
+    if os.path.exists(path):
+        # Touch so pruning keeps recently used exports
+        os.utime(path)
+        return path
+
+    source = arrow_store.table_path(table, competition_id, data_dir)
+    if min_shots is not None:
+        from metric_normalization import add_normalized_metrics
+        # One row per player, so the whole table is small enough to re-rank in memory
+        source = add_normalized_metrics(arrow_store.read_frame(source), min_shots=min_shots)
+    n_rows = export(source, path, fmt=fmt, compression=compression, chunk_rows=chunk_rows,
+                    columns=columns, filters=filters)
+    print(f"✓ Exported {n_rows} rows of {table} to {path}")
+    prune(export_dir)
+    return path
+
+
+def read_export(path):
+    """
+    Contents of an export (for download callbacks; the file is closed again)
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def prune(export_dir=EXPORT_DIR, max_exports=MAX_EXPORTS, min_age_seconds=PRUNE_MIN_AGE_SECONDS):
+    """
+    Drop the least recently used exports beyond max_exports
+
+    Exports used within the last min_age_seconds are kept even beyond
+    max_exports, as every dashboard session shares the directory.
+    """
+    if not os.path.isdir(export_dir):
+        return
+    exports = []
+    for name in os.listdir(export_dir):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(export_dir, name)
+        try:
+            exports.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            pass
+    exports.sort(reverse=True)
+    cutoff = time.time() - min_age_seconds
+    for mtime, path in exports[max_exports:]:
+        if mtime >= cutoff:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a published table to CSV, Parquet or JSON Lines")
+    parser.add_argument('table', choices=['shots', 'leaderboard'])
+    parser.add_argument('output')
+    parser.add_argument('--competition-id', type=int, default=743)
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--compression', default=None)
+    parser.add_argument('--columns', nargs='+', default=None)
+    parser.add_argument('--team-id', type=int, nargs='+', default=None, help="only rows of these teams")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    n_rows = export(
+        arrow_store.table_path(args.table, args.competition_id),
+        args.output,
+        fmt=args.format,
+        compression=args.compression,
+        chunk_rows=args.chunk_rows,
+        columns=args.columns,
+        filters={'team_id': args.team_id} if args.team_id else None,
+    )
+    print(f"✓ Exported {n_rows} rows to {args.output}")
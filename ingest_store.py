@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ingest')
+
+# Raw files kloppy reads for one match in the IMPECT open-data repository;
+# a correction to either re-ingests the match
+RAW_MATCH_FILES = {
+    'events': "data/events/events_{match_id}.json",
+    'lineups': "data/lineups/lineups_{match_id}.json",
+}
+
+# Conditional HEAD requests are tiny, so many can be in flight at once
+CHECK_WORKERS = 16
+
+_sessions = threading.local()
+
+
+def store_path(competition_id, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f'shots_{competition_id}.pkl')
+
+
+def manifest_path(competition_id, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f'manifest_{competition_id}.json')
+
+
+def load_manifest(competition_id, store_dir=STORE_DIR):
+    """
+    Per-match state of the last ingestion:
+    {match_id: {files: {name: {etag, last_modified, content_hash}}, shots, ingested_at}}
+
+    content_hash is the file's strong ETag, or the SHA-1 of its body when
+    the server sent none
+    """
+    path = manifest_path(competition_id, store_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_store(competition_id, store_dir=STORE_DIR):
+    path = store_path(competition_id, store_dir)
+    return pd.read_pickle(path) if os.path.exists(path) else pd.DataFrame()
+
+
+def raw_file_url(match_id, name='events'):
+    from kloppy.utils import github_resolve_raw_data_url
+
+    return github_resolve_raw_data_url(
+        repository="ImpectAPI/open-data",
+        branch="main",
+        file=RAW_MATCH_FILES[name].format(match_id=match_id)
+    )
+
+
+def _session():
+    # requests sessions are not shared across threads; one per worker keeps
+    # its connection pool warm for every check it makes
+    if not hasattr(_sessions, 'session'):
+        import requests
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+
+def _content_id(url, etag):
+    # A strong ETag identifies the content, so the body need not be fetched
+    # (the loader downloads it anyway); without one, hash the body
+    if etag and not etag.startswith('W/'):
+        return etag
+    response = _session().get(url, timeout=30)
+    response.raise_for_status()
+    return hashlib.sha1(response.content).hexdigest()
+
+
+def check_file(url, previous=None):
+    """
+    Has one raw file changed since it was last ingested?
+
+    Sends the stored ETag / Last-Modified as a conditional HEAD request, so
+    checking a file never downloads it when the server gives a strong ETag
+    (GitHub raw files do); only then is the body fetched and hashed. An
+    unchanged ETag or content hash counts as unchanged. Validators without
+    a content hash were never ingested and count as new.
+
+    Returns:
+        (status, validators): status is 'unchanged', 'changed' or 'new'
+    """
+    previous = previous or {}
+    if not previous.get('content_hash'):
+        previous = {}
+    headers = {}
+    if previous.get('etag'):
+        headers['If-None-Match'] = previous['etag']
+    if previous.get('last_modified'):
+        headers['If-Modified-Since'] = previous['last_modified']
+
+    response = _session().head(url, headers=headers, timeout=30, allow_redirects=True)
+    if response.status_code == 304 and previous:
+        return 'unchanged', previous
+    response.raise_for_status()
+
+    etag = response.headers.get('ETag')
+    if previous and etag and etag == previous.get('etag'):
+        return 'unchanged', previous
+
+    validators = {
+        'etag': etag,
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_hash': _content_id(url, etag),
+    }
+    if not previous:
+        return 'new', validators
+    if previous['content_hash'] == validators['content_hash']:
+        return 'unchanged', dict(previous, **validators)
+    return 'changed', validators
+
+
+def check_match(match_id, previous=None):
+    """
+    Has any of a match's raw files (RAW_MATCH_FILES) changed since it was last ingested?
+
+    Returns:
+        (status, validators): status is 'unchanged', 'changed' or 'new';
+        validators holds one entry per raw file under 'files'
+    """
+    previous_files = (previous or {}).get('files', {})
+    statuses, files = {}, {}
+    for name in RAW_MATCH_FILES:
+        statuses[name], files[name] = check_file(raw_file_url(match_id, name), previous_files.get(name))
+
+    if all(status == 'new' for status in statuses.values()):
+        return 'new', {'files': files}
+    if all(status == 'unchanged' for status in statuses.values()):
+        return 'unchanged', {'files': files}
+    return 'changed', {'files': files}
+
+
+def check_matches(match_ids, manifest, max_workers=CHECK_WORKERS):
+    """
+    check_match for many matches concurrently; failures count as 'error'
+
+    Returns:
+        dict match_id -> (status, validators)
+    """
+    def check(match_id):
+        try:
+            return check_match(match_id, manifest.get(str(match_id)))
+        except Exception as e:
+            print(f"  Error checking match {match_id}: {e}")
+            return 'error', manifest.get(str(match_id))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(match_ids, pool.map(check, match_ids)))
+
+
+def upsert_shots(store, new_shots, replaced_match_ids):
+    """
+    Replace whole matches in the store and drop any row sharing an event_id with new_shots
+
+    Re-ingesting a match removes its old rows first, so shots deleted upstream
+    disappear too; the event_id pass guarantees no duplicates even if an
+    event moved between matches.
+    """
+    if len(store) > 0:
+        store = store[~store['match_id'].isin(replaced_match_ids)]
+        if len(new_shots) > 0 and 'event_id' in store.columns:
+            store = store[~store['event_id'].isin(new_shots['event_id'])]
+    frames = [df for df in (store, new_shots) if len(df) > 0]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def sync_shots(competition_id=743, store_dir=STORE_DIR, max_workers=CHECK_WORKERS):
+    """
+    Bring the local shot store up to date and return it
+
+    Only matches that are new or whose events or lineups file changed
+    upstream are loaded again; their shots are upserted and the manifest
+    records the new validators and row count. A match whose rows are missing
+    from the store (e.g. the store file was lost while the manifest
+    survived) is loaded again too. Matches that fail to load keep their
+    previous rows and validators, so they are retried on the next sync. Rows
+    are kept in schedule order, so an unchanged store equals what
+    load_all_shots returns (and hits the same leaderboard cache entry).
+
+    The competition-wide players / squads files are not tracked: they only
+    feed load_metadata, which reads them fresh on every leaderboard build.
+    """
+    from data_loader import get_matches, load_shots
+
+    matches = get_matches(competition_id=competition_id)
+    match_ids = matches["match_id"].to_list()
+    matchdays = dict(zip(matches["match_id"], matches["matchday"]))
+
+    manifest = load_manifest(competition_id, store_dir)
+    store = load_store(competition_id, store_dir)
+
+    print(f"Checking {len(match_ids)} matches for upstream changes...")
+    checks = check_matches(match_ids, manifest, max_workers=max_workers)
+    counts = pd.Series([status for status, _ in checks.values()]).value_counts()
+    print("  " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+
+    # The manifest only vouches for rows that are actually in the store
+    stored = store['match_id'].value_counts() if len(store) > 0 else pd.Series(dtype=int)
+
+    def rows_missing(mid):
+        have = int(stored.get(mid, 0))
+        expected = manifest.get(str(mid), {}).get('shots')
+        # Entries written before row counts were recorded vouch for any non-empty match
+        return have == 0 if expected is None else have != expected
+
+    missing = [mid for mid in match_ids if checks[mid][0] == 'unchanged' and rows_missing(mid)]
+    if missing:
+        print(f"  {len(missing)} unchanged matches missing from the store")
+
+    to_ingest = [mid for mid in match_ids if checks[mid][0] in ('new', 'changed') or mid in missing]
+    frames, ingested, shot_counts = [], [], {}
+    for mid in to_ingest:
+        try:
+            df_match = load_shots(mid, competition_id=competition_id)
+        except Exception as e:
+            print(f"  Error loading match {mid}: {e}")
+            continue
+        if df_match is not None and not df_match.empty:
+            df_match = df_match.copy()
+            df_match["match_id"] = mid
+            df_match["matchday"] = matchdays.get(mid)
+            frames.append(df_match)
+        ingested.append(mid)
+        shot_counts[mid] = 0 if df_match is None else len(df_match)
+
+    new_shots = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    store = upsert_shots(store, new_shots, ingested)
+
+    # Matches dropped from the schedule leave the store; the rest follow it
+    if len(store) > 0:
+        position = {mid: i for i, mid in enumerate(match_ids)}
+        store = store[store['match_id'].isin(list(position))]
+        order = store['match_id'].map(position).to_numpy()
+        store = store.iloc[order.argsort(kind='stable')].reset_index(drop=True)
+
+    for mid in ingested:
+        manifest[str(mid)] = dict(checks[mid][1], ingested_at=time.time(), shots=shot_counts[mid])
+    for mid in match_ids:
+        status, validators = checks[mid]
+        if status == 'unchanged':
+            manifest[str(mid)] = dict(manifest.get(str(mid), {}), **validators)
+    listed = {str(mid) for mid in match_ids}
+    manifest = {mid: entry for mid, entry in manifest.items() if mid in listed}
+
+    def write_manifest(path):
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    _write_atomic(store_path(competition_id, store_dir), store.to_pickle)
+    _write_atomic(manifest_path(competition_id, store_dir), write_manifest)
+
+    print(f"✓ Re-ingested {len(ingested)} matches; store has {len(store)} shots")
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-ingest only matches that changed upstream")
+    parser.add_argument('--competition-id', type=int, default=743)
+    args = parser.parse_args()
+
+    sync_shots(competition_id=args.competition_id)
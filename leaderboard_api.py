@@ -0,0 +1,225 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+
+# Columns clients are allowed to sort by (all descending, like the dashboard)
+SORTABLE_COLUMNS = ['overall_sdq', 'goals', 'conversion_rate', 'total_shots', 'consistency']
+
+
+class LeaderboardStore:
+    """
+    Read-only, indexed, in-memory copy of one leaderboard snapshot
+
+    Built once from a leaderboard DataFrame and then shared by every request
+    thread. Nothing is mutated after construction, so no locking is needed.
+    """
+
+    def __init__(self, leaderboard_df):
+        df = leaderboard_df.reset_index(drop=True)
+
+        # JSON-ready rows (NaN -> null, numpy -> python) serialised once
+        self.records = json.loads(df.to_json(orient='records'))
+
+        # Snapshot version: content hash of the serialised rows
+        self.version = hashlib.sha1(
+            json.dumps(self.records, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+        # player_id -> row position
+        self.by_player = {int(pid): i for i, pid in enumerate(df['player_id'])}
+
+        # Filter columns as arrays so a query is a couple of vector ops
+        self.total_shots = df['total_shots'].to_numpy()
+        self.teams = df['team'].astype(str).to_numpy() if 'team' in df.columns else np.full(len(df), '')
+        self.positions = df['position'].astype(str).to_numpy() if 'position' in df.columns else np.full(len(df), '')
+
+        # Pre-sorted row orders, one per sortable metric
+        self.orders = {
+            col: np.argsort(-df[col].to_numpy(dtype=float), kind='stable')
+            for col in SORTABLE_COLUMNS if col in df.columns
+        }
+
+        self._query_cache = lru_cache(maxsize=1024)(self._query_uncached)
+
+    def __len__(self):
+        return len(self.records)
+
+    def top(self, n=20, sort_by='overall_sdq', teams=(), positions=(), min_shots=1):
+        """
+        Top-N players by a metric after team/position/min-shots filters
+        """
+        return self._query_cache(int(n), sort_by, tuple(sorted(teams)), tuple(sorted(positions)), int(min_shots))
+
+    def _query_uncached(self, n, sort_by, teams, positions, min_shots):
+        if sort_by not in self.orders:
+            raise ValueError(f"Cannot sort by '{sort_by}'")
+
+        mask = self.total_shots >= min_shots
+        if teams:
+            mask &= np.isin(self.teams, teams)
+        if positions:
+            mask &= np.isin(self.positions, positions)
+
+        order = self.orders[sort_by]
+        rows = order[mask[order]][:max(n, 0)]
+
+        return [dict(self.records[i], rank=rank) for rank, i in enumerate(rows, start=1)]
+
+    def player(self, player_id):
+        """
+        Single player lookup, or None if the player is not in the snapshot
+        """
+        i = self.by_player.get(int(player_id))
+        return None if i is None else self.records[i]
+
+    def compare(self, player_ids):
+        """
+        Rows for several players, in the order requested; unknown ids are skipped
+        """
+        return [self.records[self.by_player[pid]] for pid in player_ids if pid in self.by_player]
+
+
+def _split_param(params, name):
+    values = []
+    for value in params.get(name, []):
+        values.extend(v for v in value.split(',') if v)
+    return values
+
+
+class LeaderboardRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET-only handler; the store is attached to the server instance
+
+    Routes:
+        /health
+        /leaderboard?n=20&sort=overall_sdq&team=A,B&position=Forward&min_shots=5
+        /players/<player_id>
+        /compare?ids=1,2,3
+    """
+
+    server_version = 'SDQLeaderboardAPI/1.0'
+
+    def do_GET(self):
+        store = self.server.store
+        url = urlparse(self.path)
+
+        # Responses are a pure function of (snapshot, path + query), so the
+        # ETag can be checked before doing any work
+        etag = '"{}-{}"'.format(
+            store.version,
+            hashlib.sha1(self.path.encode()).hexdigest()[:12]
+        )
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        try:
+            status, payload = self._route(store, url.path, parse_qs(url.query))
+        except (ValueError, KeyError) as e:
+            status, payload = 400, {'error': str(e)}
+
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, store, path, params):
+        parts = [p for p in path.split('/') if p]
+
+        if parts == ['health']:
+            return 200, {'players': len(store), 'version': store.version, 'loaded_at': store.loaded_at}
+
+        if parts == ['leaderboard']:
+            rows = store.top(
+                n=params.get('n', ['20'])[0],
+                sort_by=params.get('sort', ['overall_sdq'])[0],
+                teams=_split_param(params, 'team'),
+                positions=_split_param(params, 'position'),
+                min_shots=params.get('min_shots', ['1'])[0],
+            )
+            return 200, {'version': store.version, 'players': rows}
+
+        if len(parts) == 2 and parts[0] == 'players':
+            row = store.player(parts[1])
+            if row is None:
+                return 404, {'error': f"Player {parts[1]} not found"}
+            return 200, {'version': store.version, 'player': row}
+
+        if parts == ['compare']:
+            ids = [int(pid) for pid in _split_param(params, 'ids')]
+            return 200, {'version': store.version, 'players': store.compare(ids)}
+
+        return 404, {'error': f"Unknown path {path}"}
+
+    def log_message(self, format, *args):
+        # Keep stdout quiet under load; errors still go through log_error
+        pass
+
+
+def load_snapshot(path):
+    """
+    Load a leaderboard snapshot written with DataFrame.to_csv / to_pickle / to_parquet
+    """
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def create_server(leaderboard_df, host='127.0.0.1', port=8765):
+    """
+    Build (but do not start) a threaded HTTP server over one leaderboard copy
+    """
+    server = ThreadingHTTPServer((host, port), LeaderboardRequestHandler)
+    server.daemon_threads = True
+    server.store = LeaderboardStore(leaderboard_df)
+    return server
+
+
+def serve_in_background(leaderboard_df, host='127.0.0.1', port=8765):
+    """
+    Start the server on a daemon thread (handy from notebooks); returns the server
+    """
+    server = create_server(leaderboard_df, host=host, port=port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only HTTP API over the SDQ leaderboard")
+    parser.add_argument('--snapshot', help="Leaderboard file (.csv, .parquet or pickle); built from IMPECT data if omitted")
+    parser.add_argument('--competition-id', type=int, default=743)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.snapshot:
+        leaderboard_df = load_snapshot(args.snapshot)
+    else:
+        from data_loader import get_leaderboard
+        leaderboard_df = get_leaderboard(competition_id=args.competition_id, min_shots=1)
+
+    server = create_server(leaderboard_df, host=args.host, port=args.port)
+    print(f"Serving {len(server.store)} players (snapshot {server.store.version}) on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from aggregation_cube import SDQCube
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sdq_cache')
+
+# Source files whose changes invalidate every cached result
+CODE_FILES = ['shot_decision_quality.py', 'aggregation_cube.py', 'shot_validation.py', 'match_context.py', 'opponent_adjustment.py', 'metric_normalization.py', 'data_loader.py']
+
+# Older entries beyond this many are pruned on each store
+MAX_ENTRIES = 8
+
+_memory = {}
+
+
+def code_version():
+    """
+    Hash of the scoring / aggregation source files
+    """
+    digest = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_FILES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def config_version(sdq_calculator):
+    """
+    Hash of everything on the calculator that changes a score
+    """
+    config = {
+        'weights': sdq_calculator.weights,
+        'zones': sdq_calculator.zones,
+        'xg_version': sdq_calculator.xg_version,
+        'game_state_modifiers': sdq_calculator.game_state_modifiers,
+        'late_game_minute': sdq_calculator.late_game_minute,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=float).encode()).hexdigest()[:12]
+
+
+def data_version(*frames):
+    """
+    Content hash of the input frames (row order and values, not the index)
+    """
+    digest = hashlib.sha1()
+    for df in frames:
+        digest.update(json.dumps([str(c) for c in df.columns]).encode())
+        try:
+            hashed = pd.util.hash_pandas_object(df, index=False)
+        except TypeError:
+            # Columns holding lists/dicts are hashed through their text form
+            hashed = pd.util.hash_pandas_object(df.astype(str), index=False)
+        digest.update(np.ascontiguousarray(hashed.to_numpy()).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def cache_key(competition_id, sdq_calculator, *frames):
+    return '{}-{}-{}-{}'.format(
+        competition_id, config_version(sdq_calculator), code_version(), data_version(*frames)
+    )
+
+
+def load_cached(key):
+    """
+    Cached (shot_sdq_df, leaderboard_df, cube) for a key, or None
+    """
+    if key in _memory:
+        return _memory[key]
+
+    path = os.path.join(CACHE_DIR, key)
+    if not os.path.isdir(path):
+        return None
+
+    try:
+        result = (
+            pd.read_pickle(os.path.join(path, 'shots.pkl')),
+            pd.read_pickle(os.path.join(path, 'leaderboard.pkl')),
+            SDQCube(pd.read_pickle(os.path.join(path, 'cube.pkl'))),
+        )
+    except (OSError, EOFError, ValueError) as e:
+        print(f"  Ignoring unreadable cache entry {key}: {e}")
+        return None
+
+    # Touch so pruning keeps recently used entries
+    os.utime(path)
+    _memory[key] = result
+    return result
+
+
+def store_cached(key, shot_sdq_df, leaderboard_df, cube):
+    """
+    Store the unfiltered scored shots, leaderboard and cube under a key
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = os.path.join(CACHE_DIR, f'.{key}.tmp')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    shot_sdq_df.to_pickle(os.path.join(tmp_path, 'shots.pkl'))
+    leaderboard_df.to_pickle(os.path.join(tmp_path, 'leaderboard.pkl'))
+    cube.base.to_pickle(os.path.join(tmp_path, 'cube.pkl'))
+
+    # Publish the entry in one rename so readers never see half of it
+    final_path = os.path.join(CACHE_DIR, key)
+    shutil.rmtree(final_path, ignore_errors=True)
+    os.rename(tmp_path, final_path)
+
+    _memory.clear()
+    _memory[key] = (shot_sdq_df, leaderboard_df, cube)
+    prune()
+
+
+def prune(max_entries=MAX_ENTRIES):
+    """
+    Drop the least recently used entries beyond max_entries
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = [
+        os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR)
+        if not name.startswith('.')
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[max_entries:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def clear():
+    _memory.clear()
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import arrow_store
+
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'snapshots')
+
+# Only what the diff and the movers view need; full rows live in arrow_store
+SNAPSHOT_COLUMNS = ['player_id', 'player_name', 'team', 'position', 'overall_sdq', 'total_shots', 'goals', 'conversion_rate']
+
+
+def _content_hash(snapshot_df):
+    hashed = pd.util.hash_pandas_object(snapshot_df, index=False).to_numpy()
+    return hashlib.sha1(np.ascontiguousarray(hashed).tobytes()).hexdigest()[:10]
+
+
+def save_snapshot(leaderboard_df, competition_id=743, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Store a leaderboard build as an immutable snapshot; returns its id
+
+    Snapshot ids sort by creation time. An identical leaderboard to the
+    latest snapshot is not stored again.
+    """
+    columns = [c for c in SNAPSHOT_COLUMNS if c in leaderboard_df.columns]
+    snapshot_df = (
+        leaderboard_df[columns]
+        .sort_values('overall_sdq', ascending=False, kind='stable')
+        .reset_index(drop=True)
+    )
+    snapshot_df['player_id'] = snapshot_df['player_id'].astype(np.int64)
+    snapshot_df['rank'] = np.arange(1, len(snapshot_df) + 1)
+
+    content = _content_hash(snapshot_df)
+    existing = list_snapshots(competition_id, snapshot_dir)
+    if len(existing) > 0 and existing[-1].endswith(content):
+        return existing[-1]
+
+    snapshot_id = f"{competition_id}_{time.strftime('%Y%m%dT%H%M%S')}_{content}"
+    arrow_store.write_table(snapshot_df, os.path.join(snapshot_dir, f'{snapshot_id}.arrow'))
+    return snapshot_id
+
+
+def list_snapshots(competition_id=743, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Snapshot ids for a competition, oldest first
+    """
+    if not os.path.isdir(snapshot_dir):
+        return []
+    prefix = f'{competition_id}_'
+    return sorted(
+        name[:-len('.arrow')] for name in os.listdir(snapshot_dir)
+        if name.startswith(prefix) and name.endswith('.arrow')
+    )
+
+
+def load_snapshot(snapshot_id, snapshot_dir=SNAPSHOT_DIR):
+    return arrow_store.read_frame(os.path.join(snapshot_dir, f'{snapshot_id}.arrow'))
+
+
+def diff_snapshots(old_df, new_df):
+    """
+    Rank moves and SDQ deltas between two snapshots
+
+    Both key arrays are sorted once and aligned with searchsorted, so every
+    column of the result is a vectorized gather rather than a row-wise merge.
+
+    Returns:
+        DataFrame with one row per player in either snapshot: status
+        ('moved', 'new', 'dropped'), rank_old/rank_new, rank_change (positive
+        means the player climbed) and sdq_old/sdq_new/sdq_delta
+    """
+    old_ids = old_df['player_id'].to_numpy(dtype=np.int64)
+    new_ids = new_df['player_id'].to_numpy(dtype=np.int64)
+    all_ids = np.union1d(old_ids, new_ids)
+
+    def align(ids, values, fill=np.nan):
+        order = np.argsort(ids, kind='stable')
+        pos = np.searchsorted(ids[order], all_ids)
+        pos = np.minimum(pos, len(ids) - 1) if len(ids) else pos
+        found = (ids[order][pos] == all_ids) if len(ids) else np.zeros(len(all_ids), dtype=bool)
+        out = np.full(len(all_ids), fill, dtype=float)
+        out[found] = np.asarray(values, dtype=float)[order][pos[found]]
+        return out, found
+
+    rank_old, in_old = align(old_ids, old_df['rank'])
+    rank_new, in_new = align(new_ids, new_df['rank'])
+    sdq_old, _ = align(old_ids, old_df['overall_sdq'])
+    sdq_new, _ = align(new_ids, new_df['overall_sdq'])
+
+    diff = pd.DataFrame({
+        'player_id': all_ids,
+        'status': np.select([in_old & in_new, in_new], ['moved', 'new'], default='dropped'),
+        'rank_old': rank_old,
+        'rank_new': rank_new,
+        'rank_change': rank_old - rank_new,
+        'sdq_old': sdq_old,
+        'sdq_new': sdq_new,
+        'sdq_delta': sdq_new - sdq_old,
+    })
+
+    # Labels from the newest snapshot that has the player
+    labels = [c for c in ('player_name', 'team', 'position') if c in new_df.columns]
+    if labels:
+        label_df = pd.concat([new_df[['player_id'] + labels], old_df[['player_id'] + labels]])
+        label_df = label_df.drop_duplicates('player_id').set_index('player_id')
+        for col in labels:
+            diff[col] = label_df[col].reindex(all_ids).to_numpy()
+
+    return diff
+
+
+def latest_diff(competition_id=743, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Diff of the two most recent snapshots, or None if there are fewer than two
+    """
+    snapshots = list_snapshots(competition_id, snapshot_dir)
+    if len(snapshots) < 2:
+        return None
+    return diff_snapshots(load_snapshot(snapshots[-2], snapshot_dir), load_snapshot(snapshots[-1], snapshot_dir))
@@ -0,0 +1,295 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import arrow_store
+from match_context import add_match_context, PERIOD_START_MINUTE
+from shot_decision_quality import ShotDecisionQuality, create_shot_analysis
+from shot_validation import validate_shots
+from streaming_pipeline import RunningAggregates
+
+
+LIVE_DIR = os.path.join(arrow_store.DATA_DIR, 'live')
+
+# Seconds between polls of the feed when nothing new has arrived
+POLL_SECONDS = 0.5
+
+# Shot columns published for the dashboard's recent-shots view
+LIVE_SHOT_COLUMNS = [
+    'event_id', 'period_id', 'match_minute', 'team_id', 'player_id', 'sdq', 'expected_value',
+    'distance_to_goal', 'body_part_type', 'shot_result', 'game_state', 'is_counter_attack'
+]
+
+
+class FeedTailer:
+    """
+    Reads events appended to a JSONL feed since the last call
+
+    One JSON object per line, with the columns of a kloppy event DataFrame
+    (timestamp as seconds into the period). Only complete lines are
+    consumed, so a writer caught mid-line is picked up on the next read. A
+    file that shrinks is treated as a restarted feed and read from the top.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+
+    def read_new(self):
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.offset:
+            self.offset = 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1
+        self.offset += end
+        return [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+
+
+class LiveMatch:
+    """
+    Incremental SDQ for one in-progress match
+
+    Every batch of new events is appended to the match's event stream; match
+    context is recomputed over the stream (a few thousand events at most)
+    so new shots see their full possession and score line, but only shots
+    not seen before are validated, scored and folded into the running
+    aggregates. Shots failing validation are kept in quarantine and, like
+    scored ones, never looked at again.
+    """
+
+    def __init__(self, match_id, sdq_calculator=None, players=None, squads=None, live_dir=LIVE_DIR):
+        self.match_id = match_id
+        self.sdq_calculator = sdq_calculator or ShotDecisionQuality()
+        self.players = players
+        self.squads = squads
+        self.live_dir = live_dir
+        self.events = pd.DataFrame()
+        self.shots = pd.DataFrame()
+        self.aggregates = RunningAggregates()
+        self.quarantine = pd.DataFrame()
+        # Rows of self.events already handled, and the event ids among them
+        # (so a restarted feed replaying old events is not scored twice)
+        self._seen_rows = set()
+        self._seen_ids = set()
+
+    def update(self, new_events):
+        """
+        Add new feed events; returns the newly scored shots
+        """
+        if len(new_events) == 0:
+            return pd.DataFrame()
+        batch = pd.DataFrame(new_events)
+        if 'timestamp' in batch.columns:
+            batch['timestamp'] = pd.to_timedelta(pd.to_numeric(batch['timestamp'], errors='coerce'), unit='s')
+        self.events = pd.concat([self.events, batch], ignore_index=True)
+
+        events = add_match_context(self.events)
+        shots = events[(events['event_type'] == 'SHOT') & ~events.index.isin(list(self._seen_rows))]
+        if 'event_id' in shots.columns:
+            shots = shots[~shots['event_id'].isin(self._seen_ids)]
+        shots = shots.copy()
+        if len(shots) == 0:
+            return shots
+
+        shots['match_id'] = self.match_id
+        shots['matchday'] = None
+        self._seen_rows.update(shots.index)
+        shots, quarantine_df, _ = validate_shots(shots)
+        if 'event_id' in quarantine_df.columns:
+            self._seen_ids.update(quarantine_df['event_id'].dropna())
+        if len(quarantine_df) > 0:
+            self.quarantine = pd.concat([self.quarantine, quarantine_df], ignore_index=True)
+        if len(shots) == 0:
+            return shots
+
+        scored = create_shot_analysis(shots, sdq_calculator=self.sdq_calculator)
+        self._seen_ids.update(scored['event_id'])
+        self.aggregates.update(scored)
+        self.shots = pd.concat([self.shots, scored[[c for c in LIVE_SHOT_COLUMNS if c in scored.columns]]], ignore_index=True)
+        return scored
+
+    def player_table(self):
+        """
+        In-match player aggregates with names when metadata was given
+        """
+        stats = self.aggregates.cube().level('player_team')
+        if len(stats) == 0:
+            return stats
+        stats = stats.sort_values('overall_sdq', ascending=False).reset_index(drop=True)
+        if self.players is not None and 'id' in self.players.columns:
+            names = self.players.set_index(self.players['id'].astype(str))['commonname']
+            stats['player_name'] = stats['player_id'].astype(str).map(names)
+        if self.squads is not None and 'id' in self.squads.columns:
+            teams = self.squads.set_index(self.squads['id'].astype(str))['name']
+            stats['team'] = stats['team_id'].astype(str).map(teams)
+        if 'player_name' not in stats.columns:
+            stats['player_name'] = 'Player ' + stats['player_id'].astype(str)
+        stats['player_name'] = stats['player_name'].fillna('Player ' + stats['player_id'].astype(str))
+        if 'team' not in stats.columns:
+            stats['team'] = stats['team_id'].astype(str)
+        return stats
+
+    def score_line(self):
+        """
+        Goals per team so far (own goals credited to the opponent)
+        """
+        if len(self.events) == 0:
+            return {}
+        teams = [str(team) for team in pd.unique(self.events['team_id'].dropna())]
+        score = {team: 0 for team in teams}
+        if 'result' not in self.events.columns:
+            return score
+        shots = self.events[self.events['event_type'] == 'SHOT']
+        for team, result in zip(shots['team_id'].astype(str), shots['result']):
+            if result == 'GOAL':
+                score[team] = score.get(team, 0) + 1
+            elif result == 'OWN_GOAL' and len(teams) == 2:
+                opponent = teams[1] if team == teams[0] else teams[0]
+                score[opponent] += 1
+        return score
+
+    def publish(self):
+        """
+        Write the live state for the dashboard (Arrow tables + small JSON status)
+        """
+        prefix = os.path.join(self.live_dir, str(self.match_id))
+        arrow_store.write_table(self.player_table(), f'{prefix}_players.arrow')
+        arrow_store.write_table(self.shots, f'{prefix}_shots.arrow')
+
+        minute = self.shots['match_minute'].max() if 'match_minute' in self.shots.columns and len(self.shots) else None
+        status = {
+            'match_id': self.match_id,
+            'events': len(self.events),
+            'shots': len(self.shots),
+            'quarantined': len(self.quarantine),
+            'score': self.score_line(),
+            'last_shot_minute': None if minute is None or pd.isna(minute) else float(minute),
+            'updated_at': time.time(),
+        }
+        tmp_path = f'{prefix}_status.json.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, f'{prefix}_status.json')
+
+
+def list_live_matches(live_dir=LIVE_DIR):
+    """
+    Status dicts of every match with published live state, most recent first
+    """
+    if not os.path.isdir(live_dir):
+        return []
+    statuses = []
+    for name in os.listdir(live_dir):
+        if name.endswith('_status.json'):
+            with open(os.path.join(live_dir, name)) as f:
+                statuses.append(json.load(f))
+    return sorted(statuses, key=lambda status: status['updated_at'], reverse=True)
+
+
+def follow(feed_path, match_id, players=None, squads=None, sdq_calculator=None, live_dir=LIVE_DIR,
+           poll_seconds=POLL_SECONDS, idle_timeout=None):
+    """
+    Tail a feed and republish live state whenever new events arrive
+
+    Runs until interrupted, or until idle_timeout seconds pass without new
+    events.
+    """
+    tailer = FeedTailer(feed_path)
+    live = LiveMatch(match_id, sdq_calculator=sdq_calculator, players=players, squads=squads, live_dir=live_dir)
+    idle_since = time.time()
+    print(f"Following {feed_path} for match {match_id}...")
+
+    while True:
+        new_events = tailer.read_new()
+        if new_events:
+            scored = live.update(new_events)
+            live.publish()
+            idle_since = time.time()
+            if len(scored) > 0:
+                print(f"  {len(scored)} new shot(s), mean SDQ {scored['sdq'].mean():.1f} - {len(live.shots)} shots so far")
+        elif idle_timeout is not None and time.time() - idle_since > idle_timeout:
+            break
+        else:
+            time.sleep(poll_seconds)
+
+    return live
+
+
+def _to_feed_record(event):
+    record = {}
+    for key, value in event.items():
+        if isinstance(value, pd.Timedelta):
+            value = value.total_seconds()
+        elif isinstance(value, (np.generic,)):
+            value = value.item()
+        elif not isinstance(value, (str, int, float, bool, type(None))):
+            value = str(value)
+        if isinstance(value, float) and np.isnan(value):
+            value = None
+        record[key] = value
+    return record
+
+
+def replay_match(events, feed_path, speed=60.0, batch_seconds=1.0):
+    """
+    Local stand-in feed: append a finished match's events to feed_path in
+    match time, speed times faster than real time
+    """
+    columns = [c for c in events.columns if c not in ('raw_event', 'qualifiers')]
+    match_seconds = (
+        events['period_id'].map(PERIOD_START_MINUTE).fillna(0).to_numpy(dtype=float) * 60
+        + pd.to_timedelta(events['timestamp']).dt.total_seconds().to_numpy(dtype=float)
+    )
+    open(feed_path, 'w').close()
+    start = time.time()
+    batch = []
+    next_flush = batch_seconds
+    for (_, event), seconds in zip(events[columns].iterrows(), match_seconds):
+        batch.append(json.dumps(_to_feed_record(event)))
+        if seconds / speed < next_flush:
+            continue
+        time.sleep(max(0.0, start + seconds / speed - time.time()))
+        with open(feed_path, 'a') as f:
+            f.write('\n'.join(batch) + '\n')
+        batch = []
+        next_flush = seconds / speed + batch_seconds
+    if batch:
+        with open(feed_path, 'a') as f:
+            f.write('\n'.join(batch) + '\n')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Live SDQ from an append-only event feed")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    follow_parser = subparsers.add_parser('follow', help="tail a JSONL feed and publish live state")
+    follow_parser.add_argument('feed')
+    follow_parser.add_argument('--match-id', type=int, required=True)
+    follow_parser.add_argument('--competition-id', type=int, default=None, help="load player/team names")
+    follow_parser.add_argument('--idle-timeout', type=float, default=None)
+
+    replay_parser = subparsers.add_parser('replay', help="write a finished match to a feed in match time")
+    replay_parser.add_argument('match_id', type=int)
+    replay_parser.add_argument('feed')
+    replay_parser.add_argument('--competition-id', type=int, default=743)
+    replay_parser.add_argument('--speed', type=float, default=60.0)
+
+    args = parser.parse_args()
+
+    if args.command == 'follow':
+        players = squads = None
+        if args.competition_id is not None:
+            from data_loader import load_metadata
+            players, squads = load_metadata(competition_id=args.competition_id)
+        follow(args.feed, args.match_id, players=players, squads=squads, idle_timeout=args.idle_timeout)
+    else:
+        from data_loader import load_events
+        replay_match(load_events(args.match_id, competition_id=args.competition_id), args.feed, speed=args.speed)
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+
+# Counter-attack: open-play regain in the team's own half, shot fired quickly
+COUNTER_MAX_SECONDS = 15
+COUNTER_MAX_PASSES = 5
+
+# Minutes elapsed before each period starts (periods 3/4 are extra time)
+PERIOD_START_MINUTE = {1: 0, 2: 45, 3: 90, 4: 105, 5: 120}
+
+
+def _seconds(timestamp):
+    if pd.api.types.is_timedelta64_dtype(timestamp):
+        return timestamp.dt.total_seconds().to_numpy(dtype=float)
+    return pd.to_numeric(timestamp, errors='coerce').to_numpy(dtype=float)
+
+
+def _previous(values):
+    # values shifted down by one; the first row compares against itself
+    return np.r_[values[:1], values[:-1]]
+
+
+def possession_features(events):
+    """
+    Segment one match's event stream into possessions
+
+    Expects the full kloppy event DataFrame of a single match in stream order.
+    A new possession starts whenever the ball-owning team or the period
+    changes. Everything is computed with cumulative array operations, no
+    per-event Python loop.
+
+    Returns:
+        DataFrame aligned with events: possession_id, possession_start_type
+        ('REGAIN' or 'SET_PIECE'), possession_duration, pass_count,
+        time_since_regain, is_counter_attack
+    """
+    n = len(events)
+    if n == 0:
+        return pd.DataFrame(index=events.index, columns=[
+            'possession_id', 'possession_start_type', 'possession_duration',
+            'pass_count', 'time_since_regain', 'is_counter_attack'
+        ])
+
+    team_col = 'ball_owning_team' if 'ball_owning_team' in events.columns else 'team_id'
+    team = events[team_col].fillna(events['team_id']).ffill().astype(str).to_numpy()
+    period = events['period_id'].to_numpy()
+    seconds = _seconds(events['timestamp'])
+
+    new_possession = (team != _previous(team)) | (period != _previous(period))
+    new_possession[0] = True
+    possession_id = np.cumsum(new_possession) - 1
+    start_row = np.flatnonzero(new_possession)[possession_id]
+
+    # Passes by the possessing team strictly before each event
+    is_pass = ((events['event_type'] == 'PASS').to_numpy() & (events['team_id'].astype(str).to_numpy() == team)).astype(int)
+    passes_before = np.cumsum(is_pass) - is_pass
+    pass_count = passes_before - passes_before[start_row]
+
+    duration = seconds - seconds[start_row]
+
+    if 'set_piece_type' in events.columns:
+        started_from_set_piece = events['set_piece_type'].notna().to_numpy()[start_row]
+    else:
+        started_from_set_piece = np.zeros(n, dtype=bool)
+    time_since_regain = np.where(started_from_set_piece, np.nan, duration)
+
+    # Where the possession began, relative to the goal each event attacks
+    x = events['coordinates_x'].to_numpy(dtype=float)
+    start_x = pd.Series(x).groupby(possession_id).transform('first').to_numpy()
+    attacking_right = x >= 60
+    started_in_own_half = np.where(attacking_right, start_x < 60, start_x >= 60)
+
+    is_counter_attack = (
+        ~started_from_set_piece
+        & started_in_own_half
+        & (duration <= COUNTER_MAX_SECONDS)
+        & (pass_count <= COUNTER_MAX_PASSES)
+    )
+
+    return pd.DataFrame({
+        'possession_id': possession_id,
+        'possession_start_type': np.where(started_from_set_piece, 'SET_PIECE', 'REGAIN'),
+        'possession_duration': duration,
+        'pass_count': pass_count,
+        'time_since_regain': time_since_regain,
+        'is_counter_attack': is_counter_attack,
+    }, index=events.index)
+
+
+def game_state_features(events):
+    """
+    Score line and clock for every event of one match, from its own team's view
+
+    Goals are counted with cumulative sums over the event stream, so each
+    event sees only the goals scored before it (a goal does not count towards
+    the score line it was scored at). Own goals are credited to the opponent.
+
+    Returns:
+        DataFrame aligned with events: goals_for, goals_against,
+        score_differential, game_state ('LEADING', 'LEVEL', 'TRAILING'),
+        match_minute
+    """
+    # Team-less events (e.g. period markers) get code -1 and no perspective
+    team_codes, teams = pd.factorize(events['team_id'])
+    n_teams = len(teams)
+    has_team = team_codes >= 0
+
+    is_shot = (events['event_type'] == 'SHOT').to_numpy()
+    result = events['result'].astype(str).to_numpy() if 'result' in events.columns else np.full(len(events), '')
+    scoring_team = np.where(is_shot & (result == 'GOAL'), team_codes, -1)
+    if n_teams == 2:
+        scoring_team = np.where(is_shot & has_team & (result == 'OWN_GOAL'), 1 - team_codes, scoring_team)
+
+    # goals[i, k]: goals by team k strictly before event i
+    scored = np.zeros((len(events), max(n_teams, 1)), dtype=np.int64)
+    rows = np.flatnonzero(scoring_team >= 0)
+    scored[rows, scoring_team[rows]] = 1
+    goals = np.cumsum(scored, axis=0) - scored
+
+    total = goals.sum(axis=1)
+    goals_for = np.where(has_team, goals[np.arange(len(events)), np.maximum(team_codes, 0)], 0)
+    goals_against = np.where(has_team, total - goals_for, 0)
+    score_differential = goals_for - goals_against
+
+    period = events['period_id'].to_numpy()
+    period_start = pd.Series(period).map(PERIOD_START_MINUTE).fillna(0).to_numpy()
+    match_minute = period_start + _seconds(events['timestamp']) / 60
+
+    return pd.DataFrame({
+        'goals_for': goals_for,
+        'goals_against': goals_against,
+        'score_differential': score_differential,
+        'game_state': np.select([score_differential > 0, score_differential < 0], ['LEADING', 'TRAILING'], default='LEVEL'),
+        'match_minute': match_minute,
+    }, index=events.index)
+
+
+def opponent_team_ids(events):
+    """
+    The other team of a two-team event stream for every event (None otherwise)
+    """
+    teams = pd.unique(events['team_id'].dropna())
+    if len(teams) != 2:
+        return pd.Series(None, index=events.index, dtype=object, name='opponent_team_id')
+    return events['team_id'].map({teams[0]: teams[1], teams[1]: teams[0]}).rename('opponent_team_id')
+
+
+def add_match_context(events):
+    """
+    Attach per-event match context columns to a single match's event stream
+    """
+    return (
+        events.join(possession_features(events))
+        .join(game_state_features(events))
+        .join(opponent_team_ids(events))
+    )
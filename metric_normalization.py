@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+# Leaderboard metrics that get a percentile and z-score (those present)
+NORMALIZED_METRICS = [
+    'overall_sdq', 'adjusted_sdq', 'sdq_median', 'consistency',
+    'avg_location_score', 'avg_pressure_score', 'avg_shot_type_score', 'avg_timing_score',
+    'avg_expected_value', 'conversion_rate', 'total_shots', 'goals', 'avg_distance', 'avg_angle'
+]
+
+# Players are compared with others of the same competition and position
+GROUP_COLUMNS = ['competition_id', 'position']
+
+# Players with fewer shots are left out of the reference pool and get no
+# percentile or z-score; a one-shot player's consistency is 100 by definition
+# (same as the dashboard's default minimum)
+MIN_SHOTS = 5
+
+
+def add_normalized_metrics(leaderboard_df, metrics=None, group_columns=GROUP_COLUMNS, min_shots=MIN_SHOTS):
+    """
+    Add {metric}_pct and {metric}_z columns for every leaderboard metric
+
+    Percentiles and z-scores are taken within each group (competition and
+    position by default) among players with at least min_shots shots, so a
+    consistency of 85 means the same thing in a league with a different shot
+    profile. Players below min_shots get NaN. Percentiles rank the raw value
+    (ties share their average rank, the highest value is at 100): a high
+    avg_distance percentile means long-range, not better. Z-scores use the
+    group's population standard deviation; a group whose values are all
+    equal gets z = 0. Group columns that are missing are ignored.
+    """
+    if len(leaderboard_df) == 0:
+        return leaderboard_df
+    if metrics is None:
+        metrics = NORMALIZED_METRICS
+    metrics = [m for m in metrics if m in leaderboard_df.columns]
+    group_columns = [c for c in group_columns if c in leaderboard_df.columns]
+
+    if 'total_shots' in leaderboard_df.columns:
+        pool = leaderboard_df[leaderboard_df['total_shots'] >= min_shots]
+    else:
+        pool = leaderboard_df
+    values = pool[metrics].astype(float)
+    keys = [pool[c] for c in group_columns] if group_columns else np.zeros(len(pool), dtype=int)
+    groups = values.groupby(keys, sort=False, observed=True, dropna=False)
+
+    percentiles = groups.rank(pct=True) * 100
+    deviations = values - groups.transform('mean')
+    stds = groups.transform('std', ddof=0)
+    z_scores = (deviations / stds).where(stds > 0, 0.0).where(values.notna())
+
+    percentiles.columns = [f'{m}_pct' for m in metrics]
+    z_scores.columns = [f'{m}_z' for m in metrics]
+    normalized = pd.concat([percentiles, z_scores], axis=1).reindex(leaderboard_df.index)
+
+    leaderboard_df = leaderboard_df.drop(columns=[c for c in normalized.columns if c in leaderboard_df.columns])
+    return pd.concat([leaderboard_df, normalized], axis=1)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+
+
+# Ridge penalty, in shots: a player with n shots keeps about n / (n + RIDGE)
+# of their raw deviation from the league mean
+RIDGE = 10.0
+
+
+def opponent_cells(shot_sdq_df):
+    """
+    Sufficient statistics of the opponent model: shots and SDQ sum per player x opponent
+
+    The ridge fit only depends on these sums, so cells from separate batches
+    can be concatenated and summed (see streaming_pipeline.RunningAggregates)
+    instead of keeping the shots.
+    """
+    shots = shot_sdq_df.dropna(subset=['player_id', 'opponent_team_id', 'sdq'])
+    return (
+        shots.groupby(['player_id', 'opponent_team_id'], sort=False, observed=True)['sdq']
+        .agg(shots='size', sdq_sum='sum')
+        .reset_index()
+    )
+
+
+def design_matrix(cells):
+    """
+    Sparse one-hot design over player and opponent-team effects, one row per cell
+
+    Returns:
+        X: CSR matrix (n_cells x (n_players + n_opponents)) with two ones per row
+        players: player ids in column order
+        opponents: opponent team ids in column order (after the player columns)
+    """
+    player_codes, players = pd.factorize(cells['player_id'])
+    opponent_codes, opponents = pd.factorize(cells['opponent_team_id'])
+    n = len(cells)
+
+    rows = np.r_[np.arange(n), np.arange(n)]
+    cols = np.r_[player_codes, len(players) + opponent_codes]
+    X = sparse.csr_matrix((np.ones(2 * n), (rows, cols)), shape=(n, len(players) + len(opponents)))
+    return X, players, opponents
+
+
+def fit_cells(cells, ridge=RIDGE):
+    """
+    Ridge fit of sdq = league mean + player effect + opponent effect from opponent_cells
+
+    Each cell enters as its mean SDQ weighted by its shot count (rows scaled
+    by sqrt(shots)), which gives the same normal equations as one row per
+    shot. Solved with LSQR on the sparse design (the ridge enters as LSQR's
+    damp), so cost grows with the number of cells, not players squared.
+
+    Returns:
+        player_effects: Series by player_id (SDQ above the league mean against
+            an average opponent)
+        opponent_effects: Series by opponent team_id (positive: teams that
+            concede better-chosen shots, i.e. weaker shot suppression)
+        league_mean: float
+    """
+    cells = cells.groupby(['player_id', 'opponent_team_id'], sort=False, observed=True)[['shots', 'sdq_sum']].sum().reset_index()
+    shots = cells['shots'].to_numpy(dtype=float)
+    league_mean = float(cells['sdq_sum'].sum() / shots.sum())
+
+    X, players, opponents = design_matrix(cells)
+    weight = np.sqrt(shots)
+    y = weight * (cells['sdq_sum'].to_numpy(dtype=float) / shots - league_mean)
+    solution = lsqr(sparse.diags(weight) @ X, y, damp=np.sqrt(ridge), atol=1e-10, btol=1e-10)[0]
+
+    player_effects = pd.Series(solution[:len(players)], index=players, name='player_effect')
+    opponent_effects = pd.Series(solution[len(players):], index=opponents, name='opponent_effect')
+    # Centre the opponents so "average opponent" means an effect of zero
+    shift = opponent_effects.mean()
+    return player_effects + shift, opponent_effects - shift, league_mean
+
+
+def fit_opponent_model(shot_sdq_df, ridge=RIDGE):
+    """
+    fit_cells over a table of scored shots (see fit_cells for the returns)
+    """
+    return fit_cells(opponent_cells(shot_sdq_df), ridge=ridge)
+
+
+def add_opponent_adjustment(leaderboard_df, shot_sdq_df, ridge=RIDGE):
+    """
+    Add opponent-adjusted SDQ columns to a leaderboard
+
+    adjusted_sdq: league mean + player effect (expected SDQ against an
+    average opponent, shrunk towards the mean for small samples)
+    avg_opponent_effect: mean opponent effect over the player's shots
+    (negative: faced opponents that suppress shot quality)
+
+    Leaves the leaderboard unchanged if shots have no opponent_team_id.
+    """
+    if 'opponent_team_id' not in shot_sdq_df.columns:
+        return leaderboard_df
+    return add_cell_adjustment(leaderboard_df, opponent_cells(shot_sdq_df), ridge=ridge)
+
+
+def add_cell_adjustment(leaderboard_df, cells, ridge=RIDGE):
+    """
+    add_opponent_adjustment from opponent_cells instead of shots
+    """
+    if len(cells) == 0:
+        return leaderboard_df
+
+    player_effects, opponent_effects, league_mean = fit_cells(cells, ridge=ridge)
+
+    # kloppy ids are strings; the leaderboard's player_id is int
+    player_effects.index = player_effects.index.astype(int)
+    faced = cells['opponent_team_id'].map(opponent_effects) * cells['shots']
+    by_player = cells['player_id'].astype(int)
+    avg_faced = faced.groupby(by_player).sum() / cells['shots'].groupby(by_player).sum()
+
+    player_ids = leaderboard_df['player_id'].astype(int)
+    leaderboard_df['adjusted_sdq'] = (league_mean + player_ids.map(player_effects)).to_numpy()
+    leaderboard_df['avg_opponent_effect'] = player_ids.map(avg_faced).to_numpy()
+    return leaderboard_df
+
+
+def opponent_table(shot_sdq_df, squads=None, ridge=RIDGE):
+    """
+    Opponent effects per team, lowest (hardest to shoot well against) first
+    """
+    _, opponent_effects, _ = fit_opponent_model(shot_sdq_df, ridge=ridge)
+    table = opponent_effects.rename_axis('team_id').reset_index()
+    table['shots_faced'] = table['team_id'].map(shot_sdq_df['opponent_team_id'].value_counts())
+    if squads is not None and 'id' in squads.columns and 'name' in squads.columns:
+        table['team'] = table['team_id'].astype(str).map(squads.set_index(squads['id'].astype(str))['name'])
+    return table.sort_values('opponent_effect').reset_index(drop=True)
@@ -0,0 +1,149 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from shot_decision_quality import ShotDecisionQuality
+
+
+# Numeric outputs written by workers, in column order of the output buffer
+OUTPUT_COLUMNS = [
+    'sdq', 'location_score', 'timing_score', 'pressure_score',
+    'shot_type_score', 'expected_value', 'distance_to_goal', 'shot_angle'
+]
+
+# Below this many shots the pool start-up costs more than it saves
+MIN_PARALLEL_SHOTS = 200_000
+
+# Per-process state set by the pool initializer
+_worker = {}
+
+
+def _share(array):
+    """
+    Copy an array into a new shared memory block; returns (block, spec)
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _encode(values):
+    # Strings travel as int codes into a small category list (-1 = missing)
+    codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    return codes.astype(np.int32), np.asarray(categories, dtype=object)
+
+
+def _init_worker(sdq_calculator, input_specs, output_spec, categories):
+    _worker['calculator'] = sdq_calculator
+    _worker['blocks'] = []
+    _worker['inputs'] = {}
+    for name, spec in input_specs.items():
+        block, array = _attach(spec)
+        _worker['blocks'].append(block)
+        _worker['inputs'][name] = array
+    block, _worker['output'] = _attach(output_spec)
+    _worker['blocks'].append(block)
+    _worker['categories'] = categories
+
+
+def _decode(codes, categories):
+    values = np.empty(len(codes), dtype=object)
+    valid = codes >= 0
+    values[valid] = categories[codes[valid]]
+    return values
+
+
+def _score_chunk(bounds):
+    lo, hi = bounds
+    inputs = _worker['inputs']
+    categories = _worker['categories']
+
+    scores = _worker['calculator'].score_arrays(
+        x=inputs['x'][lo:hi],
+        y=inputs['y'][lo:hi],
+        body_part=_decode(inputs['body_part'][lo:hi], categories['body_part']),
+        under_pressure=inputs['under_pressure'][lo:hi],
+        is_counter_attack=inputs['is_counter_attack'][lo:hi],
+        set_piece_type=_decode(inputs['set_piece_type'][lo:hi], categories['set_piece_type']),
+        score_differential=inputs['score_differential'][lo:hi] if 'score_differential' in inputs else None,
+        match_minute=inputs['match_minute'][lo:hi] if 'match_minute' in inputs else None,
+    )
+
+    # Each chunk owns rows lo:hi of the output, so results land in order
+    output = _worker['output']
+    for i, name in enumerate(OUTPUT_COLUMNS):
+        output[lo:hi, i] = scores[name]
+    return hi - lo
+
+
+def score_shots_parallel(shots, sdq_calculator=None, n_workers=None, chunk_size=100_000):
+    """
+    ShotDecisionQuality.score_shots across a process pool
+
+    Input columns are copied once into shared memory (strings as int codes)
+    and workers write their rows straight into a shared output matrix, so no
+    DataFrame is pickled to or from the workers.
+
+    Returns:
+        DataFrame identical to sdq_calculator.score_shots(shots)
+    """
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
+    n_workers = n_workers or os.cpu_count() or 1
+
+    if n_workers == 1 or len(shots) < MIN_PARALLEL_SHOTS:
+        return sdq_calculator.score_shots(shots)
+
+    inputs = sdq_calculator.shot_inputs(shots)
+    categories = {}
+    for name in ('body_part', 'set_piece_type'):
+        inputs[name], categories[name] = _encode(inputs[name])
+    inputs['under_pressure'] = np.asarray(inputs['under_pressure'], dtype=bool)
+    inputs = {name: np.ascontiguousarray(array) for name, array in inputs.items() if array is not None}
+
+    n = len(shots)
+    blocks = []
+    try:
+        input_specs = {}
+        for name, array in inputs.items():
+            block, input_specs[name] = _share(array)
+            blocks.append(block)
+        output_block, output_spec = _share(np.zeros((n, len(OUTPUT_COLUMNS)), dtype=np.float64))
+        blocks.append(output_block)
+
+        # At least one chunk per worker so every core gets work
+        chunk_size = max(1, min(chunk_size, -(-n // n_workers)))
+        chunks = [(lo, min(lo + chunk_size, n)) for lo in range(0, n, chunk_size)]
+
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(sdq_calculator, input_specs, output_spec, categories),
+        ) as pool:
+            scored = sum(pool.map(_score_chunk, chunks))
+        if scored != n:
+            raise RuntimeError(f"Scored {scored} of {n} shots")
+
+        output = np.ndarray((n, len(OUTPUT_COLUMNS)), dtype=np.float64, buffer=output_block.buf)
+        result = pd.DataFrame(output.copy(), columns=OUTPUT_COLUMNS, index=shots.index)
+        del output
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    for name in ('timing_score', 'pressure_score', 'shot_type_score'):
+        result[name] = result[name].astype(np.int64)
+    success = shots['success'].fillna(False).astype(bool).to_numpy() if 'success' in shots.columns else np.zeros(n, dtype=bool)
+    result['shot_result'] = np.where(success, 'GOAL', 'NO_GOAL')
+
+    return result
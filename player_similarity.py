@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+# Per-player profile the similarity is measured on
+PROFILE_COLUMNS = [
+    'avg_location_score', 'avg_pressure_score', 'avg_shot_type_score', 'avg_timing_score',
+    'consistency', 'avg_distance', 'avg_angle', 'conversion_rate'
+]
+
+# Columns carried into query results when the leaderboard has them
+LABEL_COLUMNS = ['player_name', 'team', 'position', 'competition_id', 'overall_sdq', 'total_shots']
+
+
+def profile_matrix(leaderboard_df, columns=PROFILE_COLUMNS, weights=None):
+    """
+    Z-scored profile vectors, one row per player
+
+    Each column is standardized across the players given, so a yard of
+    distance and a point of location score weigh the same. weights (dict of
+    column -> multiplier) stretch individual axes after standardizing.
+    """
+    values = leaderboard_df[list(columns)].to_numpy(dtype=float)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    matrix = np.nan_to_num((values - mean) / std)
+    if weights:
+        matrix = matrix * np.array([weights.get(c, 1.0) for c in columns])
+    return matrix
+
+
+class PlayerSimilarityIndex:
+    """
+    k-d tree over normalized per-player SDQ profiles
+
+    Built once per leaderboard (which may span several competitions); a
+    k-nearest query for one player is a single tree lookup, and all_pairs
+    answers every player in one batched query.
+    """
+
+    def __init__(self, leaderboard_df, columns=PROFILE_COLUMNS, weights=None):
+        self.players = leaderboard_df.drop_duplicates('player_id').reset_index(drop=True)
+        self.columns = list(columns)
+        self.vectors = profile_matrix(self.players, self.columns, weights)
+        self.tree = cKDTree(self.vectors)
+        self.player_ids = self.players['player_id'].to_numpy()
+        self._rows = pd.Series(np.arange(len(self.players)), index=self.player_ids)
+
+    def row(self, player_id):
+        if player_id not in self._rows.index:
+            raise KeyError(f"Player {player_id} is not in the similarity index")
+        return int(self._rows[player_id])
+
+    def _results(self, query_rows, neighbour_rows, ranks, distances):
+        # All arguments are flat arrays, one entry per result row
+        result = pd.DataFrame({
+            'player_id': self.player_ids[query_rows],
+            'similar_player_id': self.player_ids[neighbour_rows],
+            'rank': ranks,
+            'distance': distances,
+        })
+        # 1 for an identical profile, falling towards 0 with distance
+        result['similarity'] = 1 / (1 + result['distance'])
+        labels = [c for c in LABEL_COLUMNS if c in self.players.columns]
+        for col in labels:
+            result[f'similar_{col}'] = self.players[col].to_numpy()[neighbour_rows]
+        return result
+
+    def similar(self, player_id, k=10, exclude_team=False):
+        """
+        The k players with the closest profile to player_id (the player excluded)
+
+        exclude_team: skip teammates (replacement candidates from elsewhere)
+
+        Returns:
+            DataFrame ordered by rank with similar_player_id, distance,
+            similarity and similar_<label> columns
+        """
+        row = self.row(player_id)
+        k = min(k, len(self.players) - 1)
+        empty = np.array([], dtype=int)
+        if k <= 0:
+            return self._results(empty, empty, empty, np.array([]))
+
+        candidates = self.players['team'].to_numpy() if exclude_team and 'team' in self.players.columns else None
+        fetch = k + 1
+        while True:
+            distances, neighbours = self.tree.query(self.vectors[row], k=min(fetch, len(self.players)))
+            distances, neighbours = np.atleast_1d(distances), np.atleast_1d(neighbours)
+            keep = neighbours != row
+            if candidates is not None:
+                keep &= candidates[neighbours] != candidates[row]
+            # Widen the query until k candidates survive the filters
+            if keep.sum() >= k or fetch >= len(self.players):
+                break
+            fetch *= 2
+
+        neighbours = neighbours[keep][:k]
+        distances = distances[keep][:k]
+        return self._results(np.full(len(neighbours), row), neighbours, np.arange(1, len(neighbours) + 1), distances)
+
+    def all_pairs(self, k=5):
+        """
+        k nearest players for every player in one batched tree query
+
+        Returns:
+            long DataFrame with one row per (player_id, similar_player_id)
+        """
+        k = min(k, len(self.players) - 1)
+        empty = np.array([], dtype=int)
+        if k <= 0:
+            return self._results(empty, empty, empty, np.array([]))
+
+        distances, neighbours = self.tree.query(self.vectors, k=k + 1)
+        # Each player is its own nearest neighbour unless another has an
+        # identical profile, so drop self wherever it appears
+        n = len(self.players)
+        is_self = neighbours == np.arange(n)[:, None]
+        drop = np.where(is_self.any(axis=1), is_self.argmax(axis=1), k)
+        keep = np.ones_like(is_self)
+        keep[np.arange(n), drop] = False
+        neighbours = neighbours[keep].reshape(n, k)
+        distances = distances[keep].reshape(n, k)
+        return self._results(
+            np.repeat(np.arange(n), k), neighbours.ravel(), np.tile(np.arange(1, k + 1), n), distances.ravel()
+        )
+
+    def similarity_table(self, k=5):
+        """
+        Wide league-wide table: each player's k most similar names in order
+        """
+        pairs = self.all_pairs(k)
+        name_col = 'similar_player_name' if 'similar_player_name' in pairs.columns else 'similar_player_id'
+        table = pairs.pivot(index='player_id', columns='rank', values=name_col)
+        table.columns = [f'similar_{rank}' for rank in table.columns]
+        table = table.reset_index()
+        if 'player_name' in self.players.columns:
+            table.insert(1, 'player_name', table['player_id'].map(self.players.set_index('player_id')['player_name']))
+        return table
@@ -0,0 +1,206 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import arrow_store
+from metric_normalization import add_normalized_metrics
+from shot_decision_quality import ShotDecisionQuality, create_shot_analysis
+from shot_validation import validate_shots
+from streaming_pipeline import RunningAggregates
+
+
+# Seconds of ingestion before the first approximate leaderboard is published
+# (as soon as a match has been scored after that)
+FIRST_PUBLISH_SECONDS = 2
+
+# Seconds between later republications
+PUBLISH_EVERY_SECONDS = 10
+
+# z for the two-sided 95% interval around each player's SDQ
+INTERVAL_Z = 1.96
+
+PARTIAL_TABLE = 'leaderboard_partial'
+
+
+def add_uncertainty(leaderboard_df, z=INTERVAL_Z):
+    """
+    Standard error and interval of each player's mean SDQ
+
+    Players with a single shot have no spread of their own, so they get the
+    league-wide shot-level spread instead of a zero-width interval.
+    """
+    n = leaderboard_df['total_shots'].to_numpy(dtype=float)
+    spread = leaderboard_df['sdq_std'].to_numpy(dtype=float)
+    league_spread = np.sqrt(np.average(spread ** 2, weights=n)) if n.sum() > 0 else 0.0
+    spread = np.where(n > 1, spread, league_spread)
+
+    leaderboard_df['sdq_se'] = spread / np.sqrt(n)
+    leaderboard_df['sdq_low'] = leaderboard_df['overall_sdq'] - z * leaderboard_df['sdq_se']
+    leaderboard_df['sdq_high'] = leaderboard_df['overall_sdq'] + z * leaderboard_df['sdq_se']
+    return leaderboard_df
+
+
+def partial_path(competition_id=743, data_dir=arrow_store.DATA_DIR):
+    return arrow_store.table_path(PARTIAL_TABLE, competition_id, data_dir)
+
+
+def lock_path(competition_id=743, data_dir=arrow_store.DATA_DIR):
+    return os.path.join(data_dir, f'{PARTIAL_TABLE}_{competition_id}.lock')
+
+
+def _try_lock(lock_file):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def acquire_build_lock(competition_id=743, data_dir=arrow_store.DATA_DIR):
+    """
+    Take the cross-process lock on a competition's progressive build
+
+    The lock belongs to the open file, so the OS releases it when the file
+    is closed or the process dies; a crashed build never blocks the next.
+
+    Returns:
+        the open lock file (close it to release), or None if another build holds it
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    lock_file = open(lock_path(competition_id, data_dir), 'a+')
+    if _try_lock(lock_file):
+        return lock_file
+    lock_file.close()
+    return None
+
+
+def build_in_progress(competition_id=743, data_dir=arrow_store.DATA_DIR):
+    """
+    Whether any process (this one included) is running a progressive build
+    """
+    lock_file = acquire_build_lock(competition_id, data_dir)
+    if lock_file is None:
+        return True
+    lock_file.close()
+    return False
+
+
+def publish_partial(aggregates, players, squads, sdq_calculator, matches_total, competition_id=743,
+                    data_dir=arrow_store.DATA_DIR):
+    """
+    Publish the current approximate leaderboard with its progress and uncertainty
+    """
+    from data_loader import add_player_info
+
+    leaderboard_df = aggregates.leaderboard()
+    if leaderboard_df.empty:
+        return None
+    leaderboard_df = add_player_info(leaderboard_df, aggregates.cube(), players, squads)
+    leaderboard_df['xg_version'] = sdq_calculator.xg_version
+    leaderboard_df = add_uncertainty(leaderboard_df)
+    leaderboard_df['competition_id'] = competition_id
+    leaderboard_df = add_normalized_metrics(leaderboard_df)
+    leaderboard_df['matches_processed'] = aggregates.n_matches
+    leaderboard_df['matches_total'] = matches_total
+
+    path = partial_path(competition_id, data_dir)
+    arrow_store.write_table(leaderboard_df, path)
+    print(f"  Published approximate leaderboard: {aggregates.n_matches}/{matches_total} matches, {len(leaderboard_df)} players")
+    return path
+
+
+def progressive_build(competition_id=743, sdq_calculator=None, first_publish=FIRST_PUBLISH_SECONDS,
+                      publish_every=PUBLISH_EVERY_SECONDS, seed=0, data_dir=arrow_store.DATA_DIR):
+    """
+    Ingest a competition while publishing ever better approximate leaderboards
+
+    Matches are loaded in a shuffled order so every partial leaderboard is a
+    random sample of the season rather than its first weeks. The first match
+    scored after first_publish seconds, and then one every publish_every
+    seconds, publishes the running aggregates to the 'leaderboard_partial'
+    Arrow table with per-player SDQ intervals. Once every match is in, the
+    exact leaderboard is built and published as usual (and cached). The
+    partial table is removed at the end whether or not the build succeeded.
+
+    Only one process builds a competition at a time (acquire_build_lock);
+    the others return at once and can wait for its tables instead.
+
+    Returns:
+        path of the published exact leaderboard, or None if nothing loaded
+        or another process is already building
+    """
+    from data_loader import load_metadata, get_matches, iter_match_shots, leaderboard_from_shots
+
+    lock_file = acquire_build_lock(competition_id, data_dir)
+    if lock_file is None:
+        print(f"Competition {competition_id} is already being built by another process")
+        return None
+
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
+
+    aggregates = RunningAggregates()
+    frames = []
+    try:
+        # A partial left by a build that was killed is not current
+        if os.path.exists(partial_path(competition_id, data_dir)):
+            os.remove(partial_path(competition_id, data_dir))
+
+        players, squads = load_metadata(competition_id=competition_id)
+        matches = get_matches(competition_id=competition_id).sample(frac=1, random_state=seed)
+        matches_total = len(matches)
+
+        next_publish = time.monotonic() + first_publish
+        for shots in iter_match_shots(competition_id=competition_id, matches=matches):
+            frames.append(shots)
+            valid, _, _ = validate_shots(shots)
+            if len(valid) > 0:
+                aggregates.update(create_shot_analysis(valid, sdq_calculator=sdq_calculator))
+            if aggregates.n_matches > 0 and time.monotonic() >= next_publish:
+                publish_partial(aggregates, players, squads, sdq_calculator, matches_total, competition_id, data_dir)
+                next_publish = time.monotonic() + publish_every
+
+        if not frames:
+            print("ERROR: No shots loaded!")
+            return None
+
+        # Restore schedule order so the exact build (and its cache key) matches load_all_shots
+        order = {match_id: position for position, match_id in enumerate(matches.sort_index()['match_id'])}
+        frames.sort(key=lambda df: order.get(df['match_id'].iloc[0], len(order)))
+        shots_all = pd.concat(frames, ignore_index=True)
+        del frames
+
+        shot_sdq_df, leaderboard_df, _, quarantine_df, _ = leaderboard_from_shots(
+            shots_all, players, squads, competition_id, sdq_calculator, return_quarantine=True
+        )
+        return arrow_store.publish_frames(shot_sdq_df, leaderboard_df, competition_id=competition_id,
+                                          data_dir=data_dir, quarantine_df=quarantine_df)
+    finally:
+        # Never leave an approximate leaderboard behind, even if the build failed
+        if os.path.exists(partial_path(competition_id, data_dir)):
+            os.remove(partial_path(competition_id, data_dir))
+        lock_file.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish approximate leaderboards while ingesting a competition")
+    parser.add_argument('--competition-id', type=int, default=743)
+    parser.add_argument('--first-publish', type=float, default=FIRST_PUBLISH_SECONDS, help="seconds")
+    parser.add_argument('--publish-every', type=float, default=PUBLISH_EVERY_SECONDS, help="seconds")
+    args = parser.parse_args()
+
+    progressive_build(competition_id=args.competition_id, first_publish=args.first_publish,
+                      publish_every=args.publish_every)
@@ -0,0 +1,430 @@
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from shot_index import attacking_coordinates
+
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports')
+
+# Shot columns the reports draw on; only these are shipped to the workers
+SHOT_COLUMNS = ['player_id', 'team_id', 'coordinates_x', 'coordinates_y', 'sdq', 'shot_result', 'body_part_type', 'match_id']
+
+COMPONENTS = {
+    'avg_location_score': 'Location',
+    'avg_pressure_score': 'Pressure',
+    'avg_shot_type_score': 'Shot Type',
+    'avg_timing_score': 'Timing',
+    'consistency': 'Consistency',
+}
+
+TABLE_COLUMNS = {
+    'player_name': 'Player',
+    'position': 'Position',
+    'overall_sdq': 'SDQ',
+    'total_shots': 'Shots',
+    'goals': 'Goals',
+    'conversion_rate': 'Conversion %',
+    'avg_distance': 'Avg Distance',
+    'consistency': 'Consistency',
+}
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{plotlyjs}
+<style>
+  body {{ font-family: sans-serif; margin: 2rem; color: #222; }}
+  h1 {{ color: #1f77b4; }}
+  table {{ border-collapse: collapse; margin: 1rem 0; }}
+  th, td {{ padding: 0.3rem 0.8rem; border-bottom: 1px solid #ddd; text-align: right; }}
+  th:first-child, td:first-child {{ text-align: left; }}
+  .figures {{ display: flex; flex-wrap: wrap; gap: 1rem; }}
+  .meta {{ color: #666; font-size: 0.9rem; }}
+</style>
+</head>
+<body>
+<p class="meta"><a href="{root}index.html">All teams</a></p>
+{body}
+<p class="meta">Shot Decision Quality report &middot; data {data_hash}</p>
+</body>
+</html>
+"""
+
+# Per-process state set by the pool initializer
+_worker = {}
+
+
+def code_version():
+    """
+    Hash of this module; a template or figure change regenerates every report
+    """
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def _row_hashes(df):
+    if len(df) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    try:
+        return pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except TypeError:
+        return pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+
+
+def entity_hashes(leaderboard_df, shots_df, league_context=None):
+    """
+    Content hash per player and per team of everything their reports show
+
+    Shot rows are hashed once in bulk and folded per player with an
+    order-independent sum (mod 2**64, so repeated rows do not cancel out),
+    so a matchday only changes the hashes of players who shot in it (and
+    their teams). league_context holds what every page shows about the whole
+    league (averages, league size); a change to it changes every hash.
+
+    Returns:
+        dict mapping 'player/<id>' and 'team/<id>' to a hex digest
+    """
+    version = code_version()
+    if league_context is not None:
+        version += '|' + json.dumps(league_context, sort_keys=True)
+
+    shot_hashes = _row_hashes(shots_df)
+    shot_players = shots_df['player_id'].to_numpy()
+    order = np.argsort(shot_players, kind='stable')
+    sorted_players = shot_players[order]
+    starts = np.flatnonzero(np.r_[True, sorted_players[1:] != sorted_players[:-1]]) if len(order) else np.array([], dtype=int)
+    folded = np.add.reduceat(shot_hashes[order], starts, dtype=np.uint64) if len(order) else np.array([], dtype=np.uint64)
+    shot_digest = dict(zip(sorted_players[starts], zip(folded, np.diff(np.r_[starts, len(order)]))))
+
+    hashes = {}
+    row_hashes = _row_hashes(leaderboard_df)
+    for player_id, row_hash in zip(leaderboard_df['player_id'], row_hashes):
+        shots_hash, n_shots = shot_digest.get(player_id, (0, 0))
+        key = f'{version}|{row_hash}|{shots_hash}|{n_shots}'
+        hashes[f'player/{player_id}'] = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    # A team page shows its players' rows, so it changes with any of them
+    for team_id, members in leaderboard_df.groupby('team_id', sort=False)['player_id']:
+        key = '|'.join([version] + [hashes[f'player/{p}'] for p in sorted(members)])
+        hashes[f'team/{team_id}'] = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    return hashes
+
+
+def load_manifest(report_dir):
+    path = os.path.join(report_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------------
+# Figure components (cached per worker, shared by every report it writes)
+# ----------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def pitch_shapes():
+    """
+    Attacking half pitch outline as plotly shapes (built once per process)
+    """
+    line = dict(color='#888', width=1)
+    return [
+        dict(type='rect', x0=60, y0=0, x1=120, y1=80, line=line),
+        dict(type='rect', x0=102, y0=18, x1=120, y1=62, line=line),
+        dict(type='rect', x0=114, y0=30, x1=120, y1=50, line=line),
+        dict(type='line', x0=120, y0=36, x1=120, y1=44, line=dict(color='#222', width=4)),
+        dict(type='circle', x0=50, y0=30, x1=70, y1=50, line=line),
+    ]
+
+
+@lru_cache(maxsize=1)
+def league_radar_trace():
+    import plotly.graph_objects as go
+
+    averages = _worker['league_averages']
+    return go.Scatterpolar(
+        r=[averages[c] for c in COMPONENTS], theta=list(COMPONENTS.values()),
+        name='League average', line=dict(color='#aaa', dash='dash')
+    )
+
+
+@lru_cache(maxsize=None)
+def player_radar_trace(player_id):
+    """
+    A player's component trace; reused by the player page and the team page
+    """
+    import plotly.graph_objects as go
+
+    row = _worker['players'].loc[player_id]
+    return go.Scatterpolar(
+        r=[row[c] for c in COMPONENTS], theta=list(COMPONENTS.values()),
+        fill='toself', name=str(row.get('player_name', player_id))
+    )
+
+
+def _figure_html(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={'displaylogo': False})
+
+
+def radar_html(player_ids, title):
+    import plotly.graph_objects as go
+
+    fig = go.Figure([league_radar_trace()] + [player_radar_trace(p) for p in player_ids])
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+        title=title, height=450, width=520, margin=dict(t=60, b=30)
+    )
+    return _figure_html(fig)
+
+
+def shot_map_html(shots, title):
+    import plotly.graph_objects as go
+
+    x, y = attacking_coordinates(shots['coordinates_x'], shots['coordinates_y'])
+    goal = (shots['shot_result'] == 'GOAL').to_numpy()
+    fig = go.Figure(go.Scatter(
+        x=x, y=y, mode='markers',
+        marker=dict(
+            size=np.where(goal, 13, 8), color=shots['sdq'], colorscale='Viridis', cmin=0, cmax=100,
+            symbol=np.where(goal, 'star', 'circle'), showscale=True, colorbar=dict(title='SDQ'),
+            line=dict(width=0.5, color='white')
+        ),
+        text=np.where(goal, 'Goal', 'No goal'),
+        hovertemplate='SDQ %{marker.color:.1f}<br>%{text}<extra></extra>'
+    ))
+    fig.update_layout(
+        shapes=pitch_shapes(), title=title, height=450, width=560, margin=dict(t=60, b=30),
+        xaxis=dict(range=[58, 122], visible=False), yaxis=dict(range=[-2, 82], visible=False, scaleanchor='x'),
+        plot_bgcolor='white'
+    )
+    return _figure_html(fig)
+
+
+def components_html(row, title):
+    import plotly.graph_objects as go
+
+    averages = _worker['league_averages']
+    names = list(COMPONENTS.values())
+    fig = go.Figure([
+        go.Bar(x=names, y=[row[c] for c in COMPONENTS], name=str(row.get('player_name', row.get('team', '')))),
+        go.Bar(x=names, y=[averages[c] for c in COMPONENTS], name='League average', marker_color='#ccc'),
+    ])
+    fig.update_layout(barmode='group', title=title, height=400, width=520, yaxis=dict(range=[0, 100]))
+    return _figure_html(fig)
+
+
+def table_html(df, link_players=False):
+    columns = [c for c in TABLE_COLUMNS if c in df.columns]
+    rows = []
+    for _, row in df[columns + ['player_id']].iterrows():
+        cells = []
+        for col in columns:
+            value = row[col]
+            if col == 'player_name' and link_players:
+                cell = f'<a href="../player/{int(row["player_id"])}.html">{html.escape(str(value))}</a>'
+            elif isinstance(value, (float, np.floating)):
+                cell = f'{value:.1f}'
+            else:
+                cell = html.escape(str(value))
+            cells.append(f'<td>{cell}</td>')
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    header = ''.join(f'<th>{TABLE_COLUMNS[c]}</th>' for c in columns)
+    return f'<table><tr>{header}</tr>{"".join(rows)}</table>'
+
+
+def _page(title, body, data_hash, depth=1):
+    root = '../' * depth
+    plotlyjs = f'<script src="{root}plotly.min.js"></script>'
+    return PAGE.format(title=html.escape(title), plotlyjs=plotlyjs, root=root, body=body, data_hash=data_hash)
+
+
+def player_page(player_id, data_hash):
+    row = _worker['players'].loc[player_id]
+    name = str(row.get('player_name', player_id))
+    team = row.get('team', '')
+    shots = _worker['shots'][_worker['shots']['player_id'] == player_id]
+
+    team_link = f'<a href="../team/{int(row["team_id"])}.html">{html.escape(str(team))}</a>' if pd.notna(row.get('team_id')) else ''
+    body = (
+        f'<h1>{html.escape(name)}</h1>'
+        f'<p>{team_link} &middot; {html.escape(str(row.get("position", "")))} &middot; '
+        f'league rank {int(row["league_rank"])} of {len(_worker["players"])}</p>'
+        + table_html(row.to_frame().T)
+        + '<div class="figures">'
+        + components_html(row, 'Component breakdown')
+        + radar_html([player_id], 'Component profile')
+        + shot_map_html(shots, f'Shot map ({len(shots)} shots)')
+        + '</div>'
+    )
+    return _page(f'{name} - SDQ report', body, data_hash)
+
+
+def team_page(team_id, data_hash):
+    members = _worker['players'][_worker['players']['team_id'] == team_id].sort_values('overall_sdq', ascending=False)
+    team = str(members['team'].iloc[0]) if 'team' in members.columns and len(members) else str(team_id)
+    shots = _worker['shots'][_worker['shots']['team_id'] == team_id]
+    team_row = _worker['teams'].loc[team_id]
+
+    body = (
+        f'<h1>{html.escape(team)}</h1>'
+        f'<p>{len(members)} players &middot; {len(shots)} shots &middot; team SDQ {team_row["overall_sdq"]:.1f}</p>'
+        + table_html(members, link_players=True)
+        + '<div class="figures">'
+        + components_html(team_row, 'Team component breakdown')
+        # Top shooters only; each trace comes from the per-player cache
+        + radar_html(members.index[:5].tolist(), 'Top shooters')
+        + shot_map_html(shots, f'Team shot map ({len(shots)} shots)')
+        + '</div>'
+    )
+    return _page(f'{team} - SDQ report', body, data_hash)
+
+
+def _init_worker(players, teams, shots, league_averages):
+    _worker['players'] = players
+    _worker['teams'] = teams
+    _worker['shots'] = shots
+    _worker['league_averages'] = league_averages
+    player_radar_trace.cache_clear()
+    league_radar_trace.cache_clear()
+
+
+def _render_team(task):
+    """
+    Render one team and its players (grouped so radar traces are reused)
+    """
+    report_dir, team_id, team_hash, player_jobs = task
+    written = []
+    for player_id, data_hash in player_jobs:
+        _write_atomic(os.path.join(report_dir, 'player', f'{player_id}.html'), player_page(player_id, data_hash))
+        written.append(f'player/{player_id}')
+    if team_hash is not None:
+        _write_atomic(os.path.join(report_dir, 'team', f'{team_id}.html'), team_page(team_id, team_hash))
+        written.append(f'team/{team_id}')
+    return written
+
+
+def index_page(teams):
+    items = ''.join(
+        f'<tr><td><a href="team/{int(team_id)}.html">{html.escape(str(row["team"]))}</a></td>'
+        f'<td>{row["overall_sdq"]:.1f}</td><td>{int(row["total_shots"])}</td></tr>'
+        for team_id, row in teams.sort_values('overall_sdq', ascending=False).iterrows()
+    )
+    body = f'<h1>Shot Decision Quality reports</h1><table><tr><th>Team</th><th>SDQ</th><th>Shots</th></tr>{items}</table>'
+    return _page('SDQ reports', body, '', depth=0)
+
+
+def build_report_bundle(shot_sdq_df, leaderboard_df, cube, report_dir=REPORT_DIR, n_workers=None, force=False):
+    """
+    Write static HTML reports for every team and player into report_dir
+
+    Pages share one plotly.min.js at the bundle root, so the directory is
+    self-contained and can be copied or served as is. Entities whose data
+    hash matches manifest.json are skipped; the rest are rendered on a
+    process pool, one task per team with its players.
+
+    Returns:
+        list of report keys ('team/<id>', 'player/<id>') that were written
+    """
+    players = leaderboard_df.dropna(subset=['team_id']).copy()
+    players['team_id'] = players['team_id'].astype(int)
+    players['league_rank'] = players['overall_sdq'].rank(ascending=False, method='min').astype(int)
+    players = players.set_index('player_id', drop=False)
+
+    # kloppy ids are strings; the leaderboard's are ints
+    shots = shot_sdq_df[[c for c in SHOT_COLUMNS if c in shot_sdq_df.columns]].dropna(subset=['player_id', 'team_id'])
+    shots = shots.astype({'player_id': int, 'team_id': int})
+    shots = shots[shots['player_id'].isin(players.index)]
+
+    teams = cube.level('team').dropna(subset=['team_id'])
+    teams['team_id'] = teams['team_id'].astype(int)
+    teams = teams.set_index('team_id')
+    if 'team' in players.columns:
+        teams['team'] = players.drop_duplicates('team_id').set_index('team_id')['team'].reindex(teams.index)
+    else:
+        teams['team'] = teams.index.astype(str)
+    league_averages = {c: float(players[c].mean()) for c in COMPONENTS}
+
+    league_context = {'league_averages': league_averages, 'n_players': len(players)}
+    hashes = entity_hashes(players.reset_index(drop=True), shots, league_context)
+    previous = {} if force else load_manifest(report_dir)
+
+    def stale(key, sub_dir, entity_id):
+        path = os.path.join(report_dir, sub_dir, f'{entity_id}.html')
+        return previous.get(key) != hashes[key] or not os.path.exists(path)
+
+    tasks = []
+    for team_id, members in players.groupby('team_id', sort=False):
+        team_key = f'team/{team_id}'
+        player_jobs = [(p, hashes[f'player/{p}']) for p in members.index if stale(f'player/{p}', 'player', p)]
+        team_hash = hashes[team_key] if stale(team_key, 'team', team_id) else None
+        if player_jobs or team_hash is not None:
+            tasks.append((report_dir, team_id, team_hash, player_jobs))
+
+    n_render = sum(len(player_jobs) + (team_hash is not None) for _, _, team_hash, player_jobs in tasks)
+    print(f"Reports: {n_render} to render, {len(hashes) - n_render} unchanged")
+
+    os.makedirs(report_dir, exist_ok=True)
+    js_path = os.path.join(report_dir, 'plotly.min.js')
+    if not os.path.exists(js_path):
+        from plotly.offline import get_plotlyjs
+        _write_atomic(js_path, get_plotlyjs())
+
+    written = []
+    n_workers = n_workers or os.cpu_count() or 1
+    initargs = (players, teams, shots, league_averages)
+    if n_workers == 1 or len(tasks) <= 1:
+        _init_worker(*initargs)
+        for task in tasks:
+            written.extend(_render_team(task))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=initargs) as pool:
+            for keys in pool.map(_render_team, tasks):
+                written.extend(keys)
+
+    _write_atomic(os.path.join(report_dir, 'index.html'), index_page(teams))
+
+    # Only record what is on disk, so a failed run retries what it missed
+    manifest = {key: value for key, value in previous.items() if key in hashes}
+    manifest.update({key: hashes[key] for key in written})
+    _write_atomic(os.path.join(report_dir, 'manifest.json'), json.dumps(manifest, indent=1, sort_keys=True))
+
+    print(f"✓ Wrote {len(written)} reports to {report_dir}")
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from data_loader import get_leaderboard_data
+
+    parser = argparse.ArgumentParser(description="Generate static HTML SDQ reports per team and player")
+    parser.add_argument('--competition-id', type=int, default=743)
+    parser.add_argument('--output', default=REPORT_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="re-render every report")
+    args = parser.parse_args()
+
+    shot_sdq_df, leaderboard_df, cube = get_leaderboard_data(competition_id=args.competition_id)
+    if leaderboard_df.empty:
+        print("ERROR: No leaderboard to report on")
+    else:
+        build_report_bundle(shot_sdq_df, leaderboard_df, cube, report_dir=args.output,
+                            n_workers=args.workers, force=args.force)
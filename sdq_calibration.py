@@ -0,0 +1,201 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from shot_decision_quality import ShotDecisionQuality
+
+
+# Column order of the component matrix and of every weight vector
+COMPONENTS = ['location', 'pressure', 'shot_type', 'timing']
+COMPONENT_COLUMNS = ['location_score', 'pressure_score', 'shot_type_score', 'timing_score']
+ZONE_NAMES = ['six_yard_box', 'penalty_box', 'danger_zone', 'edge_of_box', 'long_range']
+
+
+def weight_grid(step=0.05, min_weight=0.0):
+    """
+    All weight vectors on the simplex (weights sum to 1) with the given step
+
+    step=0.05 gives 1,771 candidates; min_weight drops vectors that switch a
+    component (almost) off.
+
+    Returns:
+        (k, 4) array in COMPONENTS order
+    """
+    n = int(round(1 / step))
+    vectors = [
+        (a, b, c, n - a - b - c)
+        for a in range(n + 1)
+        for b in range(n + 1 - a)
+        for c in range(n + 1 - a - b)
+    ]
+    weights = np.array(vectors, dtype=float) / n
+    return weights[(weights >= min_weight).all(axis=1)]
+
+
+def random_weights(n, seed=0, concentration=1.0):
+    """
+    n weight vectors sampled uniformly (Dirichlet) from the simplex
+    """
+    rng = np.random.default_rng(seed)
+    return rng.dirichlet(np.full(len(COMPONENTS), concentration), size=n)
+
+
+def zone_grid(**ranges):
+    """
+    Cartesian product of zone thresholds around the current defaults
+
+    Example: zone_grid(penalty_box=[16, 18, 20], edge_of_box=[28, 30, 32])
+    Zones not given keep their ShotDecisionQuality default.
+    """
+    defaults = ShotDecisionQuality().zones
+    names = list(ranges)
+    configs = []
+    for values in itertools.product(*(ranges[name] for name in names)):
+        config = dict(defaults, **dict(zip(names, values)))
+        # Zones are nested distance bands, so thresholds must keep increasing
+        if all(config[a] < config[b] for a, b in zip(ZONE_NAMES, ZONE_NAMES[1:])):
+            configs.append(config)
+    return configs
+
+
+def component_matrix(shot_sdq_df, zones=None):
+    """
+    (n_shots, 4) matrix of component scores in COMPONENTS order
+
+    With zones=None the scores already on the scored shot table are used;
+    otherwise location and shot-type scores are recomputed (vectorized) for
+    that zone configuration from the shot coordinates and body part.
+    """
+    matrix = shot_sdq_df[COMPONENT_COLUMNS].to_numpy(dtype=float).copy()
+
+    if zones is not None:
+        sdq_calculator = ShotDecisionQuality()
+        sdq_calculator.zones = dict(zones)
+        x = shot_sdq_df['coordinates_x'].to_numpy(dtype=float)
+        y = shot_sdq_df['coordinates_y'].to_numpy(dtype=float)
+        angle = shot_sdq_df['shot_angle'].to_numpy(dtype=float)
+        matrix[:, 0] = sdq_calculator.calculate_location_score(x, y)
+        matrix[:, 2] = sdq_calculator.calculate_shot_type_score(shot_sdq_df['body_part_type'].to_numpy(), x, angle)
+
+    return matrix
+
+
+def _ranks(values):
+    # Average ranks along axis 0 (ties share a rank), as used by Spearman
+    return pd.DataFrame(values).rank(axis=0).to_numpy()
+
+
+def _column_correlation(ranked, target_ranked):
+    # Pearson correlation of every column of `ranked` with one target vector
+    a = ranked - ranked.mean(axis=0)
+    b = target_ranked - target_ranked.mean()
+    denom = np.sqrt((a ** 2).sum(axis=0) * (b ** 2).sum())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denom > 0, (a * b[:, None]).sum(axis=0) / denom, np.nan)
+
+
+def sweep_weights(shot_sdq_df, weights, min_shots=3, components=None, batch_size=512):
+    """
+    Score every candidate weight vector against the scored shot table at once
+
+    Per-shot SDQ for all candidates is one matrix product
+    (components @ weights.T); player means are a segmented sum over shots
+    sorted by player. Candidates are processed in batches of batch_size so
+    memory stays bounded on large shot tables.
+
+    Returns:
+        DataFrame with one row per weight vector and the Spearman correlation
+        of the resulting player SDQ ranking with conversion rate and goals
+    """
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    keep = np.ones(len(shot_sdq_df), dtype=bool)
+    if 'event_type' in shot_sdq_df.columns:
+        keep &= (shot_sdq_df['event_type'] == 'SHOT').to_numpy()
+    counts = shot_sdq_df.loc[keep, 'player_id'].value_counts()
+    keep &= shot_sdq_df['player_id'].isin(counts[counts >= min_shots].index).to_numpy()
+
+    shots = shot_sdq_df[keep]
+    if len(shots) == 0:
+        print(f"Warning: No players with at least {min_shots} shots")
+        return pd.DataFrame()
+
+    if components is None:
+        components = component_matrix(shots)
+    else:
+        components = components[keep]
+
+    # Sort shots by player once; every candidate reuses the same segments
+    player_codes, players = pd.factorize(shots['player_id'])
+    order = np.argsort(player_codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(player_codes[order]) != 0])
+    shot_counts = np.diff(np.r_[starts, len(order)])
+    components = components[order]
+
+    goals = np.add.reduceat((shots['shot_result'].to_numpy()[order] == 'GOAL').astype(float), starts)
+    goals_rank = _ranks(goals[:, None])[:, 0]
+    conversion_rank = _ranks((goals / shot_counts)[:, None])[:, 0]
+
+    corr_conversion = np.empty(len(weights))
+    corr_goals = np.empty(len(weights))
+    for lo in range(0, len(weights), batch_size):
+        batch = weights[lo:lo + batch_size]
+        sdq = components @ batch.T
+        player_sdq = np.add.reduceat(sdq, starts, axis=0) / shot_counts[:, None]
+        ranked = _ranks(player_sdq)
+        corr_conversion[lo:lo + batch_size] = _column_correlation(ranked, conversion_rank)
+        corr_goals[lo:lo + batch_size] = _column_correlation(ranked, goals_rank)
+
+    results = pd.DataFrame(weights, columns=[f'w_{name}' for name in COMPONENTS])
+    results['spearman_conversion'] = corr_conversion
+    results['spearman_goals'] = corr_goals
+    results['players'] = len(players)
+
+    return results
+
+
+def calibrate(shot_sdq_df, weights=None, zone_configs=None, min_shots=3):
+    """
+    Evaluate every (zone configuration, weight vector) pair on a scored shot table
+
+    Component scores are recomputed once per zone configuration; the weight
+    sweep for each configuration is a single batched computation.
+
+    Returns:
+        DataFrame sorted by spearman_conversion (best first), with the zone
+        thresholds and weights that produced each row
+    """
+    if weights is None:
+        weights = weight_grid()
+    if zone_configs is None:
+        zone_configs = [ShotDecisionQuality().zones]
+
+    results = []
+    for i, zones in enumerate(zone_configs):
+        components = component_matrix(shot_sdq_df, zones=zones)
+        result = sweep_weights(shot_sdq_df, weights, min_shots=min_shots, components=components)
+        if result.empty:
+            continue
+        for name in ZONE_NAMES:
+            result[f'zone_{name}'] = zones[name]
+        result['zone_config'] = i
+        results.append(result)
+
+    if not results:
+        return pd.DataFrame()
+
+    return (
+        pd.concat(results, ignore_index=True)
+        .sort_values('spearman_conversion', ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def apply_calibration(sdq_calculator, calibration_row):
+    """
+    Copy the weights and zones from one calibrate() result row onto a calculator
+    """
+    sdq_calculator.weights = {name: float(calibration_row[f'w_{name}']) for name in COMPONENTS}
+    if f'zone_{ZONE_NAMES[0]}' in calibration_row:
+        sdq_calculator.zones = {name: calibration_row[f'zone_{name}'] for name in ZONE_NAMES}
+    return sdq_calculator
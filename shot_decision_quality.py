@@ -4,9 +4,31 @@ import warnings
 warnings.filterwarnings('ignore')
 
 
+def _scalar_or_array(values):
+    # Component functions accept scalars or arrays; give scalars back as scalars
+    values = np.asarray(values)
+    return values.item() if values.ndim == 0 else values
+
+
+def body_part_group(body_part):
+    """
+    Collapse IMPECT body part types into FOOT / HEAD / OTHER
+    """
+    body_part = np.asarray(body_part, dtype=object)
+    return np.select(
+        [np.isin(body_part, ['RIGHT_FOOT', 'LEFT_FOOT']), body_part == 'HEAD'],
+        ['FOOT', 'HEAD'],
+        default='OTHER'
+    )
+
+
+# Calibration label recorded when expected value comes from the fixed zone ladder
+LADDER_XG_VERSION = 'ladder-v1'
+
+
 class ShotDecisionQuality:
     
-    def __init__(self):
+    def __init__(self, xg_model=None, game_state_modifiers=False):
         self.pitch_length = 120
         self.pitch_width = 80
         self.goal_width = 8
@@ -18,23 +40,40 @@ class ShotDecisionQuality:
             'edge_of_box': 30,
             'long_range': 45
         }
+        
+        # Blend of the four component scores into the overall SDQ
+        self.weights = {
+            'location': 0.40,
+            'pressure': 0.25,
+            'shot_type': 0.20,
+            'timing': 0.15
+        }
+        
+        # Optional fitted lookup table (xg_model.EmpiricalXG) replacing the xG ladder
+        self.xg_model = xg_model
+        
+        # Optional score-line / clock adjustment (see calculate_game_state_modifier)
+        self.game_state_modifiers = game_state_modifiers
+        self.late_game_minute = 75
     
+    @property
+    def xg_version(self):
+        return self.xg_model.version if self.xg_model is not None else LADDER_XG_VERSION
+    
+    def _x_from_goal(self, x):
+        return np.where(x >= 60, 120 - x, x)
+
     def calculate_distance_to_goal(self, x, y):
-        if x >= 60:
-            goal_x = 120
-            goal_y = self.pitch_width / 2
-        else:
-            goal_x = 0
-            goal_y = self.pitch_width / 2
+        x = np.asarray(x, dtype=float)
+        goal_x = np.where(x >= 60, 120, 0)
+        goal_y = self.pitch_width / 2
 
         distance = np.sqrt((x - goal_x)**2 + (y - goal_y)**2)
-        return distance
+        return _scalar_or_array(distance)
     
     def calculate_shot_angle(self, x, y):
-        if x >= 60: 
-            goal_x = 120
-        else:
-            goal_x = 0
+        x = np.asarray(x, dtype=float)
+        goal_x = np.where(x >= 60, 120, 0)
 
         post_width = self.goal_width / 2
         goal_y_center = 40
@@ -42,136 +81,151 @@ class ShotDecisionQuality:
         post_1_y = goal_y_center - post_width
         post_2_y = goal_y_center + post_width
         
-        angle_1 = np.arctan2(abs(y - post_1_y), abs(goal_x - x))
-        angle_2 = np.arctan2(abs(y - post_2_y), abs(goal_x - x))
-        total_angle = np.degrees(abs(angle_1 - angle_2))
+        angle_1 = np.arctan2(np.abs(y - post_1_y), np.abs(goal_x - x))
+        angle_2 = np.arctan2(np.abs(y - post_2_y), np.abs(goal_x - x))
+        total_angle = np.degrees(np.abs(angle_1 - angle_2))
         
-        return total_angle
+        return _scalar_or_array(total_angle)
     
     def calculate_location_score(self, x, y):
-        distance_score = self.calculate_distance_to_goal(x, y)
-        angle = self.calculate_shot_angle(x, y)
-
-        if x >= 60:
-            x_from_goal = 120 - x
-        else: 
-            x_from_goal = x
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        angle = np.asarray(self.calculate_shot_angle(x, y))
+        x_from_goal = self._x_from_goal(x)
+        zones = self.zones
         
-        if x_from_goal <= self.zones['six_yard_box']:
-            distance_score = 100
-
-        elif x_from_goal <= self.zones['penalty_box']:
-            distance_score = 90 - (x_from_goal - self.zones['six_yard_box']) * 1.5
-
-        elif x_from_goal <= self.zones['danger_zone']:
-            distance_score = 75 - (x_from_goal - self.zones['penalty_box']) * 2.5
-
-        elif x_from_goal <= self.zones['edge_of_box']:
-            distance_score = 60 - (x_from_goal - self.zones['danger_zone']) * 2
-
-        elif x_from_goal <= self.zones['long_range']:
-            distance_score = 40 - (x_from_goal - self.zones['edge_of_box']) * 1.5
-
-        else:
-            distance_score = max(10, 40 - (x_from_goal - self.zones['long_range']) * 1.5)
-        
-        if angle >= 25:
-            angle_score = 100
-        elif angle >= 15:
-            angle_score = 80 + (angle - 15) * 2
-        elif angle >= 8:
-            angle_score = 60 + (angle - 8) * 2.86
-        else:
-            angle_score = 40 + angle * 2.5
+        distance_score = np.select(
+            [
+                x_from_goal <= zones['six_yard_box'],
+                x_from_goal <= zones['penalty_box'],
+                x_from_goal <= zones['danger_zone'],
+                x_from_goal <= zones['edge_of_box'],
+                x_from_goal <= zones['long_range'],
+            ],
+            [
+                100,
+                90 - (x_from_goal - zones['six_yard_box']) * 1.5,
+                75 - (x_from_goal - zones['penalty_box']) * 2.5,
+                60 - (x_from_goal - zones['danger_zone']) * 2,
+                40 - (x_from_goal - zones['edge_of_box']) * 1.5,
+            ],
+            default=np.maximum(10, 40 - (x_from_goal - zones['long_range']) * 1.5)
+        )
         
-        central_bonus = 1.0
-        if abs(y - 40) < 8:
-            central_bonus = 1.1
+        angle_score = np.select(
+            [angle >= 25, angle >= 15, angle >= 8],
+            [100, 80 + (angle - 15) * 2, 60 + (angle - 8) * 2.86],
+            default=40 + angle * 2.5
+        )
+        
+        central_bonus = np.where(np.abs(y - 40) < 8, 1.1, 1.0)
         
         location_score = (distance_score * 0.7 + angle_score * 0.3) * central_bonus
         
-        return min(100, location_score)
+        return _scalar_or_array(np.minimum(100, location_score))
     
     def calculate_timing_score(self, is_counter_attack=False, is_set_piece=False):
-        base_score = 70
-        
-        if is_counter_attack:
-            base_score += 20
-        
-        if is_set_piece:
-            base_score += 10
+        base_score = (
+            70
+            + np.where(np.asarray(is_counter_attack, dtype=bool), 20, 0)
+            + np.where(np.asarray(is_set_piece, dtype=bool), 10, 0)
+        )
         
-        return min(100, base_score)
+        return _scalar_or_array(np.minimum(100, base_score))
     
     def calculate_pressure_score(self, under_pressure):
-        return 60 if under_pressure else 85
+        return _scalar_or_array(np.where(np.asarray(under_pressure, dtype=bool), 60, 85))
     
     def calculate_shot_type_score(self, body_part, x, angle):
-        base_score = 70
-
-        if x >= 60:
-            x_from_goal = 120 - x
-        else: 
-            x_from_goal = x
-        
-        if x_from_goal <= self.zones['six_yard_box']:
-            base_score = 85
-            if body_part == 'HEAD':
-                base_score = 90
-    
-        elif x_from_goal <= self.zones['penalty_box']:
-            if body_part in ['RIGHT_FOOT', 'LEFT_FOOT']:
-                base_score = 85
-            elif body_part == 'HEAD':
-                base_score = 80
-    
-        elif x_from_goal > self.zones['edge_of_box']:
-            if body_part in ['RIGHT_FOOT', 'LEFT_FOOT']:
-                base_score = 70
-            else:
-                base_score = 50
+        x_from_goal = self._x_from_goal(np.asarray(x, dtype=float))
+        angle = np.asarray(angle, dtype=float)
+        body_part = np.asarray(body_part)
+        is_foot = np.isin(body_part, ['RIGHT_FOOT', 'LEFT_FOOT'])
+        is_head = body_part == 'HEAD'
+        
+        in_six_yard_box = x_from_goal <= self.zones['six_yard_box']
+        in_penalty_box = ~in_six_yard_box & (x_from_goal <= self.zones['penalty_box'])
+        beyond_edge = x_from_goal > self.zones['edge_of_box']
+        
+        base_score = np.select(
+            [
+                in_six_yard_box & is_head,
+                in_six_yard_box,
+                in_penalty_box & is_foot,
+                in_penalty_box & is_head,
+                beyond_edge & is_foot,
+                beyond_edge,
+            ],
+            [90, 85, 85, 80, 70, 50],
+            default=70
+        )
     
-        if angle < 8 and x_from_goal > self.zones['penalty_box']:
-            base_score -= 15
+        base_score = base_score - np.where((angle < 8) & (x_from_goal > self.zones['penalty_box']), 15, 0)
         
-        return min(100, base_score)
+        return _scalar_or_array(np.minimum(100, base_score))
     
-    def calculate_expected_value(self, location_score, x, angle):
-        if x >= 60:
-            x_from_goal = 120 - x
-        else:
-            x_from_goal = x
+    def calculate_expected_value(self, location_score, x, angle, distance=None, body_part='RIGHT_FOOT', set_piece_type=None):
+        x_from_goal = self._x_from_goal(np.asarray(x, dtype=float))
+        angle = np.asarray(angle, dtype=float)
 
-        if x_from_goal <= self.zones['six_yard_box']:
-            base_xg = 0.50
-        elif x_from_goal <= self.zones['penalty_box']:
-            base_xg = 0.25
-        elif x_from_goal <= self.zones['danger_zone']:
-            base_xg = 0.12
-        elif x_from_goal <= self.zones['edge_of_box']:
-            base_xg = 0.06
-        else:
-            base_xg = 0.03
-        
-        if angle >= 20:
-            angle_mult = 1.3
-        elif angle >= 10:
-            angle_mult = 1.1
-        elif angle >= 5:
-            angle_mult = 0.9
+        if self.xg_model is not None:
+            # Fitted table: one indexed read per shot. Without a distance the
+            # distance to the goal line is the closest stand-in.
+            xg_adjusted = self.xg_model.predict(
+                x_from_goal if distance is None else distance, angle, body_part, set_piece_type
+            )
         else:
-            angle_mult = 0.7
+            base_xg = np.select(
+                [
+                    x_from_goal <= self.zones['six_yard_box'],
+                    x_from_goal <= self.zones['penalty_box'],
+                    x_from_goal <= self.zones['danger_zone'],
+                    x_from_goal <= self.zones['edge_of_box'],
+                ],
+                [0.50, 0.25, 0.12, 0.06],
+                default=0.03
+            )
+            
+            angle_mult = np.select(
+                [angle >= 20, angle >= 10, angle >= 5],
+                [1.3, 1.1, 0.9],
+                default=0.7
+            )
+            
+            xg_adjusted = base_xg * angle_mult
+        
+        expected_value = np.minimum(100, (xg_adjusted * 150) + (np.asarray(location_score) * 0.3))
         
-        xg_adjusted = base_xg * angle_mult
-        expected_value = min(100, (xg_adjusted * 150) + (location_score * 0.3))
+        return _scalar_or_array(expected_value)
+    
+    def calculate_game_state_modifier(self, score_differential, match_minute):
+        # Late on, shooting is the right call more often when chasing the game
+        # and less often when protecting a lead
+        score_differential = np.asarray(score_differential, dtype=float)
+        late = np.asarray(match_minute, dtype=float) >= self.late_game_minute
+        modifier = np.select(
+            [late & (score_differential < 0), late & (score_differential > 0)],
+            [5, -5],
+            default=0
+        )
         
-        return expected_value
+        return _scalar_or_array(modifier)
+    
+    def combine_components(self, location_score, pressure_score, shot_type_score, timing_score):
+        return (
+            location_score * self.weights['location'] +
+            pressure_score * self.weights['pressure'] +
+            shot_type_score * self.weights['shot_type'] +
+            timing_score * self.weights['timing']
+        )
     
     def calculate_sdq(self, shot_event):
         x = shot_event.get('coordinates_x', 0)
         y = shot_event.get('coordinates_y', 0)
         body_part = shot_event.get('body_part_type', 'RIGHT_FOOT')
         under_pressure = shot_event.get('is_under_pressure', False)
+        is_counter_attack = shot_event.get('is_counter_attack', False)
+        is_counter_attack = bool(is_counter_attack) if pd.notna(is_counter_attack) else False
         is_set_piece = shot_event.get('set_piece_type') is not None and pd.notna(shot_event.get('set_piece_type'))
         success = shot_event.get('success', False)
         result = shot_event.get('result', '')
@@ -181,18 +235,23 @@ class ShotDecisionQuality:
         distance = self.calculate_distance_to_goal(x, y)
         angle = self.calculate_shot_angle(x, y)
         
-        timing_score = self.calculate_timing_score(is_set_piece=is_set_piece)
+        timing_score = self.calculate_timing_score(is_counter_attack=is_counter_attack, is_set_piece=is_set_piece)
         pressure_score = self.calculate_pressure_score(under_pressure)
         shot_type_score = self.calculate_shot_type_score(body_part, x, angle)
-        expected_value = self.calculate_expected_value(location_score, x, angle)
-        
-        sdq = (
-            location_score * 0.40 +
-            pressure_score * 0.25 +
-            shot_type_score * 0.20 +
-            timing_score * 0.15
+        expected_value = self.calculate_expected_value(
+            location_score, x, angle, distance=distance, body_part=body_part,
+            set_piece_type=shot_event.get('set_piece_type')
         )
         
+        sdq = self.combine_components(location_score, pressure_score, shot_type_score, timing_score)
+        
+        if self.game_state_modifiers:
+            score_differential = shot_event.get('score_differential', 0)
+            match_minute = shot_event.get('match_minute', 0)
+            sdq += self.calculate_game_state_modifier(
+                score_differential if pd.notna(score_differential) else 0,
+                match_minute if pd.notna(match_minute) else 0
+            )
         
         return {
             'sdq': sdq,
@@ -206,6 +265,84 @@ class ShotDecisionQuality:
             'shot_result': 'GOAL' if success else 'NO_GOAL'
         }
     
+    def shot_inputs(self, shots):
+        """
+        Arrays score_arrays needs, taken from a shot DataFrame
+        
+        Applies the same defaults as calculate_sdq for missing columns.
+        """
+        n = len(shots)
+        
+        def column(name, default):
+            if name in shots.columns:
+                return shots[name].to_numpy()
+            return np.full(n, default, dtype=object if isinstance(default, str) else None)
+        
+        def flag(name):
+            if name in shots.columns:
+                return shots[name].fillna(False).astype(bool).to_numpy()
+            return np.zeros(n, dtype=bool)
+        
+        has_game_state = 'score_differential' in shots.columns and 'match_minute' in shots.columns
+        
+        return {
+            'x': column('coordinates_x', 0).astype(float),
+            'y': column('coordinates_y', 0).astype(float),
+            'body_part': column('body_part_type', 'RIGHT_FOOT'),
+            'under_pressure': column('is_under_pressure', False),
+            'is_counter_attack': flag('is_counter_attack'),
+            'set_piece_type': shots['set_piece_type'].to_numpy(dtype=object) if 'set_piece_type' in shots.columns else np.full(n, None, dtype=object),
+            'score_differential': shots['score_differential'].fillna(0).to_numpy(dtype=float) if has_game_state else None,
+            'match_minute': shots['match_minute'].fillna(0).to_numpy(dtype=float) if has_game_state else None,
+        }
+    
+    def score_arrays(self, x, y, body_part, under_pressure, is_counter_attack, set_piece_type,
+                     score_differential=None, match_minute=None):
+        """
+        calculate_sdq over whole arrays at once; returns a dict of numeric arrays
+        """
+        is_set_piece = pd.notna(set_piece_type)
+        
+        location_score = np.asarray(self.calculate_location_score(x, y), dtype=float)
+        distance = np.asarray(self.calculate_distance_to_goal(x, y), dtype=float)
+        angle = np.asarray(self.calculate_shot_angle(x, y), dtype=float)
+        
+        timing_score = np.broadcast_to(self.calculate_timing_score(is_counter_attack, is_set_piece), x.shape)
+        pressure_score = np.broadcast_to(self.calculate_pressure_score(under_pressure), x.shape)
+        shot_type_score = np.broadcast_to(self.calculate_shot_type_score(body_part, x, angle), x.shape)
+        expected_value = np.asarray(self.calculate_expected_value(
+            location_score, x, angle, distance=distance, body_part=body_part, set_piece_type=set_piece_type
+        ), dtype=float)
+        
+        sdq = self.combine_components(location_score, pressure_score, shot_type_score, timing_score)
+        
+        if self.game_state_modifiers and score_differential is not None and match_minute is not None:
+            sdq = sdq + self.calculate_game_state_modifier(score_differential, match_minute)
+        
+        return {
+            'sdq': sdq,
+            'location_score': location_score,
+            'timing_score': timing_score,
+            'pressure_score': pressure_score,
+            'shot_type_score': shot_type_score,
+            'expected_value': expected_value,
+            'distance_to_goal': distance,
+            'shot_angle': angle,
+        }
+    
+    def score_shots(self, shots):
+        """
+        Vectorized calculate_sdq over a whole shot DataFrame
+        
+        Returns a DataFrame with the same keys as calculate_sdq, aligned to
+        shots.index.
+        """
+        scores = self.score_arrays(**self.shot_inputs(shots))
+        success = shots['success'].fillna(False).astype(bool).to_numpy() if 'success' in shots.columns else np.zeros(len(shots), dtype=bool)
+        scores['shot_result'] = np.where(success, 'GOAL', 'NO_GOAL')
+        
+        return pd.DataFrame(scores, index=shots.index)
+    
     def calculate_player_sdq(self, player_shots):
         sdq_scores = []
         component_scores = {
@@ -272,34 +409,43 @@ class ShotDecisionQuality:
         }
 
 
-def create_shot_analysis(df):
+def create_shot_analysis(df, sdq_calculator=None, n_workers=1):
+    """
+    Score every shot in df (vectorized)
+    
+    n_workers > 1 (or None for all cores) scores large tables in chunks on a
+    process pool via parallel_scoring.score_shots_parallel
+    """
     shot_events = df[df['event_type'] == 'SHOT'].copy()
     
     if len(shot_events) == 0:
         print("Warning: No shot events found in data")
         return df
     
-    sdq_calculator = ShotDecisionQuality()
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
     
-    sdq_results = []
-    for idx, row in shot_events.iterrows():
-        scores = sdq_calculator.calculate_sdq(row)
-        sdq_results.append(scores)
+    if n_workers == 1:
+        sdq_results = sdq_calculator.score_shots(shot_events)
+    else:
+        from parallel_scoring import score_shots_parallel
+        sdq_results = score_shots_parallel(shot_events, sdq_calculator=sdq_calculator, n_workers=n_workers)
     
-    for key in sdq_results[0].keys():
-        shot_events[key] = [result[key] for result in sdq_results]
+    for key in sdq_results.columns:
+        shot_events[key] = sdq_results[key].to_numpy()
     
     return shot_events
 
 
-def generate_shot_leaderboard(df, min_shots=3):
+def generate_shot_leaderboard(df, min_shots=3, sdq_calculator=None):
     shot_events = df[df['event_type'] == 'SHOT'].copy()
     
     if len(shot_events) == 0:
         print("Warning: No shot events found")
         return pd.DataFrame()
     
-    sdq_calculator = ShotDecisionQuality()
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
     
     player_stats = []
     
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from shot_decision_quality import body_part_group
+
+
+OPEN_PLAY = 'OPEN_PLAY'
+
+# Neighbour pairs materialized at once by ShotIndex.neighbourhood_stats
+PAIR_CHUNK = 1_000_000
+
+
+def attacking_coordinates(x, y):
+    """
+    Rotate shots at the x=0 goal onto the x=120 goal so both ends share one frame
+
+    A 180 degree rotation (not a mirror) keeps the shooter's left and right.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    towards_left = x < 60
+    return np.where(towards_left, 120 - x, x), np.where(towards_left, 80 - y, y)
+
+
+class ShotIndex:
+    """
+    k-d tree index over scored shot locations
+
+    One tree is built per partition (body part group and/or set-piece type),
+    so "comparable shots" can be restricted to, e.g., headers from corners.
+    Radius and k-nearest-neighbour queries run in logarithmic time per tree.
+    """
+
+    def __init__(self, shot_sdq_df, partition_by=('body_part', 'set_piece')):
+        self.shots = shot_sdq_df.reset_index(drop=True)
+        self.partition_by = tuple(partition_by)
+
+        x, y = attacking_coordinates(self.shots['coordinates_x'], self.shots['coordinates_y'])
+        self.points = np.column_stack([x, y])
+        self.goals = (self.shots['shot_result'] == 'GOAL').to_numpy(dtype=float)
+        self.sdq = self.shots['sdq'].to_numpy(dtype=float)
+
+        self.keys = self._partition_keys(self.shots)
+        self.partitions = {}
+        for key in pd.unique(self.keys):
+            rows = np.flatnonzero(self.keys == key)
+            self.partitions[key] = (cKDTree(self.points[rows]), rows)
+
+    def _partition_keys(self, shots):
+        parts = []
+        if 'body_part' in self.partition_by:
+            parts.append(body_part_group(shots['body_part_type']))
+        if 'set_piece' in self.partition_by:
+            parts.append(shots['set_piece_type'].fillna(OPEN_PLAY).astype(str).to_numpy())
+        if not parts:
+            return np.full(len(shots), 'ALL', dtype=object)
+        return np.array(['|'.join(values) for values in zip(*parts)], dtype=object)
+
+    def partition_key(self, body_part=None, set_piece_type=None):
+        """
+        Key of the partition a shot with these attributes belongs to
+        """
+        parts = []
+        if 'body_part' in self.partition_by:
+            parts.append(str(body_part_group([body_part])[0]))
+        if 'set_piece' in self.partition_by:
+            parts.append(set_piece_type if set_piece_type is not None and pd.notna(set_piece_type) else OPEN_PLAY)
+        return '|'.join(parts) if parts else 'ALL'
+
+    def _trees(self, body_part, set_piece_type):
+        # No attributes given -> search every partition
+        if body_part is None and set_piece_type is None:
+            return list(self.partitions.values())
+        key = self.partition_key(body_part, set_piece_type)
+        return [self.partitions[key]] if key in self.partitions else []
+
+    def _radius_rows(self, x, y, radius, body_part, set_piece_type):
+        point = np.column_stack(attacking_coordinates([x], [y]))[0]
+        rows = [
+            part_rows[tree.query_ball_point(point, r=radius)]
+            for tree, part_rows in self._trees(body_part, set_piece_type)
+        ]
+        rows = np.sort(np.concatenate(rows)).astype(int) if rows else np.array([], dtype=int)
+        return point, rows
+
+    def radius(self, x, y, radius=5, body_part=None, set_piece_type=None):
+        """
+        All indexed shots within `radius` yards of (x, y)
+        """
+        _, rows = self._radius_rows(x, y, radius, body_part, set_piece_type)
+        return self.shots.iloc[rows]
+
+    def nearest(self, x, y, k=10, body_part=None, set_piece_type=None):
+        """
+        The k indexed shots closest to (x, y), nearest first, with their distance
+        """
+        point = np.column_stack(attacking_coordinates([x], [y]))[0]
+        distances, rows = [], []
+        for tree, part_rows in self._trees(body_part, set_piece_type):
+            d, i = tree.query(point, k=min(k, tree.n))
+            d, i = np.atleast_1d(d), np.atleast_1d(i)
+            distances.append(d)
+            rows.append(part_rows[i])
+        if not rows:
+            return self.shots.iloc[[]].assign(neighbour_distance=[])
+
+        distances = np.concatenate(distances)
+        rows = np.concatenate(rows)
+        best = np.argsort(distances, kind='stable')[:k]
+        return self.shots.iloc[rows[best]].assign(neighbour_distance=distances[best])
+
+    def shot_context(self, shot, radius=5):
+        """
+        Context for one shot: how comparable shots from the same spot turned out
+
+        Leave-one-out like neighbourhood_stats: if the shot is itself indexed
+        (one indexed shot at distance 0 with the same outcome and SDQ), that
+        one shot is not counted among its neighbours.
+        """
+        point, rows = self._radius_rows(
+            shot['coordinates_x'], shot['coordinates_y'], radius,
+            shot.get('body_part_type'), shot.get('set_piece_type')
+        )
+        same = (
+            (self.points[rows] == point).all(axis=1)
+            & (self.shots['shot_result'].to_numpy()[rows] == shot['shot_result'])
+            & (self.sdq[rows] == float(shot['sdq']))
+        )
+        if same.any():
+            rows = np.delete(rows, np.flatnonzero(same)[0])
+
+        total = len(rows)
+        goals = int(self.goals[rows].sum())
+        return {
+            'neighbour_shots': total,
+            'neighbour_goals': goals,
+            'neighbour_conversion_rate': goals / total * 100 if total > 0 else np.nan,
+            'neighbour_mean_sdq': self.sdq[rows].mean() if total > 0 else np.nan,
+        }
+
+    def neighbourhood_stats(self, radius=5, pair_chunk=PAIR_CHUNK):
+        """
+        Batch mode: neighbourhood conversion rate and mean SDQ for every indexed shot
+
+        Each shot is compared with the other shots of its own partition within
+        `radius` yards (itself excluded). Pairs come straight from the tree,
+        so there is no per-shot Python loop. Query shots are processed in
+        chunks of about pair_chunk neighbour pairs (sized from the tree's
+        neighbour counts), so memory stays bounded however dense the shots are.
+
+        Returns:
+            DataFrame aligned with the indexed shots
+        """
+        n = len(self.shots)
+        counts = np.zeros(n)
+        goals = np.zeros(n)
+        sdq_sums = np.zeros(n)
+
+        for tree, part_rows in self.partitions.values():
+            points = tree.data
+            # Neighbours of every shot (itself included), without materializing them
+            lengths = tree.query_ball_point(points, r=radius, return_length=True)
+            chunk_ids = (np.cumsum(lengths) - 1) // pair_chunk
+            starts = np.r_[0, np.flatnonzero(np.diff(chunk_ids)) + 1]
+            ends = np.r_[starts[1:], len(points)]
+
+            for lo, hi in zip(starts, ends):
+                pairs = cKDTree(points[lo:hi]).sparse_distance_matrix(tree, radius, output_type='ndarray')
+                query = pairs['i'] + lo
+                other = pairs['j']
+                keep = query != other
+                a = part_rows[query[keep]]
+                b = part_rows[other[keep]]
+                counts += np.bincount(a, minlength=n)
+                goals += np.bincount(a, weights=self.goals[b], minlength=n)
+                sdq_sums += np.bincount(a, weights=self.sdq[b], minlength=n)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'neighbour_shots': counts.astype(int),
+                'neighbour_conversion_rate': np.where(counts > 0, goals / counts * 100, np.nan),
+                'neighbour_mean_sdq': np.where(counts > 0, sdq_sums / counts, np.nan),
+            }, index=self.shots.index)
+
+
+def add_neighbourhood_context(shot_sdq_df, radius=5, partition_by=('body_part', 'set_piece')):
+    """
+    Attach neighbourhood conversion rate and mean SDQ columns to a scored shot table
+    """
+    stats = ShotIndex(shot_sdq_df, partition_by=partition_by).neighbourhood_stats(radius=radius)
+    stats.index = shot_sdq_df.index
+    return pd.concat([shot_sdq_df, stats], axis=1)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+
+# Body part types kloppy emits for IMPECT events
+KNOWN_BODY_PARTS = [
+    'RIGHT_FOOT', 'LEFT_FOOT', 'HEAD', 'OTHER', 'HEAD_OTHER', 'CHEST',
+    'BOTH_HANDS', 'LEFT_HAND', 'RIGHT_HAND', 'DROP_KICK', 'KEEPER_ARM', 'NO_TOUCH'
+]
+
+PITCH_LENGTH = 120
+PITCH_WIDTH = 80
+
+
+def _column(df, name):
+    # Missing columns validate as all-null rather than raising
+    return df[name] if name in df.columns else pd.Series(np.nan, index=df.index)
+
+
+def shot_checks(shots_df):
+    """
+    One boolean column per validation rule; True means the row fails that rule
+
+    Every rule is a whole-column operation, so the cost is a handful of
+    vector passes regardless of frame size.
+    """
+    x = pd.to_numeric(_column(shots_df, 'coordinates_x'), errors='coerce')
+    y = pd.to_numeric(_column(shots_df, 'coordinates_y'), errors='coerce')
+    event_id = _column(shots_df, 'event_id')
+    body_part = _column(shots_df, 'body_part_type')
+
+    missing_coordinates = x.isna() | y.isna()
+
+    return pd.DataFrame({
+        'missing_coordinates': missing_coordinates,
+        'coordinates_out_of_bounds': ~missing_coordinates & (
+            (x < 0) | (x > PITCH_LENGTH) | (y < 0) | (y > PITCH_WIDTH)
+        ),
+        'missing_event_id': event_id.isna(),
+        'missing_player_id': _column(shots_df, 'player_id').isna(),
+        'missing_team_id': _column(shots_df, 'team_id').isna(),
+        'missing_body_part': body_part.isna(),
+        'unknown_body_part': body_part.notna() & ~body_part.isin(KNOWN_BODY_PARTS),
+        'duplicate_event_id': event_id.notna() & event_id.duplicated(keep='first'),
+    }, index=shots_df.index)
+
+
+def validate_shots(shots_df):
+    """
+    Split a shot frame into rows safe to score and a quarantine table
+
+    Returns:
+        valid_df: rows that pass every check
+        quarantine_df: failing rows with a 'quarantine_reason' column
+            (rule names joined with ';')
+        report_df: per-match shot, quarantine and per-rule failure counts
+    """
+    checks = shot_checks(shots_df)
+    failed = checks.to_numpy().any(axis=1)
+
+    quarantine_df = shots_df[failed].copy()
+    failed_checks = checks[failed]
+    reasons = pd.Series('', index=quarantine_df.index)
+    for name in checks.columns:
+        reasons = reasons.where(~failed_checks[name], reasons + name + ';')
+    quarantine_df['quarantine_reason'] = reasons.str.rstrip(';')
+
+    match_id = _column(shots_df, 'match_id').rename('match_id')
+    report_df = checks.astype(np.int64).groupby(match_id, dropna=False).sum()
+    report_df.insert(0, 'quarantined', pd.Series(failed, index=shots_df.index).groupby(match_id, dropna=False).sum())
+    report_df.insert(0, 'total_shots', match_id.groupby(match_id, dropna=False).size())
+    report_df = report_df.reset_index()
+
+    return shots_df[~failed], quarantine_df, report_df
+
+
+def print_validation_summary(quarantine_df, report_df):
+    """
+    Short console summary in the loader's print style
+    """
+    total = int(report_df['total_shots'].sum())
+    print(f"Validated {total} shots: {len(quarantine_df)} quarantined")
+    if len(quarantine_df) == 0:
+        return
+    rule_columns = [c for c in report_df.columns if c not in ('match_id', 'total_shots', 'quarantined')]
+    for rule, count in report_df[rule_columns].sum().items():
+        if count > 0:
+            print(f"  {rule}: {count}")
+    affected = report_df[report_df['quarantined'] > 0]
+    print(f"  {len(affected)} matches affected")
@@ -1,8 +1,9 @@
-import matplotlib.pyplot as plt
-from mplsoccer import Pitch
-import seaborn as sns
-
 def player_shot_chart(df, player_id):
+    # Plotting stack is imported on first use so importing this module stays cheap
+    import matplotlib.pyplot as plt
+    from mplsoccer import Pitch
+    import seaborn as sns
+    
     shots = df[df['event_type'] == 'SHOT'].copy()
     shots = shots[shots['player_id'] == player_id]
     pitch = Pitch()
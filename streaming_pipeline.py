@@ -0,0 +1,239 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import arrow_store
+from aggregation_cube import SDQCube, build_sdq_cube, BASE_KEYS
+from metric_normalization import add_normalized_metrics
+from shot_decision_quality import ShotDecisionQuality, create_shot_analysis
+from shot_validation import validate_shots, print_validation_summary
+
+
+# SDQ histogram bins for the streamed median (components are 0-100, the
+# game state modifier adds up to +/-5); values outside are clipped into the ends
+MEDIAN_BIN_EDGES = np.arange(-10, 110.5, 0.5)
+
+
+class RunningAggregates:
+    """
+    Player aggregates folded in one scored match at a time
+
+    Keeps the aggregation cube's additive sums at its base grain (player x
+    team x match x matchday, a few dozen rows per match), one SDQ histogram
+    per player for the median and the opponent model's player x opponent
+    sums, so memory grows with the number of players and matches but never
+    with the number of shots held at once.
+    """
+
+    def __init__(self, bin_edges=MEDIAN_BIN_EDGES):
+        self.bin_edges = bin_edges
+        self._parts = []
+        self._opponent_parts = []
+        self._player_rows = {}
+        self._histograms = np.zeros((0, len(bin_edges) - 1), dtype=np.int64)
+        self.n_shots = 0
+        self.n_matches = 0
+
+    def update(self, shot_sdq_df):
+        """
+        Fold one batch of scored shots (normally one match) into the state
+        """
+        if len(shot_sdq_df) == 0:
+            return
+        self._parts.append(build_sdq_cube(shot_sdq_df).base)
+        if 'opponent_team_id' in shot_sdq_df.columns:
+            from opponent_adjustment import opponent_cells
+            self._opponent_parts.append(opponent_cells(shot_sdq_df))
+
+        player_ids = shot_sdq_df['player_id'].to_numpy()
+        for player_id in pd.unique(player_ids):
+            if player_id not in self._player_rows:
+                self._player_rows[player_id] = len(self._player_rows)
+        if len(self._player_rows) > len(self._histograms):
+            grown = np.zeros((len(self._player_rows), self._histograms.shape[1]), dtype=np.int64)
+            grown[:len(self._histograms)] = self._histograms
+            self._histograms = grown
+
+        rows = np.array([self._player_rows[player_id] for player_id in player_ids])
+        bins = np.searchsorted(self.bin_edges, shot_sdq_df['sdq'].to_numpy(dtype=float), side='right') - 1
+        bins = np.clip(bins, 0, self._histograms.shape[1] - 1)
+        np.add.at(self._histograms, (rows, bins), 1)
+
+        self.n_shots += len(shot_sdq_df)
+        self.n_matches += 1
+
+    def cube(self):
+        """
+        aggregation_cube.SDQCube over everything folded in so far
+        """
+        if not self._parts:
+            return SDQCube(pd.DataFrame(columns=BASE_KEYS))
+        base = pd.concat(self._parts, ignore_index=True)
+        # Compact so the next call concatenates one frame instead of all of them
+        base = base.groupby(BASE_KEYS, dropna=False, sort=False, observed=True).sum().reset_index()
+        self._parts = [base]
+        return SDQCube(base)
+
+    def opponent_cells(self):
+        """
+        Shots and SDQ sum per player x opponent over everything folded in so far
+        """
+        if not self._opponent_parts:
+            return pd.DataFrame(columns=['player_id', 'opponent_team_id', 'shots', 'sdq_sum'])
+        cells = pd.concat(self._opponent_parts, ignore_index=True)
+        cells = cells.groupby(['player_id', 'opponent_team_id'], sort=False, observed=True)[['shots', 'sdq_sum']].sum().reset_index()
+        self._opponent_parts = [cells]
+        return cells
+
+    def medians(self):
+        """
+        Approximate per-player SDQ median (bin midpoint) from the histograms
+        """
+        cumulative = np.cumsum(self._histograms, axis=1)
+        n = cumulative[:, -1]
+        midpoints = (self.bin_edges[:-1] + self.bin_edges[1:]) / 2
+
+        def value_at_rank(rank):
+            # Midpoint of the bin holding the rank-th smallest value (1-based)
+            return midpoints[(cumulative < rank[:, None]).sum(axis=1)]
+
+        # Like np.median, even counts average the two middle values
+        median = (value_at_rank((n + 1) // 2) + value_at_rank(n // 2 + 1)) / 2
+        return pd.Series(median, index=list(self._player_rows), name='sdq_median')
+
+    def leaderboard(self, min_shots=1):
+        """
+        Player leaderboard with the same statistics as aggregation_cube.player_leaderboard
+
+        Includes the opponent-adjusted columns (adjusted_sdq,
+        avg_opponent_effect) when the shots carried opponent_team_id.
+        """
+        stats = self.cube().level('player')
+        if len(stats) == 0:
+            return pd.DataFrame()
+        stats.insert(2, 'sdq_median', stats['player_id'].map(self.medians()).to_numpy())
+        stats = stats[stats['total_shots'] >= min_shots]
+        stats['player_id'] = stats['player_id'].astype(int)
+        stats = stats.sort_values('overall_sdq', ascending=False).reset_index(drop=True)
+
+        cells = self.opponent_cells()
+        if len(cells) > 0:
+            from opponent_adjustment import add_cell_adjustment
+            stats = add_cell_adjustment(stats, cells)
+        return stats
+
+
+def spill_path(spill_dir, competition_id, match_id):
+    return os.path.join(spill_dir, f'shots_{competition_id}_{match_id}.arrow')
+
+
+def read_spilled(spill_dir, columns=None):
+    """
+    Yield spilled scored-shot frames one match at a time (memory-mapped)
+    """
+    for name in sorted(os.listdir(spill_dir)):
+        if name.startswith('shots_') and name.endswith('.arrow'):
+            table = arrow_store.read_table(os.path.join(spill_dir, name))
+            if columns is not None:
+                table = table.select([c for c in columns if c in table.column_names])
+            yield table.to_pandas(split_blocks=True)
+
+
+def stream_leaderboard(competition_ids=(743,), sdq_calculator=None, spill_dir=None, min_shots=1):
+    """
+    Build the leaderboard from a match-by-match stream of shots
+
+    Each match is loaded, validated, scored and folded into RunningAggregates
+    before the next one is read, so peak memory is one match plus the
+    aggregate state however many matches or competitions are processed.
+    spill_dir: also write each match's scored shots there as an Arrow file
+    (read them back with read_spilled) instead of keeping them in memory
+
+    Returns:
+        leaderboard_df: same columns as data_loader.get_leaderboard
+        cube: aggregation_cube.SDQCube over every streamed shot
+    """
+    from data_loader import load_metadata, iter_match_shots, add_player_info
+
+    if sdq_calculator is None:
+        sdq_calculator = ShotDecisionQuality()
+    if isinstance(competition_ids, int):
+        competition_ids = [competition_ids]
+
+    aggregates = RunningAggregates()
+    players, squads = [], []
+    quarantined, reports = [], []
+    # Shots per player and competition, to give each player a home competition
+    competition_shots = []
+
+    for competition_id in competition_ids:
+        print(f"Streaming competition {competition_id}...")
+        competition_players, competition_squads = load_metadata(competition_id=competition_id)
+        players.append(competition_players)
+        squads.append(competition_squads)
+
+        for shots in iter_match_shots(competition_id=competition_id):
+            shots, quarantine_df, report_df = validate_shots(shots)
+            # Keep only the identifying columns of quarantined rows
+            quarantined.append(quarantine_df[[c for c in ('match_id', 'event_id', 'quarantine_reason') if c in quarantine_df.columns]])
+            reports.append(report_df)
+            if len(shots) == 0:
+                continue
+
+            shot_sdq_df = create_shot_analysis(shots, sdq_calculator=sdq_calculator)
+            aggregates.update(shot_sdq_df)
+            competition_shots.append(
+                shot_sdq_df.groupby('player_id').size().rename('shots').reset_index().assign(competition_id=competition_id)
+            )
+            if spill_dir is not None:
+                arrow_store.write_table(shot_sdq_df, spill_path(spill_dir, competition_id, shot_sdq_df['match_id'].iloc[0]))
+            del shots, shot_sdq_df
+
+    if reports:
+        print_validation_summary(pd.concat(quarantined, ignore_index=True), pd.concat(reports, ignore_index=True))
+    print(f"Streamed {aggregates.n_shots} shots from {aggregates.n_matches} matches")
+
+    cube = aggregates.cube()
+    leaderboard_df = aggregates.leaderboard(min_shots=min_shots)
+    if leaderboard_df.empty:
+        return leaderboard_df, cube
+
+    # Players/squads appear once per competition they played in
+    players = pd.concat(players, ignore_index=True)
+    squads = pd.concat(squads, ignore_index=True)
+    if 'id' in players.columns:
+        players = players.drop_duplicates('id', keep='last')
+    if 'id' in squads.columns:
+        squads = squads.drop_duplicates('id', keep='last')
+
+    leaderboard_df = add_player_info(leaderboard_df, cube, players, squads)
+    leaderboard_df['xg_version'] = sdq_calculator.xg_version
+
+    # Players who appeared in several competitions are ranked in the one they shot most in
+    competition_shots = pd.concat(competition_shots, ignore_index=True)
+    competition_shots['player_id'] = competition_shots['player_id'].astype(int)
+    totals = competition_shots.groupby(['player_id', 'competition_id'])['shots'].sum().reset_index()
+    home = totals.sort_values('shots', ascending=False, kind='stable').drop_duplicates('player_id')
+    leaderboard_df['competition_id'] = leaderboard_df['player_id'].astype(int).map(home.set_index('player_id')['competition_id']).to_numpy()
+    leaderboard_df = add_normalized_metrics(leaderboard_df)
+
+    print(f"✓ Leaderboard ready with {len(leaderboard_df)} players")
+    return leaderboard_df, cube
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream matches into a player leaderboard")
+    parser.add_argument('competition_ids', type=int, nargs='*', default=[743])
+    parser.add_argument('--spill-dir', default=None)
+    parser.add_argument('--min-shots', type=int, default=1)
+    parser.add_argument('--output', default=None, help="write the leaderboard as CSV")
+    args = parser.parse_args()
+
+    leaderboard_df, _ = stream_leaderboard(args.competition_ids, spill_dir=args.spill_dir, min_shots=args.min_shots)
+    if args.output:
+        leaderboard_df.to_csv(args.output, index=False)
+    else:
+        print(leaderboard_df.head(20).to_string())
@@ -0,0 +1,130 @@
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import arrow_store
+import export_stream
+
+
+def shots(n=250):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'player_id': rng.integers(1, 20, n),
+        'team_id': rng.integers(1, 4, n),
+        'sdq': rng.normal(50, 10, n),
+        'body_part_type': rng.choice(['RIGHT_FOOT', 'LEFT_FOOT', 'HEAD'], n),
+    })
+
+
+def test_csv_export_in_chunks_round_trips(tmp_path):
+    df = shots()
+    path = tmp_path / 'shots.csv'
+
+    n_rows = export_stream.export(df, str(path), fmt='csv', chunk_rows=40)
+
+    assert n_rows == len(df)
+    pd.testing.assert_frame_equal(pd.read_csv(path), df)
+
+
+def test_parquet_export_from_arrow_applies_columns_and_filters(tmp_path):
+    df = shots()
+    source = tmp_path / 'shots.arrow'
+    arrow_store.write_table(df, str(source))
+    path = tmp_path / 'shots.parquet'
+
+    n_rows = export_stream.export(str(source), str(path), fmt='parquet', compression='snappy', chunk_rows=50,
+                                  columns=['player_id', 'sdq', 'body_part_type'], filters={'team_id': [2]})
+
+    expected = df.loc[df['team_id'] == 2, ['player_id', 'sdq', 'body_part_type']].reset_index(drop=True)
+    result = pq.read_table(path).to_pandas()
+    assert n_rows == len(expected)
+    assert result.columns.tolist() == expected.columns.tolist()
+    np.testing.assert_allclose(result['sdq'], expected['sdq'])
+    assert result['body_part_type'].astype(str).tolist() == expected['body_part_type'].tolist()
+    # One row group per (non-empty) chunk
+    assert pq.ParquetFile(path).num_row_groups > 1
+
+
+def test_compressed_jsonl_export_round_trips(tmp_path):
+    df = shots(60)
+    path = tmp_path / 'shots.jsonl.gz'
+
+    export_stream.export(df, str(path), fmt='jsonl', compression='gzip', chunk_rows=25)
+
+    with pa.CompressedInputStream(pa.OSFile(str(path)), 'gzip') as stream:
+        result = pd.read_json(io.BytesIO(stream.read()), lines=True)
+    pd.testing.assert_frame_equal(result, df)
+
+
+@pytest.mark.parametrize('fmt, compression', [('xlsx', None), ('csv', 'snappy'), ('parquet', 'bz2')])
+def test_unknown_format_or_compression_is_rejected(tmp_path, fmt, compression):
+    with pytest.raises(ValueError):
+        export_stream.export(shots(), str(tmp_path / 'out'), fmt=fmt, compression=compression)
+
+
+def test_failed_export_leaves_no_file_behind(tmp_path):
+    def chunks():
+        yield shots(10)
+        raise RuntimeError("source went away")
+
+    with pytest.raises(RuntimeError):
+        export_stream.export(chunks(), str(tmp_path / 'out.csv'))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_export_published_reuses_the_file_and_reranks_leaderboards(tmp_path):
+    data_dir, export_dir = str(tmp_path / 'arrow'), str(tmp_path / 'exports')
+    leaderboard = pd.DataFrame({
+        'player_id': [1, 2, 3],
+        'overall_sdq': [40.0, 60.0, 90.0],
+        'total_shots': [10, 20, 30],
+        'overall_sdq_pct': [100 / 3, 200 / 3, 100.0],
+    })
+    arrow_store.write_table(leaderboard, arrow_store.table_path('leaderboard', 743, data_dir))
+
+    path = export_stream.export_published('leaderboard', filters={'player_id': [2, 3]},
+                                          data_dir=data_dir, export_dir=export_dir, min_shots=15)
+    again = export_stream.export_published('leaderboard', filters={'player_id': [2, 3]},
+                                           data_dir=data_dir, export_dir=export_dir, min_shots=15)
+
+    assert again == path
+    assert pd.read_csv(path)['overall_sdq_pct'].tolist() == [50.0, 100.0]
+    # Without min_shots the published ranks are exported, to another file
+    plain = export_stream.export_published('leaderboard', filters={'player_id': [2, 3]},
+                                           data_dir=data_dir, export_dir=export_dir)
+    assert plain != path
+    np.testing.assert_allclose(pd.read_csv(plain)['overall_sdq_pct'], [200 / 3, 100])
+
+
+def test_prune_keeps_the_newest_and_recently_used_exports(tmp_path):
+    now = time.time()
+    for i in range(6):
+        path = tmp_path / f'old_{i}.csv'
+        path.write_text('x')
+        os.utime(path, (now - 3600 - i, now - 3600 - i))
+    for i in range(4):
+        (tmp_path / f'recent_{i}.csv').write_text('x')
+    (tmp_path / 'in_progress.csv.123.tmp').write_text('x')
+
+    export_stream.prune(str(tmp_path), max_exports=2, min_age_seconds=600)
+
+    assert sorted(os.listdir(tmp_path)) == [
+        'in_progress.csv.123.tmp', 'recent_0.csv', 'recent_1.csv', 'recent_2.csv', 'recent_3.csv'
+    ]
+
+
+def test_frame_export_filters_on_columns_it_does_not_export(tmp_path):
+    df = shots()
+    path = tmp_path / 'shots.csv'
+
+    export_stream.export(df, str(path), columns=['sdq'], filters={'team_id': [1, 3]})
+
+    expected = df.loc[df['team_id'].isin([1, 3]), ['sdq']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.read_csv(path), expected)
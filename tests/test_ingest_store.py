@@ -0,0 +1,178 @@
+import pandas as pd
+import pytest
+
+import data_loader
+import ingest_store
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, content=b''):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeServer:
+    """
+    Raw files by URL, answering conditional HEAD requests like GitHub raw
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.gets = []
+
+    def head(self, url, headers=None, **kwargs):
+        etag, _ = self.files[url]
+        if headers and headers.get('If-None-Match') == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, {'ETag': etag})
+
+    def get(self, url, **kwargs):
+        self.gets.append(url)
+        etag, body = self.files[url]
+        return FakeResponse(200, {'ETag': etag}, body)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    match_ids = [11, 12, 13]
+    server = FakeServer({
+        f'{name}/{mid}': (f'"{name}-{mid}-v1"', b'body')
+        for mid in match_ids for name in ingest_store.RAW_MATCH_FILES
+    })
+    shots_per_match = {11: 3, 12: 2, 13: 4}
+    loads = []
+
+    def load_shots(match_id, competition_id=743):
+        loads.append(match_id)
+        version = server.files[f'events/{match_id}'][0]
+        return pd.DataFrame({
+            'event_id': [f'{match_id}-{k}' for k in range(shots_per_match[match_id])],
+            'version': version,
+        })
+
+    monkeypatch.setattr(ingest_store, '_session', lambda: server)
+    monkeypatch.setattr(ingest_store, 'raw_file_url', lambda match_id, name='events': f'{name}/{match_id}')
+    monkeypatch.setattr(data_loader, 'get_matches', lambda competition_id=743: pd.DataFrame({
+        'match_id': match_ids, 'matchday': [1, 1, 2],
+    }))
+    monkeypatch.setattr(data_loader, 'load_shots', load_shots)
+    return server, shots_per_match, loads
+
+
+def sync(tmp_path):
+    return ingest_store.sync_shots(competition_id=743, store_dir=str(tmp_path), max_workers=2)
+
+
+def test_first_sync_ingests_every_match_without_downloading_for_hashes(tmp_path, upstream):
+    server, shots_per_match, loads = upstream
+
+    store = sync(tmp_path)
+
+    assert sorted(loads) == [11, 12, 13]
+    assert len(store) == sum(shots_per_match.values())
+    assert list(pd.unique(store['match_id'])) == [11, 12, 13]
+    # Strong ETags identify the content; only the loader reads the bodies
+    assert server.gets == []
+
+
+def test_unchanged_sync_loads_nothing(tmp_path, upstream):
+    _, _, loads = upstream
+    first = sync(tmp_path)
+    loads.clear()
+
+    second = sync(tmp_path)
+
+    assert loads == []
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_only_the_changed_match_is_reingested_without_duplicates(tmp_path, upstream):
+    server, shots_per_match, loads = upstream
+    sync(tmp_path)
+    loads.clear()
+
+    server.files['events/12'] = ('"events-12-v2"', b'corrected')
+    shots_per_match[12] = 1
+    store = sync(tmp_path)
+
+    assert loads == [12]
+    assert not store['event_id'].duplicated().any()
+    assert store.loc[store['match_id'] == 12, 'version'].tolist() == ['"events-12-v2"']
+    assert len(store) == 3 + 1 + 4
+    assert list(pd.unique(store['match_id'])) == [11, 12, 13]
+
+
+def test_lineups_change_reingests_the_match(tmp_path, upstream):
+    server, _, loads = upstream
+    sync(tmp_path)
+    loads.clear()
+
+    server.files['lineups/13'] = ('"lineups-13-v2"', b'corrected')
+    sync(tmp_path)
+
+    assert loads == [13]
+
+
+def test_lost_store_is_rebuilt_from_an_intact_manifest(tmp_path, upstream):
+    _, shots_per_match, loads = upstream
+    sync(tmp_path)
+    loads.clear()
+
+    (tmp_path / 'shots_743.pkl').unlink()
+    store = sync(tmp_path)
+
+    assert sorted(loads) == [11, 12, 13]
+    assert len(store) == sum(shots_per_match.values())
+
+
+def test_failed_load_is_retried_on_the_next_sync(tmp_path, upstream, monkeypatch):
+    _, _, loads = upstream
+    load_shots = data_loader.load_shots
+
+    def flaky(match_id, competition_id=743):
+        if match_id == 13:
+            raise RuntimeError("network down")
+        return load_shots(match_id, competition_id)
+
+    monkeypatch.setattr(data_loader, 'load_shots', flaky)
+    store = sync(tmp_path)
+    assert 13 not in set(store['match_id'])
+
+    monkeypatch.setattr(data_loader, 'load_shots', load_shots)
+    loads.clear()
+    store = sync(tmp_path)
+
+    assert loads == [13]
+    assert list(pd.unique(store['match_id'])) == [11, 12, 13]
+
+
+def test_weak_etag_falls_back_to_hashing_the_body():
+    server = FakeServer({'events/1': ('W/"abc"', b'body')})
+    ingest_store._sessions.session = server
+    try:
+        status, first = ingest_store.check_file('events/1')
+        # Same body under a regenerated weak ETag
+        server.files['events/1'] = ('W/"regenerated"', b'body')
+        status_again, _ = ingest_store.check_file('events/1', first)
+    finally:
+        del ingest_store._sessions.session
+
+    assert status == 'new'
+    assert status_again == 'unchanged'
+    assert server.gets == ['events/1', 'events/1']
+
+
+def test_entry_without_content_hash_counts_as_new():
+    server = FakeServer({'events/1': ('"abc"', b'body')})
+    ingest_store._sessions.session = server
+    try:
+        status, _ = ingest_store.check_file('events/1', {'etag': '"abc"'})
+    finally:
+        del ingest_store._sessions.session
+
+    assert status == 'new'
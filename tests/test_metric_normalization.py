@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metric_normalization import add_normalized_metrics, MIN_SHOTS
+
+
+def leaderboard():
+    return pd.DataFrame({
+        'player_id': range(8),
+        'competition_id': [1, 1, 1, 1, 2, 2, 2, 2],
+        'position': ['FW', 'FW', 'FW', 'MF', 'FW', 'FW', 'FW', 'FW'],
+        'overall_sdq': [40.0, 50.0, 50.0, 70.0, 10.0, 20.0, 30.0, 99.0],
+        'consistency': [80.0, 85.0, 90.0, 95.0, 70.0, 70.0, 70.0, 100.0],
+        'total_shots': [10, 10, 10, 10, 10, 10, 10, 1],
+    })
+
+
+def test_percentiles_rank_within_competition_and_position():
+    ranked = add_normalized_metrics(leaderboard())
+
+    # Competition 1 forwards: 40, 50, 50 -> ties share their average rank
+    np.testing.assert_allclose(ranked.loc[:2, 'overall_sdq_pct'], [100 / 3, 250 / 3, 250 / 3])
+    # Alone in its group
+    assert ranked.loc[3, 'overall_sdq_pct'] == 100
+    np.testing.assert_allclose(ranked.loc[4:6, 'overall_sdq_pct'], [100 / 3, 200 / 3, 100])
+
+
+def test_players_below_the_shot_floor_are_not_ranked_and_do_not_count():
+    ranked = add_normalized_metrics(leaderboard())
+
+    assert MIN_SHOTS > 1
+    assert ranked.loc[7, ['overall_sdq_pct', 'overall_sdq_z', 'consistency_pct']].isna().all()
+    # The one-shot 99 SDQ / 100 consistency player does not push the others down
+    assert ranked.loc[6, 'overall_sdq_pct'] == 100
+
+
+def test_z_scores_use_the_population_spread_and_zero_for_flat_groups():
+    ranked = add_normalized_metrics(leaderboard())
+
+    values = np.array([10.0, 20.0, 30.0])
+    np.testing.assert_allclose(ranked.loc[4:6, 'overall_sdq_z'], (values - values.mean()) / values.std())
+    # Competition 2 forwards all have consistency 70
+    np.testing.assert_allclose(ranked.loc[4:6, 'consistency_z'], 0.0)
+
+
+def test_matches_pandas_group_rank_with_missing_values_and_groups():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        'competition_id': rng.integers(0, 3, n),
+        'position': rng.choice(['FW', 'MF', None], n),
+        'overall_sdq': rng.integers(0, 20, n).astype(float),
+        'total_shots': rng.integers(1, 30, n),
+    })
+    df.loc[rng.random(n) < 0.1, 'overall_sdq'] = np.nan
+
+    ranked = add_normalized_metrics(df, min_shots=1)
+
+    expected = df.groupby(['competition_id', 'position'], dropna=False)['overall_sdq'].rank(pct=True) * 100
+    pd.testing.assert_series_equal(ranked['overall_sdq_pct'], expected, check_names=False)
+
+
+def test_stricter_floor_reranks_the_remaining_players():
+    df = leaderboard()
+    df['total_shots'] = [5, 6, 20, 10, 10, 10, 10, 10]
+
+    ranked = add_normalized_metrics(df, min_shots=10)
+
+    assert ranked.loc[:1, 'overall_sdq_pct'].isna().all()
+    assert ranked.loc[2, 'overall_sdq_pct'] == 100
+
+
+def test_missing_group_columns_rank_the_whole_table():
+    df = leaderboard().drop(columns=['competition_id', 'position'])
+
+    ranked = add_normalized_metrics(df, min_shots=1)
+
+    assert ranked['overall_sdq_pct'].max() == 100
+    assert ranked.loc[4, 'overall_sdq_pct'] == pytest.approx(100 / 8)
+
+
+def test_recomputing_replaces_existing_columns():
+    once = add_normalized_metrics(leaderboard())
+    twice = add_normalized_metrics(once, min_shots=1)
+
+    assert twice.columns.tolist() == once.columns.tolist()
+    assert twice.loc[7, 'overall_sdq_pct'] == 100
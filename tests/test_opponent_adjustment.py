@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from opponent_adjustment import (
+    add_opponent_adjustment, fit_cells, fit_opponent_model, opponent_cells, RIDGE
+)
+
+
+def simulated_shots(n_shots=4000, n_players=40, n_teams=8, noise=5.0, seed=0):
+    rng = np.random.default_rng(seed)
+    player_effects = rng.normal(0, 6, n_players)
+    opponent_effects = rng.normal(0, 4, n_teams)
+    opponent_effects -= opponent_effects.mean()
+    players = rng.integers(0, n_players, n_shots)
+    opponents = rng.integers(0, n_teams, n_shots)
+    sdq = 50 + player_effects[players] + opponent_effects[opponents] + rng.normal(0, noise, n_shots)
+    shots = pd.DataFrame({
+        'player_id': (100 + players).astype(str),
+        'opponent_team_id': (900 + opponents).astype(str),
+        'sdq': sdq,
+    })
+    return shots, player_effects, opponent_effects
+
+
+def per_shot_ridge(shots, ridge):
+    # Dense reference: one row per shot, ridge on every coefficient
+    player_codes, players = pd.factorize(shots['player_id'])
+    opponent_codes, opponents = pd.factorize(shots['opponent_team_id'])
+    X = np.zeros((len(shots), len(players) + len(opponents)))
+    X[np.arange(len(shots)), player_codes] = 1
+    X[np.arange(len(shots)), len(players) + opponent_codes] = 1
+    y = shots['sdq'].to_numpy() - shots['sdq'].mean()
+    beta = np.linalg.solve(X.T @ X + ridge * np.eye(X.shape[1]), X.T @ y)
+    player_effects = pd.Series(beta[:len(players)], index=players)
+    opponent_effects = pd.Series(beta[len(players):], index=opponents)
+    shift = opponent_effects.mean()
+    return player_effects + shift, opponent_effects - shift
+
+
+def test_cell_fit_matches_the_per_shot_ridge_solution():
+    shots, _, _ = simulated_shots(n_shots=1500, n_players=25, n_teams=6)
+
+    player_effects, opponent_effects, league_mean = fit_opponent_model(shots, ridge=RIDGE)
+    expected_players, expected_opponents = per_shot_ridge(shots, RIDGE)
+
+    assert league_mean == pytest.approx(shots['sdq'].mean())
+    np.testing.assert_allclose(player_effects[expected_players.index], expected_players, atol=1e-6)
+    np.testing.assert_allclose(opponent_effects[expected_opponents.index], expected_opponents, atol=1e-6)
+
+
+def test_fit_recovers_simulated_effects():
+    shots, true_players, true_opponents = simulated_shots(n_shots=20000, noise=2.0)
+
+    player_effects, opponent_effects, _ = fit_opponent_model(shots, ridge=1.0)
+
+    recovered = opponent_effects[[str(900 + t) for t in range(len(true_opponents))]].to_numpy()
+    np.testing.assert_allclose(recovered, true_opponents, atol=0.3)
+    assert opponent_effects.mean() == pytest.approx(0, abs=1e-9)
+    estimated = player_effects[[str(100 + p) for p in range(len(true_players))]].to_numpy()
+    assert np.corrcoef(estimated, true_players)[0, 1] > 0.99
+
+
+def test_cells_from_separate_batches_give_the_same_fit():
+    shots, _, _ = simulated_shots(n_shots=2000)
+    halves = [opponent_cells(shots.iloc[:700]), opponent_cells(shots.iloc[700:])]
+
+    whole = fit_cells(opponent_cells(shots))
+    split = fit_cells(pd.concat(halves, ignore_index=True))
+
+    for a, b in zip(whole[:2], split[:2]):
+        pd.testing.assert_series_equal(a.sort_index(), b.sort_index(), atol=1e-6)
+    assert whole[2] == pytest.approx(split[2])
+
+
+def test_small_samples_are_shrunk_towards_the_league_mean():
+    rng = np.random.default_rng(1)
+    regular = pd.DataFrame({
+        'player_id': '1',
+        'opponent_team_id': rng.choice(['a', 'b', 'c'], 200),
+        'sdq': 50 + rng.normal(0, 1, 200),
+    })
+    one_shot = pd.DataFrame({'player_id': ['2'], 'opponent_team_id': ['a'], 'sdq': [90.0]})
+    shots = pd.concat([regular, one_shot], ignore_index=True)
+
+    player_effects, _, league_mean = fit_opponent_model(shots, ridge=RIDGE)
+
+    raw_deviation = 90.0 - league_mean
+    assert 0 < player_effects['2'] < raw_deviation / 2
+
+
+def test_add_opponent_adjustment_adds_columns_for_int_player_ids():
+    shots, _, _ = simulated_shots(n_shots=500, n_players=10)
+    leaderboard = pd.DataFrame({'player_id': sorted(shots['player_id'].astype(int).unique())})
+
+    adjusted = add_opponent_adjustment(leaderboard.copy(), shots)
+
+    assert adjusted['adjusted_sdq'].notna().all()
+    assert adjusted['avg_opponent_effect'].notna().all()
+
+
+def test_add_opponent_adjustment_without_opponents_is_a_no_op():
+    leaderboard = pd.DataFrame({'player_id': [1, 2]})
+    shots = pd.DataFrame({'player_id': ['1', '2'], 'sdq': [40.0, 60.0]})
+
+    assert add_opponent_adjustment(leaderboard.copy(), shots).columns.tolist() == ['player_id']
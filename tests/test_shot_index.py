@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shot_index import ShotIndex, attacking_coordinates
+
+
+def scored_shots(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'coordinates_x': rng.uniform(90, 120, n),
+        'coordinates_y': rng.uniform(20, 60, n),
+        'body_part_type': rng.choice(['RIGHT_FOOT', 'HEAD'], n),
+        'set_piece_type': rng.choice([None, 'CORNER_KICK'], n, p=[0.8, 0.2]),
+        'shot_result': rng.choice(['GOAL', 'MISS'], n, p=[0.2, 0.8]),
+        'sdq': rng.uniform(0, 100, n),
+    })
+
+
+def brute_force(shots, index, radius):
+    points = index.points
+    counts, rates, means = [], [], []
+    for i in range(len(shots)):
+        same = (index.keys == index.keys[i]) & (np.arange(len(shots)) != i)
+        near = same & (np.hypot(*(points - points[i]).T) <= radius)
+        counts.append(near.sum())
+        rates.append(index.goals[near].mean() * 100 if near.any() else np.nan)
+        means.append(index.sdq[near].mean() if near.any() else np.nan)
+    return np.array(counts), np.array(rates), np.array(means)
+
+
+def test_attacking_coordinates_rotate_the_far_goal():
+    x, y = attacking_coordinates([10, 110], [30, 30])
+
+    np.testing.assert_allclose(x, [110, 110])
+    np.testing.assert_allclose(y, [50, 30])
+
+
+def test_neighbourhood_stats_match_brute_force_leave_one_out():
+    shots = scored_shots()
+    index = ShotIndex(shots)
+
+    stats = index.neighbourhood_stats(radius=5)
+
+    counts, rates, means = brute_force(shots, index, 5)
+    np.testing.assert_array_equal(stats['neighbour_shots'], counts)
+    np.testing.assert_allclose(stats['neighbour_conversion_rate'], rates)
+    np.testing.assert_allclose(stats['neighbour_mean_sdq'], means)
+
+
+def test_chunking_does_not_change_the_result():
+    index = ShotIndex(scored_shots())
+
+    pd.testing.assert_frame_equal(
+        index.neighbourhood_stats(radius=6, pair_chunk=37),
+        index.neighbourhood_stats(radius=6),
+    )
+
+
+def test_shot_context_agrees_with_the_batch_without_event_ids():
+    shots = scored_shots(150)
+    index = ShotIndex(shots)
+    stats = index.neighbourhood_stats(radius=5)
+
+    for i in range(len(shots)):
+        context = index.shot_context(shots.iloc[i], radius=5)
+        assert context['neighbour_shots'] == stats['neighbour_shots'][i]
+        assert context['neighbour_mean_sdq'] == pytest.approx(stats['neighbour_mean_sdq'][i], nan_ok=True)
+
+
+def test_shot_context_leaves_out_only_one_copy_of_the_query_shot():
+    shots = pd.concat([scored_shots(1)] * 3, ignore_index=True)
+    index = ShotIndex(shots)
+
+    assert index.shot_context(shots.iloc[0])['neighbour_shots'] == 2
+
+
+def test_shot_context_of_a_new_shot_counts_every_neighbour():
+    shots = scored_shots(1)
+    index = ShotIndex(shots)
+    new_shot = shots.iloc[0].copy()
+    new_shot['sdq'] += 1
+
+    assert index.shot_context(new_shot)['neighbour_shots'] == 1
+
+
+def test_partitions_keep_headers_apart_from_foot_shots():
+    shots = pd.DataFrame({
+        'coordinates_x': [110.0, 110.0],
+        'coordinates_y': [40.0, 40.0],
+        'body_part_type': ['HEAD', 'RIGHT_FOOT'],
+        'set_piece_type': [None, None],
+        'shot_result': ['GOAL', 'MISS'],
+        'sdq': [50.0, 60.0],
+    })
+    index = ShotIndex(shots)
+
+    assert index.neighbourhood_stats()['neighbour_shots'].tolist() == [0, 0]
+    assert len(index.radius(110, 40, body_part='HEAD')) == 1
+    assert len(index.radius(110, 40)) == 2
+
+
+def test_nearest_returns_the_k_closest_in_order():
+    index = ShotIndex(scored_shots(), partition_by=())
+
+    nearest = index.nearest(115, 40, k=5)
+
+    assert len(nearest) == 5
+    assert nearest['neighbour_distance'].is_monotonic_increasing
+    x, y = attacking_coordinates(index.shots['coordinates_x'], index.shots['coordinates_y'])
+    assert nearest['neighbour_distance'].iloc[-1] == pytest.approx(np.sort(np.hypot(x - 115, y - 40))[4])
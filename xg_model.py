@@ -0,0 +1,166 @@
+import hashlib
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from shot_decision_quality import ShotDecisionQuality, body_part_group
+
+
+# Bin edges (yards / degrees); the last bin of each is open-ended
+DISTANCE_EDGES = np.array([0, 4, 6, 8, 10, 12, 14, 16, 18, 21, 24, 27, 30, 35, 40, 50, np.inf])
+ANGLE_EDGES = np.array([0, 5, 10, 15, 20, 25, 30, 40, 60, 180])
+BODY_PARTS = ['FOOT', 'HEAD', 'OTHER']
+CONTEXTS = ['OPEN_PLAY', 'PENALTY', 'FREE_KICK', 'OTHER_SET_PIECE']
+
+
+def set_piece_context(set_piece_type):
+    """
+    Collapse IMPECT set piece types into the contexts the table is binned by
+    """
+    set_piece_type = np.asarray(set_piece_type, dtype=object)
+    is_open_play = pd.isna(set_piece_type)
+    return np.select(
+        [is_open_play, set_piece_type == 'PENALTY', set_piece_type == 'FREE_KICK'],
+        ['OPEN_PLAY', 'PENALTY', 'FREE_KICK'],
+        default='OTHER_SET_PIECE'
+    )
+
+
+def _codes(values, categories):
+    values = np.asarray(values, dtype=object)
+    codes = np.full(values.shape, -1)
+    for i, category in enumerate(categories):
+        codes[values == category] = i
+    return codes
+
+
+class EmpiricalXG:
+    """
+    Empirical xG lookup table over distance x angle x body part x set-piece context
+
+    Cell rates are smoothed towards their distance x angle parent (which is
+    itself smoothed towards the league rate), so sparse cells borrow strength
+    from similar locations. Scoring is a single indexed read into `table`.
+    """
+
+    def __init__(self, table, shots, goals, prior_strength=20.0, fitted_at=None, n_shots=None):
+        self.table = np.asarray(table, dtype=np.float32)
+        self.shots = np.asarray(shots, dtype=np.int64)
+        self.goals = np.asarray(goals, dtype=np.int64)
+        self.prior_strength = float(prior_strength)
+        self.fitted_at = fitted_at or time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.n_shots = int(self.shots.sum()) if n_shots is None else int(n_shots)
+
+        # Version is a content hash, so identical fits share a label
+        digest = hashlib.sha1()
+        for array in (DISTANCE_EDGES, ANGLE_EDGES, self.table):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update(json.dumps([BODY_PARTS, CONTEXTS, self.prior_strength]).encode())
+        self.version = f"xg-{digest.hexdigest()[:10]}"
+
+    @staticmethod
+    def cell_index(distance, angle, body_part, set_piece_type):
+        """
+        Flat table index for each shot (vectorized)
+        """
+        d = np.clip(np.digitize(np.asarray(distance, dtype=float), DISTANCE_EDGES) - 1, 0, len(DISTANCE_EDGES) - 2)
+        a = np.clip(np.digitize(np.asarray(angle, dtype=float), ANGLE_EDGES) - 1, 0, len(ANGLE_EDGES) - 2)
+        b = _codes(body_part_group(body_part), BODY_PARTS)
+        c = _codes(set_piece_context(set_piece_type), CONTEXTS)
+        b, c = np.broadcast_to(b, d.shape), np.broadcast_to(c, d.shape)
+        return ((d * (len(ANGLE_EDGES) - 1) + a) * len(BODY_PARTS) + b) * len(CONTEXTS) + c
+
+    @classmethod
+    def fit(cls, distance, angle, body_part, set_piece_type, is_goal, prior_strength=20.0):
+        """
+        Fit the table from per-shot arrays with bincounts (no per-shot loop)
+        """
+        shape = (len(DISTANCE_EDGES) - 1, len(ANGLE_EDGES) - 1, len(BODY_PARTS), len(CONTEXTS))
+        cells = cls.cell_index(distance, angle, body_part, set_piece_type)
+        is_goal = np.asarray(is_goal, dtype=float)
+
+        shots = np.bincount(cells, minlength=np.prod(shape)).reshape(shape)
+        goals = np.bincount(cells, weights=is_goal, minlength=np.prod(shape)).reshape(shape)
+
+        league_rate = goals.sum() / max(shots.sum(), 1)
+
+        # Distance x angle parent, shrunk towards the league rate
+        parent_shots = shots.sum(axis=(2, 3))
+        parent_goals = goals.sum(axis=(2, 3))
+        parent_rate = (parent_goals + prior_strength * league_rate) / (parent_shots + prior_strength)
+
+        # Full cells, shrunk towards their parent
+        table = (goals + prior_strength * parent_rate[:, :, None, None]) / (shots + prior_strength)
+
+        return cls(table, shots, goals.round().astype(np.int64), prior_strength=prior_strength, n_shots=len(cells))
+
+    def predict(self, distance, angle, body_part='RIGHT_FOOT', set_piece_type=None):
+        values = self.table.ravel()[self.cell_index(distance, angle, body_part, set_piece_type)]
+        return values.item() if values.ndim == 0 else values.astype(float)
+
+    def save(self, path):
+        """
+        Persist as a compressed .npz (table, counts and metadata)
+        """
+        np.savez_compressed(
+            path,
+            table=self.table,
+            shots=self.shots,
+            goals=self.goals,
+            meta=np.array(json.dumps({
+                'version': self.version,
+                'fitted_at': self.fitted_at,
+                'n_shots': self.n_shots,
+                'prior_strength': self.prior_strength,
+            }))
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            model = cls(
+                data['table'], data['shots'], data['goals'],
+                prior_strength=meta['prior_strength'], fitted_at=meta['fitted_at'], n_shots=meta['n_shots']
+            )
+        if model.version != meta['version']:
+            raise ValueError(f"xG table {path} does not match its recorded version {meta['version']}")
+        return model
+
+
+def fit_xg_model(shots_df, prior_strength=20.0):
+    """
+    Fit an EmpiricalXG table from raw (unscored) shot events
+    """
+    shots_df = shots_df[shots_df['event_type'] == 'SHOT']
+    geometry = ShotDecisionQuality()
+    x = shots_df['coordinates_x'].to_numpy(dtype=float)
+    y = shots_df['coordinates_y'].to_numpy(dtype=float)
+
+    return EmpiricalXG.fit(
+        geometry.calculate_distance_to_goal(x, y),
+        geometry.calculate_shot_angle(x, y),
+        shots_df['body_part_type'].to_numpy(),
+        shots_df['set_piece_type'].to_numpy(),
+        shots_df['success'].fillna(False).astype(bool).to_numpy(),
+        prior_strength=prior_strength,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from data_loader import load_all_shots
+
+    parser = argparse.ArgumentParser(description="Fit the empirical xG lookup table")
+    parser.add_argument('competition_ids', type=int, nargs='+')
+    parser.add_argument('--output', default='xg_table.npz')
+    parser.add_argument('--prior-strength', type=float, default=20.0)
+    args = parser.parse_args()
+
+    shots_all = pd.concat([load_all_shots(competition_id=cid) for cid in args.competition_ids], ignore_index=True)
+    model = fit_xg_model(shots_all, prior_strength=args.prior_strength)
+    model.save(args.output)
+    print(f"✓ Fitted {model.version} on {model.n_shots} shots -> {args.output}")